@@ -1,20 +1,40 @@
+import argparse
 import json
 import os
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
+import plotly.graph_objects as go
 
 from landing_map import LandingMap
 from landing_table import LandingTable
+from multi_year import MultiYearLanding
 from simple_landing_map import SimpleLandingMap
 from simple_landing_table import SimpleLandingTable
 from plot_generator import PlotGenerator
+from rollup import RollupGenerator
+from sparklines import build_sparklines
+from output_sink import DirectorySink, OutputTarget, archive_sink
+from page_budget import OUTPUT_ROOT, record_outputs
+from sharding import parse_shard, write_shard_manifest
+from stable_output import stable_id
+from stages import Stage, run_stages
+from assets import vendor_assets
+from checkpoint import BUILD_STATE_DIR, Checkpoint, write_error_report
+from utils import THEME
+import fixtures
 
 RECENT_YEAR = 2023
+SELECTOR_YEARS = [2021, 2022, 2023]     # years in the multi-year map/table
+PEER_GROUP = 'national'                 # percentile peers: 'national', 'sector' or 'state'
+PLOT_WORKERS = max(1, (os.cpu_count() or 1) - 1)    # processes rendering school pages
 
 
 def get_schools() -> Dict[str,str]:
-    # get HEMAC partner schools
+    # get HEMAC partner schools; the roster last pulled when replaying fixtures offline
+    if fixtures.replaying():
+        with open(os.path.join('data','hemac_schools.json'),'r') as schlj:
+            return json.load(schlj)
     SHEET_ID = '1pbANvK-nxuUVHaD6w2f-01wzDgYwXAYxapSGXsH1VAs'
     SHEET_NAME = 'hemac'
     sheet = f'https://docs.google.com/spreadsheets/d/{SHEET_ID}/gviz/tq?tqx=out:csv&sheet={SHEET_NAME}'
@@ -27,41 +47,152 @@ def get_schools() -> Dict[str,str]:
     return schools
 
 
-def make_map(schls: Dict[str,str]) -> None:
+def make_map(schls: Dict[str,str],
+             output: Optional[OutputTarget] = None) -> None:
     # make landing page map
-    lm = LandingMap(schls,RECENT_YEAR)
+    lm = LandingMap(schls,RECENT_YEAR,peer=PEER_GROUP,output=output)
     lm.build_data_dicts()
     lm.build_labels()
     lm.build_map()
 
 
-def make_table(schls: Dict[str,str]) -> None:
+def make_table(schls: Dict[str,str],
+               output: Optional[OutputTarget] = None) -> None:
     # make landing page table
-    lt = LandingTable(schls,RECENT_YEAR)
+    lt = LandingTable(schls,RECENT_YEAR,peer=PEER_GROUP,output=output)
     lt.build_table()
 
 
-def make_simple_map(schls: Dict[str,str]) -> None:
+def make_multi_year(schls: Dict[str,str],
+                    output: Optional[OutputTarget] = None) -> None:
+    # make landing page map and table with a year selector
+    my = MultiYearLanding(schls,SELECTOR_YEARS,peer=PEER_GROUP,output=output)
+    my.build_map()
+    my.build_table()
+
+
+def make_simple_map(schls: Dict[str,str],
+                    output: Optional[OutputTarget] = None) -> None:
     # make simple landing page map
-    lm = SimpleLandingMap(schls,RECENT_YEAR)
+    lm = SimpleLandingMap(schls,RECENT_YEAR,output=output)
     lm.build_map()
 
 
-def make_simple_table(schls: Dict[str,str]) -> None:
+def make_simple_table(schls: Dict[str,str],
+                      output: Optional[OutputTarget] = None) -> None:
     # make simple landing page table
-    lt = SimpleLandingTable(schls,RECENT_YEAR)
+    lt = SimpleLandingTable(schls,RECENT_YEAR,output=output)
     lt.build_table()
 
 
-def make_plots(schls: Dict[str,str]) -> None:
-    # make school-specific plots
-    pg = PlotGenerator(schls,RECENT_YEAR)
-    pg.gen_all_plots()
-    
+def build_state_dir(output_root: str = OUTPUT_ROOT) -> str:
+    # checkpoints and error reports of one output root, apart from builds of other roots
+    if output_root == OUTPUT_ROOT:
+        return BUILD_STATE_DIR
+    return os.path.join(BUILD_STATE_DIR,stable_id('root',os.path.abspath(output_root))[:12])
+
+
+def plots_checkpoint(shard: Optional[Tuple[int,int]] = None,
+                     resume: bool = False,
+                     output_root: str = OUTPUT_ROOT) -> Checkpoint:
+    # completed school pages; only reused by a resumed run of the same year and shard
+    name = 'plots' if shard is None else f'plots-shard-{shard[0]}-of-{shard[1]}'
+    return Checkpoint(name,stable_id('plots',RECENT_YEAR,shard),resume,build_state_dir(output_root))
+
+
+def make_plots(schls: Dict[str,str],
+               shard: Optional[Tuple[int,int]] = None,
+               resume: bool = False,
+               output: Optional[OutputTarget] = None) -> None:
+    # make school-specific plots, only shard i of N if given
+    output = output if output is not None else OutputTarget()
+    pg = PlotGenerator(schls,RECENT_YEAR,output=output)
+    school_dirs = pg.gen_all_plots(shard,PLOT_WORKERS,plots_checkpoint(shard,resume,output.root))
+    write_error_report(pg.errors,os.path.join(build_state_dir(output.root),'errors.json'))
+    if shard is None:
+        RollupGenerator(pg.data,output=output).gen_dashboard()    # network-wide views from the same frames
+    elif shard[0] == 0:
+        RollupGenerator(pg.data,output=output).gen_dashboard()    # identical in every shard, built and merged once
+        write_shard_manifest(school_dirs,*shard,root=output.root,extra_dirs=['rollup'])
+    else:
+        write_shard_manifest(school_dirs,*shard,root=output.root)    # combined by sharding.merge_shards
+
+
+def make_shard(shard: Tuple[int,int],
+               resume: bool = False,
+               out_root: str = OUTPUT_ROOT) -> None:
+    # make one shard of school-specific plots from the roster last pulled, so every shard sees the same schools
+    schools_path = os.path.join('data','hemac_schools.json')
+    if not os.path.exists(schools_path):
+        get_schools()
+    with open(schools_path,'r') as schlj:
+        schls = json.load(schlj)
+    output = OutputTarget(out_root)
+    vendor_assets(root=output.asset_root)     # no-op for assets already vendored
+    make_plots(schls,shard,resume,output)
+
+
+def build_stages(schls: Dict[str,str],
+                 output: Optional[OutputTarget] = None,
+                 strict_budgets: bool = False,
+                 resume: bool = False,
+                 theme: go.layout.Template = THEME) -> List[Stage]:
+    # full build as a stage graph; loads overlap each other and rendering, independent renders run concurrently
+    # everything is written through output, so builds of different output roots can run at once
+    output = output if output is not None else OutputTarget()
+    state_dir = build_state_dir(output.root)
+
+    def landing_map(my: MultiYearLanding,
+                    sparklines: Dict[str,Dict[str,str]]) -> List[Dict[str,str]]:
+        my.sparklines = sparklines
+        lm = LandingMap(schls,RECENT_YEAR,data=my._map_data_for(RECENT_YEAR),index=my.index,peer=PEER_GROUP,
+                        sparklines=sparklines,output=output)
+        lm.build_data_dicts()
+        lm.build_labels()
+        lm.build_map()
+        my.build_map()
+        return lm.errors + my.errors
+
+    def plots(pg: PlotGenerator) -> List[Dict[str,str]]:
+        pg.gen_all_plots(workers=PLOT_WORKERS,checkpoint=plots_checkpoint(resume=resume,output_root=output.root))
+        return pg.errors
+
+    def landing_table(my: MultiYearLanding,
+                      sparklines: Dict[str,Dict[str,str]]) -> None:
+        my.sparklines = sparklines
+        LandingTable(schls,RECENT_YEAR,data=my.table_data,index=my.index,peer=PEER_GROUP,
+                     sparklines=sparklines,output=output).build_table()
+        my.build_table()
+
+    def publish(map_errors: List[Dict[str,str]],
+                plot_errors: List[Dict[str,str]],
+                *_) -> None:
+        write_error_report(map_errors + plot_errors,os.path.join(state_dir,'errors.json'))
+        if isinstance(output.sink,DirectorySink):
+            record_outputs(output.root,strict=strict_budgets)     # output sizes vs. page budgets; archives carry their own
+
+    return [
+        Stage('landing_data', lambda: MultiYearLanding(schls,sorted({*SELECTOR_YEARS,RECENT_YEAR}),peer=PEER_GROUP,
+                                                       output=output)),
+        Stage('plot_data', lambda: PlotGenerator(schls,RECENT_YEAR,theme=theme,output=output)),
+        Stage('rollup_metrics', lambda pg: RollupGenerator(pg.data,theme,output), ['plot_data']),
+        Stage('sparklines', lambda pg: build_sparklines(pg.data), ['plot_data']),
+        Stage('map', landing_map, ['landing_data','sparklines']),
+        Stage('table', landing_table, ['landing_data','sparklines']),
+        Stage('plots', plots, ['plot_data']),
+        Stage('rollup', lambda rg: rg.gen_dashboard(), ['rollup_metrics']),
+        Stage('publish', publish, ['map','plots','table','rollup'])
+    ]
+
 
 def main(pull_anyway: bool = False,
-         simple_only: bool = True):
+         simple_only: bool = True,
+         strict_budgets: bool = False,
+         archive: Optional[str] = None,
+         resume: bool = False,
+         out_root: str = OUTPUT_ROOT):
     # generate landing page map, landing table, and school specific plots
+    # into out_root, or streamed into one .tar.gz/.zip archive if given
     schools_path = os.path.join('data','hemac_schools.json')
 
     if os.path.exists(schools_path):
@@ -71,26 +202,62 @@ def main(pull_anyway: bool = False,
         if new_schools.keys() == schools_last_pulled.keys() and not pull_anyway:
             return None     # no changes since last pulled, do nothing
         else:
-            if simple_only:
-                make_simple_map(new_schools)
-                make_simple_table(new_schools)
-            else:
-                make_map(new_schools)
-                make_table(new_schools)
-                make_plots(new_schools)
+            vendor_assets(root=os.path.join(out_root,'assets'))     # no-op for assets already vendored
+            with archive_sink(archive,strict_budgets,out_root) as sink:
+                output = OutputTarget(out_root,sink)
+                if simple_only:
+                    make_simple_map(new_schools,output)
+                    make_simple_table(new_schools,output)
+                else:
+                    run_stages(build_stages(new_schools,output,strict_budgets,resume))
+            if simple_only and archive is None:
+                record_outputs(out_root,strict=strict_budgets)     # output sizes vs. page budgets; archives carry their own
 
     else:
         new_schools = get_schools()
         with open(schools_path,'r') as schlj:
             schls = json.load(schlj)
-        if simple_only:
-            make_simple_map(new_schools)
-            make_simple_table(new_schools)
-        else:
-            make_map(schls)
-            make_table(schls)
-            make_plots(schls)
+        vendor_assets(root=os.path.join(out_root,'assets'))     # no-op for assets already vendored
+        with archive_sink(archive,strict_budgets,out_root) as sink:
+            output = OutputTarget(out_root,sink)
+            if simple_only:
+                make_simple_map(new_schools,output)
+                make_simple_table(new_schools,output)
+            else:
+                run_stages(build_stages(schls,output,strict_budgets,resume))
+        if simple_only and archive is None:
+            record_outputs(out_root,strict=strict_budgets)     # output sizes vs. page budgets; archives carry their own
 
 
 if __name__ == '__main__':
-    main(pull_anyway=True, simple_only=True)
+    parser = argparse.ArgumentParser(description='generate HEMAC landing pages and school plots')
+    parser.add_argument('--full', action='store_true',
+                        help='build every page (landing maps and tables, school plots, rollup) as a stage graph; '
+                             'by default only the simple landing map and table are built')
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help='i/N: render only shard i of N of the school pages; merge with sharding.py')
+    parser.add_argument('--out', default=OUTPUT_ROOT,
+                        help='output root of the pages; default docs/')
+    parser.add_argument('--archive', default=None,
+                        help='write all pages into this .tar.gz or .zip instead of the output root')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip school pages completed by the last interrupted run, see .hemac_build/')
+    parser.add_argument('--fixtures', choices=fixtures.FIXTURE_MODES, default=fixtures.MODE,
+                        help='record genpeds loads to, or replay them offline from, the fixture store')
+    parser.add_argument('--fixtures-dir', default=fixtures.FIXTURE_ROOT,
+                        help='fixture store directory')
+    args = parser.parse_args()
+    fixtures.MODE, fixtures.FIXTURE_ROOT = args.fixtures, args.fixtures_dir
+    if args.shard is not None and args.archive is not None:
+        parser.error('--archive builds every page; shards write docs/ trees merged by sharding.py')
+    if args.shard is not None and args.full:
+        parser.error('--shard renders school pages only; build the landing pages with --full')
+    if args.resume and args.archive is not None:
+        parser.error('--resume reuses pages in docs/; archives are always built whole')
+    if args.resume and not args.full and args.shard is None:
+        parser.error('--resume skips completed school pages, which only --full and --shard build')
+    if args.shard is not None:
+        make_shard(args.shard,args.resume,args.out)
+    else:
+        main(pull_anyway=True, simple_only=not args.full, archive=args.archive, resume=args.resume,
+             out_root=args.out)
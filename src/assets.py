@@ -0,0 +1,135 @@
+import argparse
+import functools
+import hashlib
+import json
+import os
+import urllib.request
+import warnings
+from typing import Dict, Iterable, Optional
+
+import plotly.offline
+
+
+ASSET_ROOT = os.path.join('docs','assets')
+MANIFEST_NAME = 'manifest.json'
+
+# front-end dependencies; each page declares the subset it uses
+ASSETS = {
+    'bootstrap_css': {
+        'type': 'css',
+        'url': 'https://cdnjs.cloudflare.com/ajax/libs/twitter-bootstrap/5.3.0/css/bootstrap.min.css'
+    },
+    'datatables_css': {     # DataTables + Responsive + Buttons (html5 export only)
+        'type': 'css',
+        'url': 'https://cdn.datatables.net/v/bs5/dt-2.3.1/r-3.0.4/b-3.2.3/b-html5-3.2.3/datatables.min.css'
+    },
+    'jquery': {
+        'type': 'js',
+        'url': 'https://code.jquery.com/jquery-3.7.0.min.js'
+    },
+    'datatables_js': {
+        'type': 'js',
+        'url': 'https://cdn.datatables.net/v/bs5/dt-2.3.1/r-3.0.4/b-3.2.3/b-html5-3.2.3/datatables.min.js'
+    },
+    'jszip': {      # needed by the excel export button
+        'type': 'js',
+        'url': 'https://cdnjs.cloudflare.com/ajax/libs/jszip/3.10.1/jszip.min.js'
+    },
+    'plotly': {     # bundled with plotly.py, no download needed
+        'type': 'js',
+        'url': f'https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}.min.js'
+    }
+}
+
+TABLE_CSS = ['bootstrap_css', 'datatables_css']
+TABLE_JS = ['jquery', 'jszip', 'datatables_js']
+
+
+def _fetch(name: str) -> bytes:
+    '''returns asset content'''
+    if name == 'plotly':
+        return plotly.offline.get_plotlyjs().encode('utf-8')
+    with urllib.request.urlopen(ASSETS[name]['url'], timeout=60) as resp:
+        return resp.read()
+
+
+@functools.lru_cache(maxsize=32)
+def _read_manifest(path: str, mtime_ns: int) -> Dict[str,str]:
+    # keyed by modification time, so a manifest rewritten by vendor_assets (here or elsewhere) is read again
+    with open(path,'r') as mj:
+        return json.load(mj)
+
+
+def load_manifest(root: str = ASSET_ROOT) -> Dict[str,str]:
+    '''returns vendored asset name -> content-hashed filename; parsed once per root until the manifest changes'''
+    path = os.path.join(root, MANIFEST_NAME)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    return dict(_read_manifest(os.path.abspath(path), mtime_ns))    # a copy, callers may update it
+
+
+def vendor_assets(names: Optional[Iterable[str]] = None,
+                  root: str = ASSET_ROOT) -> Dict[str,str]:
+    '''
+    downloads each asset once into root under a content-hashed filename and updates the manifest
+
+    assets already in the manifest are not downloaded again; assets that cannot be fetched
+    are left out, so pages referencing them fall back to the CDN
+
+    :param names: assets to vendor; defaults to all of ASSETS
+    '''
+    os.makedirs(root, exist_ok=True)
+    manifest = load_manifest(root)
+    for name in (names or ASSETS.keys()):
+        if name in manifest and os.path.exists(os.path.join(root, manifest[name])):
+            continue
+        try:
+            content = _fetch(name)
+        except OSError as e:
+            warnings.warn(f'could not vendor {name}, pages will use the CDN: {e}')
+            continue
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        fname = f'{name}.{digest}.{ASSETS[name]["type"]}'
+        with open(os.path.join(root, fname),'wb') as af:
+            af.write(content)
+        manifest[name] = fname
+    with open(os.path.join(root, MANIFEST_NAME),'w') as mj:
+        json.dump(manifest, mj, indent=4, sort_keys=True)
+    return manifest
+
+
+def asset_src(name: str,
+              page_dir: str,
+              root: str = ASSET_ROOT) -> str:
+    '''
+    returns the URL a page should use for an asset: relative path to the vendored copy, else the CDN
+
+    :param page_dir: directory the page is written to
+    '''
+    fname = load_manifest(root).get(name)
+    if fname is None:
+        return ASSETS[name]['url']
+    return os.path.relpath(os.path.join(root, fname), page_dir).replace(os.sep, '/')
+
+
+def asset_tags(names: Iterable[str],
+               page_dir: str,
+               root: str = ASSET_ROOT) -> str:
+    '''returns <link>/<script> tags for the assets a page declares, in the given order'''
+    tags = []
+    for name in names:
+        src = asset_src(name, page_dir, root)
+        if ASSETS[name]['type'] == 'css':
+            tags.append(f'<link href="{src}" rel="stylesheet" />')
+        else:
+            tags.append(f'<script src="{src}"></script>')
+    return '\n'.join(tags)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='vendor front-end assets under docs/assets')
+    parser.add_argument('names', nargs='*', help='assets to vendor; defaults to all')
+    args = parser.parse_args()
+    print(json.dumps(vendor_assets(args.names or None), indent=4))
@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import traceback
+from typing import Dict, List, Optional
+
+
+BUILD_STATE_DIR = '.hemac_build'    # checkpoints and error reports, not published
+ERRORS_PATH = os.path.join(BUILD_STATE_DIR, 'errors.json')
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def error_record(stage: str,
+                 school_id: str,
+                 school: str,
+                 exc: BaseException) -> Dict[str,str]:
+    '''returns a JSON-serializable description of a per-school failure, with the innermost frame of this code base that raised'''
+    frames = traceback.extract_tb(exc.__traceback__)
+    ours = [f for f in frames if os.path.dirname(os.path.abspath(f.filename)) == _SRC_DIR]
+    frame = (ours or frames or [None])[-1]
+    return {
+        'stage': stage,
+        'id': school_id,
+        'school': school,
+        'error': type(exc).__name__,
+        'message': str(exc),
+        'where': f'{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}' if frame else ''
+    }
+
+
+def write_error_report(errors: List[Dict[str,str]],
+                       path: str = ERRORS_PATH) -> None:
+    '''writes per-school failures of a build, replacing the last report; prints a summary if any'''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path,'w') as ej:
+        json.dump(errors, ej, indent=1)
+    if errors:
+        stages = sorted({e['stage'] for e in errors})
+        print(f'{len(errors)} school failures in {", ".join(stages)}; see {path}')
+
+
+class Checkpoint:
+    '''
+    records completed units of work (e.g. one school's pages) so an interrupted run can resume
+
+    a checkpoint belongs to one run configuration; a checkpoint written under another run key
+    is discarded, so changed settings never reuse stale work
+
+    the file is a JSON lines log: a header line with the run key, then one line per completed key,
+    appended and synced as work completes; compact() rewrites it with one line per key
+    '''
+    def __init__(self,
+                 name: str,
+                 run_key: str,
+                 resume: bool = False,
+                 root: str = BUILD_STATE_DIR):
+        '''
+        :param name: checkpoint file name, e.g. 'plots'
+        :param run_key: identifies the run configuration the work was done under
+        :param resume: keep work recorded by an earlier run with the same run key; otherwise start over
+        :param root: directory of checkpoint files
+        '''
+        self.path = os.path.join(root, f'{name}.checkpoint.jsonl')
+        self.run_key = run_key
+        self.completed: Dict[str,str] = {}
+        self._log = None    # open for appending once work is recorded
+        self._reuse = False     # append to the existing file rather than starting a new one
+        if resume and os.path.exists(self.path):
+            with open(self.path,'r') as cj:
+                content = cj.read()
+            lines = content.splitlines()
+            torn = not content.endswith('\n')    # the last line was cut short by an interrupted write
+            if lines and lines[0] == json.dumps({'run_key': run_key}):
+                for line in lines[1:-1] if torn else lines[1:]:
+                    entry = json.loads(line)
+                    self.completed[entry['key']] = entry['value']
+                self._reuse = True
+                if torn:
+                    self.compact()  # drops the torn line before anything is appended
+            else:
+                print(f'{self.path} is from a different run configuration, starting over')
+
+
+    def done(self,
+             key: str,
+             value: Optional[str] = None) -> bool:
+        '''whether key was completed, with the same value if one is given'''
+        return key in self.completed and (value is None or self.completed[key] == value)
+
+
+    def mark_done(self,
+                  key: str,
+                  value: str = '') -> None:
+        '''records key as completed, appending it to the checkpoint file and syncing it to disk'''
+        self.completed[key] = value
+        if self._log is None:
+            if self._reuse:
+                self._log = open(self.path,'a')
+            else:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._log = open(self.path,'w')
+                self._log.write(json.dumps({'run_key': self.run_key}) + '\n')
+        self._log.write(json.dumps({'key': key, 'value': value}) + '\n')
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+
+    def compact(self) -> None:
+        '''closes the log and rewrites it atomically with one line per completed key; call when the run finishes'''
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        elif not (self.completed or self._reuse):     # nothing recorded, no file to rewrite
+            return None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(self.path), prefix='.hemac-', suffix='.part',
+                                         delete=False) as part:
+            part.write(json.dumps({'run_key': self.run_key}) + '\n')
+            part.writelines(json.dumps({'key': key, 'value': value}) + '\n'
+                            for key,value in sorted(self.completed.items()))
+        os.replace(part.name, self.path)
+        self._reuse = True
@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+
+CACHE_ROOT = os.environ.get('HEMAC_CACHE_DIR', '.ipeds_cache')
+MAX_BYTES = int(os.environ.get('HEMAC_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+INDEX_NAME = 'index.json'
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path,'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.hemac-', suffix='.part',
+                                     delete=False) as part:
+        part.write(content)
+    os.replace(part.name, path)
+
+
+class DownloadCache:
+    '''
+    content-addressed on-disk store of raw IPEDS files, capped in size with least-recently-used eviction
+
+    objects are stored once per sha256 under objects/; index.json maps each download key (its URL)
+    to an object digest, size and fetch/last-use times
+    '''
+    def __init__(self,
+                 root: str = CACHE_ROOT,
+                 max_bytes: int = MAX_BYTES):
+        '''
+        :param root: cache directory
+        :param max_bytes: size cap; least recently used entries are evicted past it
+        '''
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+
+    def _load_index(self) -> Dict:
+        path = os.path.join(self.root, INDEX_NAME)
+        if not os.path.exists(path):
+            return {'entries': {}, 'hits': 0, 'misses': 0}
+        with open(path,'r') as ij:
+            return json.load(ij)
+
+
+    def _save_index(self) -> None:
+        _atomic_write(os.path.join(self.root, INDEX_NAME),
+                      json.dumps(self._index, indent=1, sort_keys=True).encode('utf-8'))
+
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+
+    def _drop(self, key: str) -> None:
+        '''removes an entry, and its object once no other entry refers to it'''
+        entry = self._index['entries'].pop(key)
+        if all(e['sha256'] != entry['sha256'] for e in self._index['entries'].values()):
+            obj = self._object_path(entry['sha256'])
+            if os.path.exists(obj):
+                os.remove(obj)
+
+
+    def lookup(self,
+               key: str,
+               max_age: Optional[float] = None) -> Optional[str]:
+        '''
+        returns the path of a cached object after checking its integrity, or None on a miss
+
+        corrupt or missing objects are dropped and count as misses
+
+        :param max_age: seconds since download after which the entry is stale and counts as a miss
+        '''
+        with self._lock:
+            entry = self._index['entries'].get(key)
+        obj = entry and self._object_path(entry['sha256'])
+        valid = (entry is not None and os.path.exists(obj) and _sha256(obj) == entry['sha256']
+                 and (max_age is None or time.time() - entry['fetched'] <= max_age))    # hashed outside the lock
+        with self._lock:
+            current = self._index['entries'].get(key)
+            if not valid or current is not entry:   # replaced meanwhile also counts as a miss
+                if entry is not None and current is entry:
+                    self._drop(key)
+                self._index['misses'] += 1
+                self._save_index()
+                return None
+            entry['last_used'] = time.time()
+            self._index['hits'] += 1
+            self._save_index()
+            return obj
+
+
+    def put(self, key: str, content: bytes) -> str:
+        '''stores content under key, evicting least recently used entries past the size cap; returns the object path'''
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            obj = self._object_path(digest)
+            if not os.path.exists(obj):
+                _atomic_write(obj, content)
+            now = time.time()
+            self._index['entries'][key] = {'sha256': digest, 'bytes': len(content),
+                                           'fetched': now, 'last_used': now}
+            self._evict(self.max_bytes, keep=key)
+            self._save_index()
+            return obj
+
+
+    def _evict(self,
+               max_bytes: int,
+               keep: Optional[str] = None) -> int:
+        '''drops least recently used entries until the cache fits max_bytes; returns entries dropped'''
+        entries = self._index['entries']
+        by_age = sorted((e['last_used'], k) for k,e in entries.items() if k != keep)
+        dropped = 0
+        while self.size() > max_bytes and by_age:
+            self._drop(by_age.pop(0)[1])
+            dropped += 1
+        return dropped
+
+
+    def size(self) -> int:
+        '''bytes of stored objects; entries sharing an object count once'''
+        return sum({e['sha256']: e['bytes'] for e in self._index['entries'].values()}.values())
+
+
+    def stats(self) -> Dict:
+        '''returns entry count, size, cap and lifetime hit/miss counts'''
+        with self._lock:
+            return {'entries': len(self._index['entries']),
+                    'bytes': self.size(),
+                    'max_bytes': self.max_bytes,
+                    'hits': self._index['hits'],
+                    'misses': self._index['misses']}
+
+
+    def prune(self,
+              max_bytes: Optional[int] = None,
+              older_than: Optional[float] = None) -> int:
+        '''
+        evicts entries past a size cap or age, and removes objects no entry refers to
+
+        :param max_bytes: size to prune to; defaults to the cache's cap
+        :param older_than: also drop entries downloaded more than this many seconds ago
+        :returns: number of entries dropped
+        '''
+        with self._lock:
+            dropped = 0
+            if older_than is not None:
+                cutoff = time.time() - older_than
+                for key in [k for k,e in self._index['entries'].items() if e['fetched'] < cutoff]:
+                    self._drop(key)
+                    dropped += 1
+            dropped += self._evict(self.max_bytes if max_bytes is None else max_bytes)
+            live = {e['sha256'] for e in self._index['entries'].values()}
+            objects = os.path.join(self.root, 'objects')
+            for dirpath,_,files in os.walk(objects):
+                for fname in files:
+                    if fname not in live:
+                        os.remove(os.path.join(dirpath, fname))
+            self._save_index()
+            return dropped
+
+
+_caches: Dict[str,DownloadCache] = {}
+_caches_lock = threading.Lock()
+
+
+def shared_cache(root: str = CACHE_ROOT) -> DownloadCache:
+    '''
+    returns the one DownloadCache of a cache root, so concurrent loads share its index and lock
+
+    separate instances over one root would each save their own copy of index.json and lose the other's entries
+    '''
+    key = os.path.abspath(root)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = DownloadCache(root)
+        return _caches[key]
+
+
+def place(obj: str, dest: str) -> None:
+    '''puts a cached object at dest, hard-linked where possible so the working copy costs no extra disk'''
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    if os.path.exists(dest) and os.path.samefile(obj, dest):
+        return      # already placed, e.g. by a concurrent load of the same file
+    tmp = os.path.join(os.path.dirname(dest), f'.hemac-{os.getpid()}-{threading.get_ident()}.part')
+    try:
+        os.link(obj, tmp)
+    except OSError:
+        shutil.copyfile(obj, tmp)
+    os.replace(tmp, dest)
+    if os.path.exists(tmp):     # rename is a no-op when both names are links to one file
+        os.remove(tmp)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='inspect or prune the raw IPEDS download cache')
+    parser.add_argument('command', choices=['stats','prune'])
+    parser.add_argument('--root', default=CACHE_ROOT)
+    parser.add_argument('--max-bytes', type=int, default=None, help='size to prune to; defaults to the cache cap')
+    parser.add_argument('--older-than', type=float, default=None, help='also prune entries downloaded more than this many days ago')
+    args = parser.parse_args()
+    cache = DownloadCache(args.root)
+    if args.command == 'prune':
+        older = None if args.older_than is None else args.older_than * 86400
+        print(f'pruned {cache.prune(args.max_bytes, older)} entries')
+    print(json.dumps(cache.stats(), indent=4))
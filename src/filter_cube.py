@@ -0,0 +1,45 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+# facet -> source column; facets missing from the data (e.g. sector without Characteristics) are left out
+CUBE_DIMS = {'state': 'state', 'sector': 'sector', 'level': 'studentlevel', 'year': 'year'}
+CUBE_MEASURES = {'men': 'totmen', 'women': 'totwomen'}
+LEVEL_LABELS = {'undergrad': 'Undergraduate', 'grad': 'Graduate'}     # as shown in table rows
+
+
+def build_cube(data: pd.DataFrame) -> Dict[str,Dict[str,List]]:
+    '''
+    aggregates enrollment into gender counts per state x sector x level x year, for pooled summaries client-side
+
+    one cell per non-empty combination, stored column-wise with each facet as an index into its sorted
+    values, so the page sums a handful of integer arrays instead of scanning per-school history
+
+    :param data: one row per school, level and year with the CUBE_DIMS and CUBE_MEASURES source columns
+    :returns: {'dims': facet -> values, 'cells': facet -> value index per cell, measure -> count per cell,
+              'schools' -> schools reporting per cell}
+    '''
+    dims = [d for d,col in CUBE_DIMS.items() if col in data.columns]
+    frame = pd.DataFrame({d: data[CUBE_DIMS[d]].to_numpy() for d in dims})
+    if 'level' in frame:
+        frame['level'] = frame['level'].map(LEVEL_LABELS).fillna(frame['level'])
+    frame = frame.fillna({d: 'Unknown' for d in dims if d != 'year'})
+    for m,col in CUBE_MEASURES.items():
+        frame[m] = pd.to_numeric(data[col], errors='coerce').to_numpy()
+    frame['schools'] = data['id'].to_numpy()
+    frame = frame.dropna(subset=list(CUBE_MEASURES), how='all')
+
+    codes, values = {}, {}
+    for d in dims:
+        codes[d], uniques = pd.factorize(frame[d], sort=True)
+        values[d] = [int(v) if isinstance(v, (int, np.integer)) else str(v) for v in uniques]
+    cells = (frame.assign(**codes)
+             .groupby(dims, sort=True)
+             .agg(**{m: (m, 'sum') for m in CUBE_MEASURES}, schools=('schools', 'nunique'))
+             .reset_index())
+    return {
+        'dims': values,
+        'cells': {c: np.round(cells[c].to_numpy()).astype(int).tolist() for c in [*dims, *CUBE_MEASURES, 'schools']}
+    }
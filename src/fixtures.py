@@ -0,0 +1,158 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from importlib.metadata import PackageNotFoundError, version
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from checkpoint import BUILD_STATE_DIR
+
+
+FIXTURE_ROOT = os.environ.get('HEMAC_FIXTURES_DIR', os.path.join(BUILD_STATE_DIR,'fixtures'))    # local, not committed
+FIXTURE_MODES = ('record', 'replay')
+MODE = os.environ.get('HEMAC_FIXTURES')     # 'record', 'replay', or None to call genpeds as usual
+INDEX_NAME = 'index.json'
+
+
+def _genpeds_version() -> str:
+    try:
+        return version('genpeds')
+    except PackageNotFoundError:
+        return ''
+
+
+def _parquet_safe(frame: pd.DataFrame) -> Tuple[pd.DataFrame,List[str]]:
+    '''returns the frame with object columns parquet cannot type stored as strings, and those columns' names'''
+    mixed = []
+    for col in frame.columns[frame.dtypes == object]:
+        try:
+            pa.array(frame[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            mixed.append(col)
+    if mixed:
+        frame = frame.copy()
+        for col in mixed:
+            frame[col] = frame[col].map(lambda v: v if pd.isna(v) else str(v))
+    return frame, [str(col) for col in mixed]
+
+
+class FixtureStore:
+    '''
+    on-disk snapshots of genpeds run() results, keyed by survey, years and run() arguments
+
+    each snapshot is a parquet file with pandas metadata, so replays return the recorded dtypes and values;
+    object columns mixing types, which parquet cannot hold, are recorded as strings. index.json lists what
+    each file holds, which columns were stringified and the genpeds version it was recorded with
+    '''
+    def __init__(self,
+                 root: str = FIXTURE_ROOT):
+        '''
+        :param root: fixture directory
+        '''
+        self.root = root
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def key(survey: type,
+            year_range,
+            args: tuple) -> Dict[str,str]:
+        '''describes a run() call; the digest of the description names its snapshot'''
+        call = {'survey': survey.__name__, 'years': repr(year_range), 'args': repr(tuple(args))}
+        call['digest'] = hashlib.sha256(json.dumps(call, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return call
+
+
+    def path(self, call: Dict[str,str]) -> str:
+        return os.path.join(self.root, f'{call["survey"].lower()}-{call["digest"]}.parquet')
+
+
+    def get(self,
+            survey: type,
+            year_range,
+            args: tuple) -> Optional[pd.DataFrame]:
+        '''returns the recorded frame of a run() call, or None if it was never recorded'''
+        path = self.path(self.key(survey, year_range, args))
+        return pd.read_parquet(path, engine='pyarrow') if os.path.exists(path) else None
+
+
+    def put(self,
+            survey: type,
+            year_range,
+            args: tuple,
+            frame: pd.DataFrame) -> str:
+        '''records the frame of a run() call, replacing an earlier recording; returns the snapshot path'''
+        call = self.key(survey, year_range, args)
+        path = self.path(call)
+        os.makedirs(self.root, exist_ok=True)
+        frame, stringified = _parquet_safe(frame)
+        with tempfile.NamedTemporaryFile(dir=self.root, prefix='.hemac-', suffix='.part', delete=False) as part:
+            frame.to_parquet(part, engine='pyarrow')
+        os.replace(part.name, path)
+        with self._lock:
+            index = self.index()
+            index[call['digest']] = {**call, 'file': os.path.basename(path), 'rows': len(frame),
+                                     'columns': [str(c) for c in frame.columns], 'stringified': stringified,
+                                     'genpeds': _genpeds_version()}
+            with tempfile.NamedTemporaryFile('w', dir=self.root, prefix='.hemac-', suffix='.part',
+                                             delete=False) as part:
+                json.dump(index, part, indent=1, sort_keys=True)
+            os.replace(part.name, os.path.join(self.root, INDEX_NAME))
+        return path
+
+
+    def index(self) -> Dict[str,Dict]:
+        '''digest -> description of every recorded call'''
+        path = os.path.join(self.root, INDEX_NAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path,'r') as ij:
+            return json.load(ij)
+
+
+_stores: Dict[str,FixtureStore] = {}
+_stores_lock = threading.Lock()
+
+
+def replaying() -> bool:
+    '''whether genpeds loads are served from fixtures, so nothing needs downloading'''
+    return MODE == 'replay'
+
+
+def run_survey(survey: type,
+               year_range,
+               *args) -> pd.DataFrame:
+    '''
+    returns survey(year_range).run(*args); records the result or replays a recorded one when MODE says so
+
+    :raises ValueError: if MODE is not one of FIXTURE_MODES or None
+    :raises KeyError: when replaying a call that was never recorded
+    '''
+    if MODE is None:
+        return survey(year_range).run(*args)
+    if MODE not in FIXTURE_MODES:
+        raise ValueError(f'unknown fixture mode {MODE!r}; expected one of {FIXTURE_MODES}')
+    with _stores_lock:
+        store = _stores.setdefault(FIXTURE_ROOT, FixtureStore(FIXTURE_ROOT))
+    if MODE == 'replay':
+        frame = store.get(survey, year_range, args)
+        if frame is None:
+            raise KeyError(f'no fixture for {survey.__name__}({year_range!r}).run{tuple(args)!r} in {store.root}; '
+                           'record one with --fixtures record')
+        return frame
+    frame = survey(year_range).run(*args)
+    store.put(survey, year_range, args, frame)
+    return frame
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='list recorded genpeds fixtures')
+    parser.add_argument('root', nargs='?', default=FIXTURE_ROOT, help='fixture directory')
+    args = parser.parse_args()
+    for entry in sorted(FixtureStore(args.root).index().values(), key=lambda e: e['file']):
+        print(f'{entry["file"]}: {entry["survey"]}({entry["years"]}).run{entry["args"]}, {entry["rows"]} rows')
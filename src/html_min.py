@@ -0,0 +1,90 @@
+import re
+from typing import Dict
+
+
+# elements whose content is kept verbatim: whitespace is significant in <pre>/<textarea>, and in JS strings
+_VERBATIM = re.compile(r'(<(script|pre|textarea)\b.*?</\2\s*>)', flags=re.DOTALL | re.IGNORECASE)
+_COMMENT = re.compile(r'<!--(?!\[if).*?-->', flags=re.DOTALL)
+_STYLE_BLOCK = re.compile(r'(<style\b[^>]*>)(.*?)(</style>)', flags=re.DOTALL | re.IGNORECASE)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', flags=re.DOTALL)
+_CSS_SPACE = re.compile(r'\s*([{};,>])\s*|(:)\s+')   # no space removal before ':' (descendant pseudo-classes)
+_TAG = re.compile(r'<([a-zA-Z][\w-]*)(\s[^<>]*?)?(/?)>')
+_STYLE_ATTR = re.compile(r'\sstyle\s*=\s*"([^"]*)"')
+_CLASS_ATTR = re.compile(r'\sclass\s*=\s*"([^"]*)"')
+
+
+def _minify_css(m: re.Match) -> str:
+    css = _CSS_COMMENT.sub('', m.group(2))
+    css = _CSS_SPACE.sub(lambda s: s.group(1) or s.group(2), ' '.join(css.split()))
+    return m.group(1) + css.replace(';}', '}') + m.group(3)
+
+
+def minify_html(html: str) -> str:
+    '''
+    minifies generated HTML without changing how it renders
+
+    strips indentation and blank lines, drops comments and collapses <style> blocks outside of
+    <script>, <pre> and <textarea> elements, which are kept verbatim; line breaks are kept elsewhere,
+    so inline whitespace is preserved
+    '''
+    parts = _VERBATIM.split(html)
+    out = []
+    for i in range(0, len(parts), 3):   # text, then the verbatim element and its tag name captured by the split
+        part = _COMMENT.sub('', parts[i])
+        part = _STYLE_BLOCK.sub(_minify_css, part)
+        out.append('\n'.join(line.strip() for line in part.splitlines() if line.strip()))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return '\n'.join(p for p in out if p)
+
+
+class StyleRegistry:
+    '''hoists inline style attributes into a shared stylesheet of short class names'''
+    def __init__(self,
+                 prefix: str = 'h'):
+        '''
+        :param prefix: class name prefix; classes are named prefix + running number
+        '''
+        self.prefix = prefix
+        self._classes: Dict[str,str] = {}
+
+
+    @staticmethod
+    def _normalize(style: str) -> str:
+        '''canonical form of a style declaration, so equivalent styles share a class'''
+        decls = [d.strip() for d in style.split(';') if d.strip()]
+        return ';'.join(re.sub(r'\s*:\s*', ':', d, count=1) for d in decls)
+
+
+    def class_for(self, style: str) -> str:
+        '''returns (registering if new) the class name for a style declaration'''
+        style = self._normalize(style)
+        if style not in self._classes:
+            self._classes[style] = f'{self.prefix}{len(self._classes)}'
+        return self._classes[style]
+
+
+    def _hoist_tag(self, m: re.Match) -> str:
+        tag, attrs, closing = m.group(1), m.group(2) or '', m.group(3)
+        style = _STYLE_ATTR.search(attrs)
+        if style is None:
+            return m.group(0)
+        cls = self.class_for(style.group(1))
+        attrs = attrs[:style.start()] + attrs[style.end():]
+        existing = _CLASS_ATTR.search(attrs)
+        if existing is not None:
+            attrs = attrs[:existing.start()] + f' class="{existing.group(1)} {cls}"' + attrs[existing.end():]
+        else:
+            attrs += f' class="{cls}"'
+        return f'<{tag}{attrs}{closing}>'
+
+
+    def hoist(self, fragment: str) -> str:
+        '''replaces inline style attributes in an HTML fragment with registered class names'''
+        return _TAG.sub(self._hoist_tag, fragment)
+
+
+    def stylesheet(self) -> str:
+        '''returns a <style> block defining every registered class'''
+        rules = ''.join(f'.{cls}{{{style}}}' for style,cls in self._classes.items())
+        return f'<style>{rules}</style>'
@@ -1,263 +1,357 @@
-import re
-import os
-from typing import Dict
+import json
+import string
+from typing import Dict, List, Optional, Tuple, Union
 
 import folium
 import folium.plugins
+import pandas as pd
 from genpeds import (
     Admissions, 
     Enrollment, 
-    Graduation, 
-    Characteristics
+    Graduation
 )
 
+from html_min import StyleRegistry, minify_html
+from rankings import PEER_LABELS, RANK_METRICS, add_percentiles
+from schema import LANDING_SCHEMAS
+from school_index import SchoolIndex
+from search_index import build_search_index, search_control
+from sparklines import SPARK_CSS, SPARK_METRICS
+from output_sink import OutputTarget
+from stable_output import StableIds
+from survey_loader import SurveyLoad, load_surveys
 from utils import (
     LMLABEL_HEAD, 
     LMLABEL_ADMISSIONS, 
     LMLABEL_ENROLL_UNDERGRAD, 
     LMLABEL_ENROLL_GRAD, 
     LMLABEL_GRADUATION_ASSC, 
-    LMLABEL_GRADUATION_BACH
+    LMLABEL_GRADUATION_BACH,
+    LMLABEL_PERCENTILE,
+    LMLABEL_TRENDS,
+    LMLABEL_TREND_ITEM,
+    LMLABEL_TAIL,
+    TOOLTIP_STYLE,
+    YEAR_SELECT
 )
 
 
-# MAP
-_map = folium.Map(location=(39.8097343, -98.5556199),
-                  zoom_control='topright',
-                  tiles='Cartodb voyager',
-                  zoom_start=5)
-# full screen
-_fullscreen = folium.plugins.Fullscreen(position='topright')
-_fullscreen.add_to(_map)
-
-# rm leaflet attr, cleaner attribution line
-# Note that Leaflet creator himself says this is okay: https://groups.google.com/g/leaflet-js/c/fA6M7fbchOs/m/JTNVhqdc7JcJ
-map_id = _map.get_name()
-remove_leaflet_text_js = f'''
-<script>
-    setTimeout(function() {{
-        if (typeof {map_id} !== 'undefined' && {map_id}.attributionControl && {map_id}.attributionControl.setPrefix) {{
-            {map_id}.attributionControl.setPrefix('');
-        }}
-    }}, 50);
-</script>
-'''
-_map.get_root().html.add_child(folium.Element(remove_leaflet_text_js))
+# data dict key prefix for each popup section
+SECTION_PREFIXES = {
+    'admissions': 'admit',
+    'enrollment_undergrad': 'enroll_ug',
+    'enrollment_grad': 'enroll_g',
+    'graduation_two_year': 'grad_2yr',
+    'graduation_four_year': 'grad_4yr'
+}
+
+
+# phrases shown in a popup sentence in place of a missing value
+MISSING_COUNT = 'an unreported number of'
+MISSING_RATE = 'an unreported share'
+
+# data dict keys rendered as percentages; filled in by _section
+RATE_KEYS = set()
+
+
+def _section(template: str, fields: Dict[str,str]) -> str:
+    '''
+    rewrites a label template's placeholders as data dict keys
+
+    a placeholder's trailing % moves into its value, see _display, so a missing rate reads as a phrase
+    '''
+    for ph,key in fields.items():
+        if '{' + ph + '}%' in template:
+            template = template.replace('{' + ph + '}%', '{' + ph + '}')
+            RATE_KEYS.add(key)
+    return template.format(**{ph: '{' + key + '}' for ph,key in fields.items()})
+
+
+def _display(key: str, value):
+    '''formats a data dict value for a popup sentence'''
+    if key not in RATE_KEYS:
+        return MISSING_COUNT if value is None else value
+    return MISSING_RATE if value is None else f'{value}%'
+
+
+def _percentile(metric: str, key: str) -> Tuple[str,str]:
+    '''percentile line for a data dict key, shown when the school has a percentile'''
+    return f'has_{key}', LMLABEL_PERCENTILE.format(metric=metric, pct='{' + key + '}', peer='{peer}')
+
+
+# popup sections as (data dict flag, template over data dict keys); flag None always renders
+LABEL_SECTIONS = [
+    (None, _section(LMLABEL_HEAD, {'name': 'name', 'city': 'city', 'state': 'state', 'webaddr': 'webaddr'})),
+    ('has_admit', _section(LMLABEL_ADMISSIONS, {
+        'name': 'name',
+        'male_applied': 'admit_men_app', 'male_admitted': 'admit_men_admit', 'male_enrolled': 'admit_men_enroll',
+        'female_applied': 'admit_women_app', 'female_admitted': 'admit_women_admit',
+        'female_enrolled': 'admit_women_enroll',
+        'male_accept': 'admit_accept_men', 'male_yield': 'admit_yield_men',
+        'female_accept': 'admit_accept_women', 'female_yield': 'admit_yield_women'})),
+    _percentile('Male acceptance rate', 'admit_accept_men_pct'),
+    ('has_enroll_ug', _section(LMLABEL_ENROLL_UNDERGRAD, {
+        'totmen_enroll': 'enroll_ug_men', 'totwomen_enroll': 'enroll_ug_women', 'totmen_share': 'enroll_ug_share'})),
+    _percentile('Male enrollment share', 'enroll_ug_share_pct'),
+    ('has_enroll_g', _section(LMLABEL_ENROLL_GRAD, {
+        'totmen_enroll': 'enroll_g_men', 'totwomen_enroll': 'enroll_g_women', 'totmen_share': 'enroll_g_share'})),
+    _percentile('Male enrollment share', 'enroll_g_share_pct'),
+    ('has_grad_2yr', _section(LMLABEL_GRADUATION_ASSC, {
+        'totmen': 'grad_2yr_men', 'totmen_graduated': 'grad_2yr_mengrad', 'gradrate_men': 'grad_2yr_menrate',
+        'totwomen': 'grad_2yr_women', 'totwomen_graduated': 'grad_2yr_womengrad',
+        'gradrate_women': 'grad_2yr_womenrate'})),
+    _percentile('Male graduation rate', 'grad_2yr_menrate_pct'),
+    ('has_grad_4yr', _section(LMLABEL_GRADUATION_BACH, {
+        'totmen': 'grad_4yr_men', 'totmen_graduated': 'grad_4yr_mengrad', 'gradrate_men': 'grad_4yr_menrate',
+        'totwomen': 'grad_4yr_women', 'totwomen_graduated': 'grad_4yr_womengrad',
+        'gradrate_women': 'grad_4yr_womenrate'})),
+    _percentile('Male graduation rate', 'grad_4yr_menrate_pct'),
+    ('has_trends', LMLABEL_TRENDS),
+    (None, LMLABEL_TAIL)
+]
+# data dict keys that are the same in every year; trends span all years
+HEADER_KEYS = ['lat', 'lon', 'name', 'city', 'state', 'webaddr', 'has_trends', 'trends']
+
+def _placeholders(template: str) -> List[str]:
+    '''data dict keys used by a section template'''
+    return [name for _,name,_,_ in string.Formatter().parse(template) if name]
+
+
+def base_map(ids: Optional[StableIds] = None) -> folium.Map:
+    '''
+    returns a new landing map with controls; each LandingMap draws on its own
+
+    :param ids: id factory of the page; element ids stay random without one
+    '''
+    _map = folium.Map(location=(39.8097343, -98.5556199),
+                      zoom_control='topright',
+                      tiles='Cartodb voyager',
+                      zoom_start=5)
+    # full screen
+    _fullscreen = folium.plugins.Fullscreen(position='topright')
+    _fullscreen.add_to(_map)
+    if ids is not None:
+        ids.assign(_map.get_root())     # before the map's name is baked into the script below
+
+    # rm leaflet attr, cleaner attribution line
+    # Note that Leaflet creator himself says this is okay: https://groups.google.com/g/leaflet-js/c/fA6M7fbchOs/m/JTNVhqdc7JcJ
+    map_id = _map.get_name()
+    remove_leaflet_text_js = f'''
+    <script>
+        setTimeout(function() {{
+            if (typeof {map_id} !== 'undefined' && {map_id}.attributionControl && {map_id}.attributionControl.setPrefix) {{
+                {map_id}.attributionControl.setPrefix('');
+            }}
+        }}, 50);
+    </script>
+    '''
+    _map.get_root().html.add_child(folium.Element(remove_leaflet_text_js))
+    return _map
 
 
 class LandingMap:
     '''HEMAC Landing Map'''
     def __init__(self,
                  schools: Dict[str,str],
-                 most_recent_year: int = 2023):
+                 most_recent_year: int = 2023,
+                 data: Optional[Dict[str,pd.DataFrame]] = None,
+                 index: Optional[SchoolIndex] = None,
+                 deterministic: bool = True,
+                 peer: str = 'national',
+                 sparklines: Optional[Dict[str,Dict[str,str]]] = None,
+                 output: Optional[OutputTarget] = None):
         '''
         Build HEMAC landing page map of partner schools
         
         :param schools: dict of partner school "ID: Name" key-value pairs
         :param most_recent_year: most recent year of data; defaults to 2023
+        :param data: survey frames for the year, as returned by load_data; loaded if not given
+        :param index: school metadata index for header fields; loaded for most_recent_year if not given
+        :param deterministic: seed element ids from stable keys so identical inputs render byte-identical pages
+        :param peer: peer group of popup percentiles; 'national', 'sector' or 'state'; must match data
+        :param sparklines: school id -> trend SVGs from sparklines.build_sparklines, shown in popups
+        :param output: output root and sink the map is written to; docs/ if not given
         '''
-        char = Characteristics(most_recent_year).run(False,False)   # .query('year == @most_recent_year') # fix this
-
-        admit = Admissions(most_recent_year).run(False,True,False)
-        
-        enroll_undergrad = Enrollment(most_recent_year).run('undergrad',False,True,False)
-        enroll_grad = Enrollment(most_recent_year).run('grad',False,True,False)
-
-        grad_two_year = Graduation(most_recent_year).run('assc',False,True,False)
-        grad_four_year = Graduation(most_recent_year).run('bach',False,True,False)
-
-        data = {
-            'characteristics': char,
-            'admissions': admit,
-            'enrollment_undergrad': enroll_undergrad,
-            'enrollment_grad': enroll_grad,
-            'graduation_two_year': grad_two_year,
-            'graduation_four_year': grad_four_year
-        }
-        for label,df in data.items():
-            data[label] = df.loc[df['id'].isin(schools.keys())]
+        if data is None:
+            data = self.load_data(schools,most_recent_year,peer)
         
         self.data = data
+        self.peer = peer
+        self.sparklines = sparklines or {}
         self.schools = schools
-        self.map = _map
+        self.index = index if index is not None else SchoolIndex.load(most_recent_year)
+        self.deterministic = deterministic
+        self.output = output if output is not None else OutputTarget()
+        self.map = base_map(StableIds('landing_map',deterministic))
         self.data_dicts = {}
         self.labels = {}
+        self.errors = []    # per-school failures, see checkpoint.error_record
+        self.styles = StyleRegistry()   # inline popup/tooltip styles, hoisted into one stylesheet
+
+
+    @staticmethod
+    def load_data(schools: Dict[str,str],
+                  year_range: Union[int,List[int]],
+                  peer: str = 'national') -> Dict[str,pd.DataFrame]:
+        '''
+        loads partner schools' survey data for one year or a list of years, with peer percentiles of RANK_METRICS
+
+        :param schools: dict of partner school "ID: Name" key-value pairs
+        :param year_range: single year or list of years
+        :param peer: peer group for percentiles; 'national', 'sector' or 'state'
+        '''
+        return LandingMap.prepare(schools, load_surveys(LandingMap.surveys(year_range,peer)), peer)
+
+
+    @staticmethod
+    def surveys(year_range: Union[int,List[int]],
+                peer: str = 'national') -> Dict[str,SurveyLoad]:
+        '''survey loads behind load_data, for callers that load them together with other surveys'''
+        char = peer != 'national'    # sector/state come from Characteristics
+        return {
+            'admissions': SurveyLoad(Admissions,year_range,merge_with_char=char),
+            'enrollment_undergrad': SurveyLoad(Enrollment,year_range,'undergrad',merge_with_char=char),
+            'enrollment_grad': SurveyLoad(Enrollment,year_range,'grad',merge_with_char=char),
+            'graduation_two_year': SurveyLoad(Graduation,year_range,'assc',merge_with_char=char),
+            'graduation_four_year': SurveyLoad(Graduation,year_range,'bach',merge_with_char=char)
+        }
+
+
+    @staticmethod
+    def prepare(schools: Dict[str,str],
+                surveys: Dict[str,pd.DataFrame],
+                peer: str = 'national') -> Dict[str,pd.DataFrame]:
+        '''
+        ranks national survey frames and keeps the partner schools' rows, as load_data does after loading
+
+        :param surveys: label -> national frame, with at least the labels of surveys(); other labels are ignored
+        '''
+        data = {}
+        for label,metrics in RANK_METRICS.items():
+            # percentiles are ranked over the national frames before they are dropped
+            df = add_percentiles(surveys[label],metrics,peer)
+            data[label] = df.loc[df['id'].isin(schools.keys())]
+        return data
 
     
     def build_data_dicts(self) -> None:
-        '''builds school data'''
+        '''builds school data; invalid survey rows are recorded in self.errors and render as missing values'''
+        surveys = {label: LANDING_SCHEMAS[label].validate(df) for label,df in self.data.items()}
+        for survey in surveys.values():
+            survey.report()     # bad rows reported once per survey rather than per school
+            self.errors.extend(survey.error_records('map',self.schools))
+
         for schl in self.schools.keys():
             # Header info
-            schl_char = self.data['characteristics']
-            schl_char = schl_char.loc[schl_char['id'] == schl]
-            lat = schl_char['latitude'].unique()[0]
-            lon = schl_char['longitude'].unique()[0]
-            name = schl_char['id'].map(self.schools).unique()[0]    # get custom names from google sheet
-            city = schl_char['city'].unique()[0]
-            state = schl_char['state'].unique()[0]
-            webaddr = schl_char['webaddress'].astype(str).unique()[0]
-            if not re.search(r'^https\:\/\/',webaddr):
-                webaddr = 'https://' + webaddr
-            # Admissions info
-            schl_admit = self.data['admissions'].loc[self.data['admissions']['id'] == schl]
-            if len(schl_admit) > 0:
-                schl_admit['female_applied'] = schl_admit['tot_applied'] - schl_admit['men_applied']
-                schl_admit['female_admitted'] = schl_admit['tot_admitted'] - schl_admit['men_admitted']
-                schl_admit['female_enrolled'] = schl_admit['tot_enrolled'] - schl_admit['men_enrolled']
-                male_applied = schl_admit['men_applied'].astype(int).unique()[0]
-                male_admitted = schl_admit['men_admitted'].astype(int).unique()[0]
-                male_enrolled = schl_admit['men_enrolled'].astype(int).unique()[0]
-                female_applied = schl_admit['female_applied'].astype(int).unique()[0]
-                female_admitted = schl_admit['female_admitted'].astype(int).unique()[0]
-                female_enrolled = schl_admit['female_enrolled'].astype(int).unique()[0]
-                male_accept = schl_admit['accept_rate_men'].astype(int).unique()[0]
-                male_yield = schl_admit['yield_rate_men'].astype(int).unique()[0]
-                try:
-                    female_accept = schl_admit['accept_rate_women'].astype(int).unique()[0]
-                    female_yield = schl_admit['yield_rate_women'].astype(int).unique()[0]
-                except Exception:
-                    female_accept = 'NA'
-                    female_yield = 'NA'
-            else:
-                male_applied = male_admitted = male_enrolled = None
-                male_accept = male_yield = female_accept = female_yield = None
-            # Enrollment (UNDERGRAD) info
-            schl_enroll_ug = self.data['enrollment_undergrad'].loc[self.data['enrollment_undergrad']['id'] == schl]
-            if len(schl_enroll_ug) > 0:
-                totmen_enroll_ug = schl_enroll_ug['totmen'].astype(int).unique()[0]
-                totwomen_enroll_ug = schl_enroll_ug['totwomen'].astype(int).unique()[0]
-                totmen_share_ug = schl_enroll_ug['totmen_share'].astype(int).unique()[0]
-            else:
-                totmen_enroll_ug = totwomen_enroll_ug = totmen_share_ug = None
-            # Enrollment (GRAD) info
-            schl_enroll_g = self.data['enrollment_grad'].loc[self.data['enrollment_grad']['id'] == schl]
-            if len(schl_enroll_g) > 0:
-                totmen_enroll_g = schl_enroll_g['totmen'].astype(int).unique()[0]
-                totwomen_enroll_g = schl_enroll_g['totwomen'].astype(int).unique()[0]
-                totmen_share_g = schl_enroll_g['totmen_share'].astype(int).unique()[0]
-            else:
-                totmen_enroll_g = totwomen_enroll_g = totmen_share_g = None
-            # Graduation (ASSC) info
-            grad_2yr = self.data['graduation_two_year'].loc[self.data['graduation_two_year']['id'] == schl]
-            if len(grad_2yr) > 0:
-                totmen_grad_2yr = grad_2yr['totmen'].astype(int).unique()[0]
-                totmen_graduated_grad_2yr = grad_2yr['totmen_graduated'].astype(int).unique()[0]
-                totmen_grad_rate_2yr = grad_2yr['gradrate_totmen'].astype(int).unique()[0]
-                try:
-                    totwomen_grad_2yr = grad_2yr['totwomen'].astype(int).unique()[0]
-                    totwomen_graduated_grad_2yr = grad_2yr['totwomen_graduated'].astype(int).unique()[0]
-                    totwomen_grad_rate_2yr = grad_2yr['gradrate_totwomen'].astype(int).unique()[0]
-                except Exception:
-                    totwomen_grad_2yr = totwomen_graduated_grad_2yr = totwomen_grad_rate_2yr = 'NA'
-            else:
-                totmen_grad_2yr = totmen_graduated_grad_2yr = totmen_grad_rate_2yr = None
-                totwomen_grad_2yr = totwomen_graduated_grad_2yr = totwomen_grad_rate_2yr = None
-            # Graduation (BACH) info
-            grad_4yr = self.data['graduation_four_year'].loc[self.data['graduation_four_year']['id'] == schl]
-            if len(grad_4yr) > 0:
-                totmen_grad_4yr = grad_4yr['totmen'].astype(int).unique()[0]
-                totmen_graduated_grad_4yr = grad_4yr['totmen_graduated'].astype(int).unique()[0]
-                totmen_grad_rate_4yr = grad_4yr['gradrate_totmen'].astype(int).unique()[0]
-                try:
-                    totwomen_grad_4yr = grad_4yr['totwomen'].astype(int).unique()[0]
-                    totwomen_graduated_grad_4yr = grad_4yr['totwomen_graduated'].astype(int).unique()[0]
-                    totwomen_grad_rate_4yr = grad_4yr['gradrate_totwomen'].astype(int).unique()[0]
-                except Exception:
-                    totwomen_grad_4yr = totwomen_graduated_grad_4yr = totwomen_grad_rate_4yr = 'NA'
-            else:
-                totmen_grad_4yr = totmen_graduated_grad_4yr = totmen_grad_rate_4yr = None
-                totwomen_grad_4yr = totwomen_graduated_grad_4yr = totwomen_grad_rate_4yr = None
-            
-            self.data_dicts[schl] = {
-                'lat': lat,
-                'lon': lon,
-                'name': name,
-                'city': city,
-                'state': state,
-                'webaddr': webaddr,
-                'admit_men_app': male_applied, 'admit_men_admit': male_admitted, 'admit_men_enroll': male_enrolled,
-                'admit_women_app': female_applied, 'admit_women_admit': female_admitted, 'admit_women_enroll': female_enrolled,
-                'admit_accept_men': male_accept, 'admit_yield_men': male_yield, 'admit_accept_women': female_accept, 'admit_yield_women': female_yield,
-                'enroll_ug_men': totmen_enroll_ug, 'enroll_ug_women': totwomen_enroll_ug, 'enroll_ug_share': totmen_share_ug,
-                'enroll_g_men': totmen_enroll_g, 'enroll_g_women': totwomen_enroll_g, 'enroll_g_share': totmen_share_g,
-                'grad_2yr_men': totmen_grad_2yr, 'grad_2yr_mengrad': totmen_graduated_grad_2yr, 'grad_2yr_menrate': totmen_grad_rate_2yr, 
-                'grad_2yr_women': totwomen_grad_2yr, 'grad_2yr_womengrad': totwomen_graduated_grad_2yr, 'grad_2yr_womenrate': totwomen_grad_rate_2yr, 
-                'grad_4yr_men': totmen_grad_4yr, 'grad_4yr_mengrad': totmen_graduated_grad_4yr, 'grad_4yr_menrate': totmen_grad_rate_4yr,
-                'grad_4yr_women': totwomen_grad_4yr, 'grad_4yr_womengrad': totwomen_graduated_grad_4yr, 'grad_4yr_womenrate': totwomen_grad_rate_4yr
+            rec = self.index.get(schl)
+            if rec is None:
+                print(f'{schl} not found in {self.index.year} school index, skipping')
+                continue
+            dat = {
+                'lat': rec.lat,
+                'lon': rec.lon,
+                'name': self.schools[schl],    # custom names from google sheet
+                'city': rec.city,
+                'state': rec.state,
+                'webaddr': rec.webaddr,
+                'peer': PEER_LABELS[self.peer],
+                'trends': self.styles.hoist(''.join(LMLABEL_TREND_ITEM.format(label=SPARK_METRICS[m][0], svg=svg)
+                                                    for m,svg in self.sparklines.get(schl, {}).items() if svg))
             }
+            dat['has_trends'] = dat['trends'] != ''
+            # Admissions, Enrollment and Graduation info; None where a value is missing
+            for label,prefix in SECTION_PREFIXES.items():
+                fields = surveys[label].record(schl)
+                dat[f'has_{prefix}'] = fields is not None
+                for field in LANDING_SCHEMAS[label].fields:
+                    dat[f'{prefix}_{field}'] = None if fields is None else fields[field]
+                    if field.endswith('_pct'):
+                        dat[f'has_{prefix}_{field}'] = dat[f'{prefix}_{field}'] is not None
+            self.data_dicts[schl] = dat
     
     def build_labels(self) -> None:
         '''build school labels'''
         for schl,data in self.data_dicts.items():
-            lab = ''
-            lab += LMLABEL_HEAD.format(name=data['name'],
-                                       city=data['city'],
-                                       state=data['state'],
-                                       webaddr=data['webaddr'])
-            if data['admit_men_app']:
-                lab += LMLABEL_ADMISSIONS.format(name=data['name'],
-                                                 male_applied=data['admit_men_app'],
-                                                 male_admitted=data['admit_men_admit'],
-                                                 male_enrolled=data['admit_men_enroll'],
-                                                 female_applied=data['admit_women_app'],
-                                                 female_admitted=data['admit_women_admit'],
-                                                 female_enrolled=data['admit_women_enroll'],
-                                                 male_accept=data['admit_accept_men'],
-                                                 male_yield=data['admit_yield_men'],
-                                                 female_accept=data['admit_accept_women'],
-                                                 female_yield=data['admit_yield_women'])
-            if data['enroll_ug_men']:
-                lab += LMLABEL_ENROLL_UNDERGRAD.format(totmen_enroll=data['enroll_ug_men'],
-                                                       totwomen_enroll=data['enroll_ug_women'],
-                                                       totmen_share=data['enroll_ug_share'])
-            if data['enroll_g_men']:
-                lab += LMLABEL_ENROLL_GRAD.format(totmen_enroll=data['enroll_g_men'],
-                                                       totwomen_enroll=data['enroll_g_women'],
-                                                       totmen_share=data['enroll_g_share'])
-            if data['grad_2yr_men']:
-                lab += LMLABEL_GRADUATION_ASSC.format(totmen=data['grad_2yr_men'],
-                                                      totmen_graduated=data['grad_2yr_mengrad'],
-                                                      gradrate_men=data['grad_2yr_menrate'],
-                                                      totwomen=data['grad_2yr_women'],
-                                                      totwomen_graduated=data['grad_2yr_womengrad'],
-                                                      gradrate_women=data['grad_2yr_womenrate'])
-            if data['grad_4yr_men']:
-                lab += LMLABEL_GRADUATION_BACH.format(totmen=data['grad_4yr_men'],
-                                                      totmen_graduated=data['grad_4yr_mengrad'],
-                                                      gradrate_men=data['grad_4yr_menrate'],
-                                                      totwomen=data['grad_4yr_women'],
-                                                      totwomen_graduated=data['grad_4yr_womengrad'],
-                                                      gradrate_women=data['grad_4yr_womenrate'])
-            lab += '<div style="font-size:14px;color:white">_____________________________________________________________________</div></div></html>'
-            self.labels[schl] = lab
+            data = {k: _display(k,v) for k,v in data.items()}
+            lab = ''.join(template.format(**data) for flag,template in LABEL_SECTIONS
+                          if flag is None or data[flag])
+            self.labels[schl] = self.styles.hoist(minify_html(lab))
+
+
+    def year_blob(self) -> Dict[str,list]:
+        '''returns compact per-school popup values, in label_fields() order, for client-side labels'''
+        fields = self.label_fields()
+        return {schl: [0 if v is None and k.startswith('has_') else _display(k,v)
+                       for k,v in ((k,data[k]) for k in fields)]
+                for schl,data in self.data_dicts.items()}
+
+
+    @staticmethod
+    def label_fields() -> List[str]:
+        '''data dict keys that vary by year'''
+        fields = []
+        for flag,template in LABEL_SECTIONS:
+            if flag is not None and flag not in HEADER_KEYS:
+                fields.append(flag)
+            fields.extend(k for k in _placeholders(template) if k not in HEADER_KEYS and k not in fields)
+        return fields
+
     
-    def build_map(self) -> None:
-        '''builds folium map'''
-        fg = folium.FeatureGroup()
+    def build_map(self,
+                  years: Optional[Dict[int,Dict[str,list]]] = None,
+                  filename: str = 'landing_map.html') -> None:
+        '''
+        builds folium map
+
+        :param years: year -> year_blob() of that year; adds a year selector that re-renders popups client-side
+        :param filename: output file name in map/ under the output root
+        '''
+        ids = StableIds(filename,self.deterministic)
+        fg = ids.assign(folium.FeatureGroup())
         fg.add_to(self.map)
-        search_bar = folium.plugins.Search(layer=fg,
-                                           search_label='name',
-                                           placeholder='Search by HEMAC school name/location',
-                                           color='#06474D')
-        search_bar.add_to(self.map)
-        for schl in self.schools.keys():
+        markers = {}
+        for schl in self.data_dicts.keys():
             lab = self.labels[schl]
             dat = self.data_dicts[schl]
             mkr = folium.Marker(
                 location=[dat['lat'],dat['lon']],
                 popup=lab,
-                tooltip=folium.Tooltip(text=f"<b>{dat['name']}</b><br>({dat['city']}, {dat['state']})",
-                                       style='color:#001A50;font-family:Source Sans Pro;font-size:13px;text-align:center;'),
+                tooltip=folium.Tooltip(text=self.styles.hoist(
+                    f'<div style="{TOOLTIP_STYLE}"><b>{dat["name"]}</b><br>({dat["city"]}, {dat["state"]})</div>')),
                 icon=folium.plugins.BeautifyIcon(icon_shape='marker',
-                                       icon='institution',
-                                       text_color="white",
-                                       border_width=0,
-                                       background_color="#001950B1"),
-                name=dat['name']
+                                                 icon='institution',
+                                                 text_color="white",
+                                                 border_width=0,
+                                                 background_color="#001950B1")
             )
+            ids.assign(mkr,schl)    # a school's element ids don't depend on the other schools
             mkr.add_to(fg)
-        self.map.save(os.path.join('docs','map','landing_map.html'))
-    
-
+            markers[schl] = mkr.get_name()
+        index = build_search_index([(d['name'],d['city'],d['state']) for d in self.data_dicts.values()],
+                                   list(markers.values()))
+        self.map.get_root().html.add_child(folium.Element(search_control(index,self.map.get_name())))
+        if years is not None:
+            self.map.get_root().html.add_child(folium.Element(self.year_selector(years,markers)))
+        self.map.get_root().header.add_child(folium.Element(self.styles.stylesheet()))
+        if self.sparklines:
+            self.map.get_root().header.add_child(folium.Element(f'<style>{SPARK_CSS}</style>'))
+        page = minify_html(self.map.get_root().render())
+        self.output.write(self.output.path('map',filename), page)
 
 
+    def year_selector(self,
+                      years: Dict[int,Dict[str,list]],
+                      markers: Dict[str,str]) -> str:
+        '''returns year selector control and script that swaps popup content from per-year data blobs'''
+        headers = {schl: {k: dat[k] for k in HEADER_KEYS if k not in ('lat','lon')} for schl,dat in self.data_dicts.items()}
+        blob = {
+            'fields': self.label_fields(),
+            'headers': headers,
+            'sections': [[flag, self.styles.hoist(minify_html(template))] for flag,template in LABEL_SECTIONS],
+            'markers': markers,
+            'years': {str(y): vals for y,vals in years.items()}
+        }
+        options = ''.join(f'<option value="{y}"{" selected" if y == max(years) else ""}>{y}</option>'
+                          for y in sorted(years, reverse=True))
+        return YEAR_SELECT.format(options=options,
+                                  blob=json.dumps(blob, separators=(',',':')))
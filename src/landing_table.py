@@ -1,34 +1,61 @@
 import os
-from typing import Dict
+from typing import Dict, List, Optional, Union
+import html
 import json
 
 import pandas as pd
 
 from genpeds import Enrollment
 
+from assets import TABLE_CSS, TABLE_JS, asset_tags
+from filter_cube import LEVEL_LABELS, build_cube
+from html_min import minify_html
+from rankings import PEER_LABELS, add_percentiles
+from school_index import SchoolIndex
+from sparklines import SPARK_CSS
+from output_sink import OutputTarget
+from survey_loader import SurveyLoad, load_surveys
+from utils import TABLE_FACETS, TABLE_FACETS_JS
+
+
+FACETS = {'state': 'State', 'sector': 'Sector', 'level': 'Level'}   # cube facet -> table column
+
 
 class LandingTable:
     '''HEMAC partners landing table'''
     def __init__(self,
                  schools: Dict[str,str],
-                 most_recent_year: int = 2023):
+                 most_recent_year: int = 2023,
+                 data: Optional[pd.DataFrame] = None,
+                 index: Optional[SchoolIndex] = None,
+                 peer: str = 'national',
+                 sparklines: Optional[Dict[str,Dict[str,str]]] = None,
+                 output: Optional[OutputTarget] = None,
+                 merged: bool = False):
         '''
         Build HEMAC landing page table of partner schools
         
         :param schools: dict of partner school "ID: Name" key-value pairs
         :param most_recent_year: most recent year of data; defaults to 2023
+        :param data: enrollment data covering the year, as returned by load_data; loaded if not given;
+            the filter cube covers the years of the table's rows
+        :param index: school metadata index for name, city and state; loaded for most_recent_year if not given
+        :param peer: peer group of the male enrollment share percentile; 'national', 'sector' or 'state'; must match data
+        :param sparklines: school id -> trend SVGs from sparklines.build_sparklines; adds a Trend column of the level's male share
+        :param output: output root and sink the table is written to; docs/ if not given
+        :param merged: data already carries the index metadata, see merge_meta; lets several years' tables share one merge
         '''
         SCHOOL_IDS = schools.keys()
-        dat_l = []
-        for lev in ['undergrad', 'grad']:
-            df = Enrollment(year_range=most_recent_year).run(student_level=lev,
-                                                             see_progress=False,
-                                                             merge_with_char=True,
-                                                             rm_disk=False)
-            df = df.loc[df['id'].isin(SCHOOL_IDS)]
-            df['name'] = df['id'].map(schools)
-            dat_l.append(df)
-        dat = pd.concat(dat_l, ignore_index=True)
+        if data is None:
+            data = self.load_data(schools,most_recent_year,peer)
+        self.peer = peer
+        self.sparklines = sparklines
+        self.output = output if output is not None else OutputTarget()
+        self.most_recent_year = most_recent_year
+        if not merged:
+            data = self.merge_meta(data,schools,index if index is not None else SchoolIndex.load(most_recent_year))
+        self.cube_data = data   # every loaded year, aggregated by build_cube
+        dat = data.loc[data['year'] == most_recent_year]
 
         schl_dat_l = []
         for id_ in SCHOOL_IDS:
@@ -41,23 +68,132 @@ class LandingTable:
                 schl_dat_l.append(d)
         schl_dat = pd.concat(schl_dat_l, ignore_index=True)
         self.school_data = schl_dat
+
+
+    @staticmethod
+    def load_data(schools: Dict[str,str],
+                  year_range: Union[int,List[int]],
+                  peer: str = 'national') -> pd.DataFrame:
+        '''
+        loads partner schools' undergraduate and graduate enrollment for one year or a list of years,
+        with the peer percentile of male enrollment share within each level; Characteristics is merged
+        in for the sector facet and sector/state peers
+
+        :param schools: dict of partner school "ID: Name" key-value pairs
+        :param year_range: single year or list of years
+        :param peer: peer group for percentiles; 'national', 'sector' or 'state'
+        '''
+        return LandingTable.prepare(schools, load_surveys(LandingTable.surveys(year_range)), peer)
+
+
+    @staticmethod
+    def surveys(year_range: Union[int,List[int]]) -> Dict[str,SurveyLoad]:
+        '''
+        survey loads behind load_data, labelled as in LandingMap.surveys; with Characteristics merged,
+        they can stand in for the map's enrollment loads at any peer group
+        '''
+        return {f'enrollment_{lev}': SurveyLoad(Enrollment,year_range,lev,merge_with_char=True)
+                for lev in ['undergrad', 'grad']}
+
+
+    @staticmethod
+    def prepare(schools: Dict[str,str],
+                surveys: Dict[str,pd.DataFrame],
+                peer: str = 'national') -> pd.DataFrame:
+        '''
+        ranks national enrollment frames and keeps the partner schools' rows, as load_data does after loading
+
+        :param surveys: label -> national frame, with at least the labels of surveys(); other labels are ignored
+        '''
+        dat_l = [add_percentiles(surveys[f'enrollment_{lev}'],['totmen_share'],peer) for lev in ['undergrad', 'grad']]
+        dat_l = [df.loc[df['id'].isin(schools.keys())] for df in dat_l]
+        return pd.concat(dat_l, ignore_index=True)
     
 
-    def build_table(self) -> None:
-        '''generate landing table'''
+    @staticmethod
+    def merge_meta(data: pd.DataFrame,
+                   schools: Dict[str,str],
+                   index: SchoolIndex) -> pd.DataFrame:
+        '''replaces the load's Characteristics columns with the school index's name, city, state and sector'''
+        meta = index.frame(schools)
+        data = data.drop(columns=[c for c in meta.columns if c != 'id'], errors='ignore')
+        return data.merge(meta, on='id', how='left')
+
+
+    def build_rows(self) -> pd.DataFrame:
+        '''returns table rows with display column names and formatting'''
         COLS2KEEP = {
             'name': 'School',
             'city': 'City',
             'state': 'State',
+            'sector': 'Sector',
             'studentlevel': 'Level',
-            'totmen_share': 'MenEnrolled'
+            'totmen_share': 'MenEnrolled',
+            'totmen_share_pct': 'Percentile'
         }
+        if 'sector' not in self.school_data.columns:     # data loaded without Characteristics
+            del COLS2KEEP['sector']
         dat = self.school_data.copy().reindex(columns=COLS2KEEP.keys())
         dat = dat.rename(columns=COLS2KEEP)
+        if self.sparklines is not None:
+            metric = self.school_data['studentlevel'].map({'undergrad': 'share_ug', 'grad': 'share_g'})
+            dat['Trend'] = [self.sparklines.get(id_, {}).get(m, '')
+                            for id_,m in zip(self.school_data['id'], metric)]
+
+        dat['Level'] = dat['Level'].map(LEVEL_LABELS)
+        dat['MenEnrolled'] = dat['MenEnrolled'].map(lambda v: '' if pd.isna(v) else f'{int(v)}%')   # one bad row doesn't sink the table
+        dat['Percentile'] = dat['Percentile'].map(lambda p: '' if pd.isna(p) else f'{p:.0f}')
+        return dat
+
+
+    def build_table(self,
+                    years: Optional[Dict[int,pd.DataFrame]] = None,
+                    filename: str = 'landing_table.html') -> None:
+        '''
+        generate landing table
 
-        dat['Level'] = dat['Level'].map({'undergrad': 'Undergraduate', 'grad': 'Graduate'})
-        dat['MenEnrolled'] = dat['MenEnrolled'].astype(int).astype(str) + '%'
+        :param years: year -> build_rows() of that year; adds a year selector that swaps rows client-side
+        :param filename: output file name in table/ under the output root; the filter cube is written
+            next to it as <name>.cube.json
+        '''
+        dat = _escape_text(self.build_rows())
+        year_select = year_js = trend_js = trend_defs = ''
+        if years is not None:
+            years = {y: _escape_text(rows) for y,rows in years.items()}
+            if 'Trend' in dat.columns:
+                # each SVG once in the page; year rows carry a short key that the Trend column renders
+                svgs = sorted({svg for rows in years.values() for svg in rows['Trend'] if svg})
+                keys = {svg: f't{i}' for i,svg in enumerate(svgs)}
+                years = {y: rows.assign(Trend=rows['Trend'].map(lambda svg: keys.get(svg, ''))) for y,rows in years.items()}
+                trend_js = f'const trends = {json.dumps({k: svg for svg,k in keys.items()}, separators=(",",":"))};'
+                trend_defs = (f'columnDefs: [{{ targets: {dat.columns.get_loc("Trend")}, '
+                              'render: function (d) { return trends[d] || d; } }],')
+            options = ''.join(f'<option value="{y}"{" selected" if y == max(years) else ""}>{y}</option>'
+                              for y in sorted(years, reverse=True))
+            year_select = f'<label for="hemac_year"><b>Year</b></label> <select id="hemac_year">{options}</select>'
+            blob = json.dumps({str(y): rows.values.tolist() for y,rows in years.items()}, separators=(',',':'))
+            year_js = (f'const years = {blob};\n'
+                       "$('#hemac_year').on('change', function () { table.clear().rows.add(years[this.value]).draw(); });")
+        page_dir = self.output.path('table')
+        # gender counts by state x sector x level x year, summed client-side for the selected facets
+        cube = build_cube(self.cube_data.loc[self.cube_data['year'].isin(list(years) if years is not None else [self.most_recent_year])])
+        cube_name = f'{os.path.splitext(filename)[0]}.cube.json'
+        self.output.write(os.path.join(page_dir,cube_name), json.dumps(cube, separators=(',',':')))
+        facet_cols = {f: c for f,c in FACETS.items() if f in cube['dims']}
+        selects = ' '.join(
+            f'<label for="hemac_{f}"><b>{c}</b></label> <select class="hemac-facet" id="hemac_{f}" data-facet="{f}">'
+            '<option value="">All</option>'
+            + ''.join(f'<option value="{html.escape(str(v))}">{html.escape(str(v))}</option>' for v in cube['dims'][f])
+            + '</select>'
+            for f,c in facet_cols.items())
+        facets = TABLE_FACETS.format(selects=selects)
+        facet_js = TABLE_FACETS_JS.format(columns=json.dumps({f: dat.columns.get_loc(c) for f,c in facet_cols.items()
+                                                              if c in dat.columns}),
+                                          cube=cube_name)
+        peer_note = (f'<p><small><b>Percentile</b>: share of {PEER_LABELS[self.peer]} '
+                     'with a lower male enrollment share at the same student level</small></p>')
         dat_html = dat.to_html(index=False,
+                               escape=False,
                                table_id='hemac_schools',
                                classes='cell-border display compact hover table table-striped')
 
@@ -68,19 +204,8 @@ class LandingTable:
                         <meta charset="UTF-8">
                         <title>HEMAC Schools</title>
 
-                        <!-- Bootstrap CSS -->
-                        <link
-                            href="https://cdnjs.cloudflare.com/ajax/libs/twitter-bootstrap/5.3.0/css/bootstrap.min.css"
-                            rel="stylesheet"
-                            integrity="sha384-…"
-                            crossorigin="anonymous"
-                        />
-
-                        <!-- DataTables + Buttons CSS -->
-                        <link
-                            href="https://cdn.datatables.net/v/bs5/dt-2.3.1/r-3.0.4/b-3.2.3/b-html5-3.2.3/b-print-3.2.3/datatables.min.css"
-                            rel="stylesheet"
-                        />
+                        <!-- Bootstrap + DataTables CSS -->
+                        {asset_tags(TABLE_CSS, page_dir, self.output.asset_root)}
                         <style>
                             /* ==== Pagination ==== */
                             .dataTables_wrapper .dataTables_paginate .pagination .page-item.active .page-link {{
@@ -145,32 +270,23 @@ class LandingTable:
                                 border-color: #333333 !important;
                                 color: #666666 !important;
                             }}
+                            {SPARK_CSS if 'Trend' in dat.columns else ''}
                         </style>
                         </head>
                         <body class="p-4">
+                        {year_select}
+                        {facets}
+                        {peer_note}
                         {dat_html}
 
                         <!-- JS dependencies at end for faster load -->
-                        <script
-                            src="https://code.jquery.com/jquery-3.7.0.min.js"
-                            integrity="sha256-…"
-                            crossorigin="anonymous">
-                        </script>
-                        <script
-                            src="https://cdnjs.cloudflare.com/ajax/libs/twitter-bootstrap/5.3.0/js/bootstrap.bundle.min.js"
-                            integrity="sha384-…"
-                            crossorigin="anonymous">
-                        </script>
-                        <script
-                            src="https://cdn.datatables.net/v/bs5/dt-2.3.1/b-3.2.3/b-html5-3.2.3/b-print-3.2.3/datatables.min.js">
-                        </script>
-                        <script src="https://cdnjs.cloudflare.com/ajax/libs/pdfmake/0.2.7/pdfmake.min.js"></script>
-                        <script src="https://cdnjs.cloudflare.com/ajax/libs/pdfmake/0.2.7/vfs_fonts.js"></script>
-                        <script src="https://cdnjs.cloudflare.com/ajax/libs/jszip/3.10.1/jszip.min.js"></script>
+                        {asset_tags(TABLE_JS, page_dir, self.output.asset_root)}
 
                         <script>
                         $(function () {{
-                            $('#hemac_schools').DataTable({{
+                            {trend_js}
+                            const table = $('#hemac_schools').DataTable({{
+                                {trend_defs}
                                 dom: 'Bfrtip',
                                 language: {{
                                         search: "",                       
@@ -184,11 +300,18 @@ class LandingTable:
                                 responsive: true,
                                 scrollY: true
                             }});
+                            {year_js}
+                            {facet_js}
                             }});
                         </script>
                         </body>
                     </html>
 '''
-        with open(os.path.join('docs','table','landing_table.html'),'w') as lt_html:
-            lt_html.write(dataTable)
-        
\ No newline at end of file
+        self.output.write(os.path.join(page_dir,filename), minify_html(dataTable))
+        
+
+
+def _escape_text(rows: pd.DataFrame) -> pd.DataFrame:
+    '''escapes free-text columns of table rows, which are written as HTML alongside the Trend SVGs'''
+    return rows.assign(**{c: rows[c].map(lambda v: html.escape(v) if isinstance(v, str) else v)
+                          for c in ['School', 'City', 'State', 'Sector'] if c in rows.columns})
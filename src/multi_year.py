@@ -0,0 +1,68 @@
+from typing import Dict, List, Optional
+
+from landing_map import LandingMap
+from landing_table import LandingTable
+from output_sink import OutputTarget
+from school_index import SchoolIndex
+from survey_loader import load_surveys
+
+
+class MultiYearLanding:
+    '''HEMAC landing map and table for several years, built from one load of each survey'''
+    def __init__(self,
+                 schools: Dict[str,str],
+                 years: List[int],
+                 peer: str = 'national',
+                 sparklines: Optional[Dict[str,Dict[str,str]]] = None,
+                 output: Optional[OutputTarget] = None):
+        '''
+        :param schools: dict of partner school "ID: Name" key-value pairs
+        :param years: years to build; the most recent is shown by default
+        :param peer: peer group of percentiles; 'national', 'sector' or 'state'
+        :param sparklines: school id -> trend SVGs from sparklines.build_sparklines, for popups and table rows
+        :param output: output root and sink of the map and table; docs/ if not given
+        :raises ValueError: if years is empty
+        '''
+        if not years:
+            raise ValueError('MultiYearLanding needs at least one year')
+        self.schools = schools
+        self.years = sorted(years)
+        self.most_recent_year = self.years[-1]
+        self.peer = peer
+        self.sparklines = sparklines
+        self.output = output if output is not None else OutputTarget()
+        # one download/parse per survey for all years, sliced per year below; the table's enrollment
+        # loads carry Characteristics, so they also serve the map
+        surveys = load_surveys({**LandingMap.surveys(self.years,peer), **LandingTable.surveys(self.years)})
+        self.map_data = LandingMap.prepare(schools,surveys,peer)
+        self.index = SchoolIndex.load(self.most_recent_year)    # header info from the latest year
+        # merged with the index once for all years; each year's table slices its rows
+        self.table_data = LandingTable.merge_meta(LandingTable.prepare(schools,surveys,peer),schools,self.index)
+        self.errors = []    # per-school failures across the years' maps
+
+
+    def _map_data_for(self, year: int) -> Dict:
+        return {label: df.loc[df['year'] == year] for label,df in self.map_data.items()}
+
+
+    def build_map(self, filename: str = 'landing_map_years.html') -> None:
+        '''builds landing map with popups for the most recent year and a selector for the others'''
+        blobs = {}
+        for year in self.years:
+            lm = LandingMap(self.schools,year,data=self._map_data_for(year),index=self.index,peer=self.peer,
+                            sparklines=self.sparklines,output=self.output)
+            lm.build_data_dicts()
+            blobs[year] = lm.year_blob()
+            self.errors.extend(dict(e, year=year) for e in lm.errors)
+        lm.build_labels()   # lm is the most recent year
+        lm.build_map(years=blobs, filename=filename)
+
+
+    def build_table(self, filename: str = 'landing_table_years.html') -> None:
+        '''builds landing table with rows for the most recent year and a selector for the others'''
+        rows = {}
+        for year in self.years:
+            lt = LandingTable(self.schools,year,data=self.table_data,index=self.index,peer=self.peer,
+                              sparklines=self.sparklines,output=self.output,merged=True)
+            rows[year] = lt.build_rows()
+        lt.build_table(years=rows, filename=filename)
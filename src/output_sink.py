@@ -0,0 +1,250 @@
+import abc
+import gzip
+import hashlib
+import io
+import json
+import os
+import tarfile
+import threading
+import zipfile
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import plotly.graph_objects as go
+
+from assets import asset_src
+from page_budget import BUDGETS_PATH, OUTPUT_ROOT, is_output_page, page_stats, report_violations, summarize_outputs
+from stable_output import stable_id, write_if_changed
+from utils import THEME
+
+
+ARCHIVE_FORMATS = {'.tar.gz': 'tar.gz', '.tgz': 'tar.gz', '.zip': 'zip'}
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)   # earliest zip timestamp; fixed so archives are byte-stable
+
+
+class Sink(abc.ABC):
+    '''
+    destination of generated pages; usable as a context manager that closes the sink when
+    the block completes and aborts it if the block raises
+    '''
+    @abc.abstractmethod
+    def write(self,
+              path: str,
+              content: Union[str,bytes]) -> bool:
+        '''writes one page at path under the output root; returns whether anything changed'''
+
+
+    def close(self) -> None:
+        pass
+
+
+    def abort(self) -> None:
+        pass
+
+
+    def __enter__(self) -> 'Sink':
+        return self
+
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class DirectorySink(Sink):
+    '''writes generated pages as files under the output root, skipping unchanged files'''
+    def write(self,
+              path: str,
+              content: Union[str,bytes]) -> bool:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        return write_if_changed(path, content)
+
+
+class MemorySink(Sink):
+    '''collects generated pages in memory, e.g. in worker processes feeding an archive in the parent'''
+    def __init__(self):
+        self.files: List[Tuple[str,bytes]] = []
+
+
+    def write(self,
+              path: str,
+              content: Union[str,bytes]) -> bool:
+        self.files.append((path, content.encode('utf-8') if isinstance(content, str) else content))
+        return True
+
+
+class ArchiveSink(Sink):
+    '''
+    streams generated pages straight into one tar.gz or zip archive, with the output manifest as its last member
+
+    members are named by their path relative to the output root and carry fixed timestamps, so
+    identical builds produce identical archives; nothing is written under the output root
+    '''
+    def __init__(self,
+                 path: str,
+                 root: str = OUTPUT_ROOT,
+                 include: Iterable[str] = ('assets',),
+                 budgets_path: str = BUDGETS_PATH,
+                 strict_budgets: bool = False):
+        '''
+        :param path: archive to write; format taken from its extension (.tar.gz, .tgz or .zip)
+        :param root: output root that page paths are relative to
+        :param include: directories under root copied into the archive on close, e.g. vendored assets
+        :param budgets_path: page budgets checked against the archived pages
+        :param strict_budgets: raise on close instead of warn when a page is over budget
+        :raises ValueError: if the extension is not a supported archive format
+        '''
+        fmt = next((f for ext,f in ARCHIVE_FORMATS.items() if path.endswith(ext)), None)
+        if fmt is None:
+            raise ValueError(f'unsupported archive {path!r}; expected one of {sorted(ARCHIVE_FORMATS)}')
+        self.path = path
+        self.root = root
+        self.include = list(include)
+        self.budgets_path = budgets_path
+        self.strict_budgets = strict_budgets
+        self.digests: Dict[str,str] = {}
+        self.pages: Dict[str,Dict[str,int]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if fmt == 'zip':
+            self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+            self._tar = None
+        else:
+            self._file = open(path, 'wb')
+            self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self._file, compresslevel=9, mtime=0)
+            self._tar = tarfile.open(fileobj=self._gzip, mode='w', format=tarfile.PAX_FORMAT)
+            self._zip = None
+
+
+    def _add(self, name: str, data: bytes) -> None:
+        if self._zip is not None:
+            info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            self._tar.addfile(info, io.BytesIO(data))
+
+
+    def write(self,
+              path: str,
+              content: Union[str,bytes]) -> bool:
+        '''
+        adds a page to the archive
+
+        :raises ValueError: if the path is outside the output root, or was already added with other content
+        '''
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        name = os.path.relpath(path, self.root).replace(os.sep, '/')
+        if name.startswith('../'):
+            raise ValueError(f'{path} is outside the output root {self.root}')
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if name in self.digests:
+                if self.digests[name] != digest:
+                    raise ValueError(f'{name} written twice with different content')
+                return False
+            self._add(name, data)
+            self.digests[name] = digest
+            if is_output_page(name):
+                self.pages[name] = page_stats(data)
+        return True
+
+
+    def close(self) -> None:
+        '''adds included directories and the manifest, checks page budgets and finishes the archive'''
+        for rel_dir in self.include:
+            for dirpath,_,files in sorted(os.walk(os.path.join(self.root, rel_dir))):
+                for fname in sorted(files):
+                    with open(os.path.join(dirpath, fname),'rb') as f:
+                        self.write(os.path.join(dirpath, fname), f.read())
+        document, violations = summarize_outputs(self.pages, budgets_path=self.budgets_path)
+        document['files'] = dict(sorted(self.digests.items()))
+        self._add('manifest.json', json.dumps(document, indent=1, sort_keys=True).encode('utf-8'))
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+            self._gzip.close()
+            self._file.close()
+        print(f'wrote {len(self.digests)} files to {self.path}')
+        report_violations(violations, self.strict_budgets)
+
+
+    def abort(self) -> None:
+        '''closes and removes a partly written archive'''
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+            self._gzip.close()
+            self._file.close()
+        os.remove(self.path)
+
+
+class OutputTarget:
+    '''
+    where one build's pages go: an output root, the sink writing under it, and the vendored assets pages link to
+
+    generators write only through their target, so builds with different targets can run side by side
+    '''
+    def __init__(self,
+                 root: str = OUTPUT_ROOT,
+                 sink: Optional[Sink] = None,
+                 asset_root: Optional[str] = None):
+        '''
+        :param root: output root, e.g. 'docs' or a staging tree
+        :param sink: writes the pages; a DirectorySink if not given
+        :param asset_root: vendored assets linked from pages; defaults to assets/ under root
+        '''
+        self.root = root
+        self.sink = sink if sink is not None else DirectorySink()
+        self.asset_root = asset_root if asset_root is not None else os.path.join(root, 'assets')
+
+
+    def path(self, *parts: str) -> str:
+        '''returns a path under the output root'''
+        return os.path.join(self.root, *parts)
+
+
+    def write(self,
+              path: str,
+              content: Union[str,bytes]) -> bool:
+        '''writes a generated page to the sink'''
+        return self.sink.write(path, content)
+
+
+def write_figure(fig: go.Figure,
+                 output: OutputTarget,
+                 out_path_dir: str,
+                 name: str,
+                 theme: go.layout.Template = THEME,
+                 standalone: bool = False) -> str:
+    '''
+    writes figure as JSON under out_path_dir, for pages that lazy-load it; returns figure name
+
+    unchanged files are not rewritten
+
+    :param output: target the figure is written through
+    :param theme: plotly template applied to the figure
+    :param standalone: also write the figure as its own page, with a div id derived from the output path
+    '''
+    fig.update_layout(template=theme)
+    output.write(os.path.join(out_path_dir,f'{name}.json'), fig.to_json())
+    if standalone:
+        html = fig.to_html(auto_play=False,
+                           include_plotlyjs=asset_src('plotly',out_path_dir,output.asset_root),
+                           div_id=stable_id(out_path_dir.replace(os.sep,'/'),name))
+        output.write(os.path.join(out_path_dir,f'{name}.html'), html)
+    return name
+
+
+def archive_sink(path: Optional[str],
+                 strict_budgets: bool = False,
+                 root: str = OUTPUT_ROOT) -> Sink:
+    '''returns an ArchiveSink for path, or a DirectorySink if path is None'''
+    return DirectorySink() if path is None else ArchiveSink(path, root, strict_budgets=strict_budgets)
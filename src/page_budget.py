@@ -0,0 +1,154 @@
+import argparse
+import fnmatch
+import glob
+import gzip
+import json
+import os
+import warnings
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+
+OUTPUT_ROOT = 'docs'
+OUTPUT_PATTERNS = ('map/*.html', 'table/*.html', 'table/*.json', 'schools/*/*.html', 'schools/*/*.json',
+                   'rollup/*.html', 'rollup/*.json')
+MANIFEST_PATH = os.path.join(OUTPUT_ROOT, 'manifest.json')
+BUDGETS_PATH = os.path.join('data', 'page_budgets.json')
+
+
+class _ElementCounter(HTMLParser):
+    '''counts start tags, and script tags separately'''
+    def __init__(self):
+        super().__init__()
+        self.elements = 0
+        self.scripts = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.elements += 1
+        if tag == 'script':
+            self.scripts += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.elements += 1
+
+
+def page_stats(content: bytes) -> Dict[str,int]:
+    '''returns bytes, gzip bytes and element counts of a generated page'''
+    counter = _ElementCounter()
+    counter.feed(content.decode('utf-8', errors='replace'))
+    counter.close()
+    return {
+        'bytes': len(content),
+        'gzip_bytes': len(gzip.compress(content, compresslevel=9, mtime=0)),
+        'elements': counter.elements,
+        'scripts': counter.scripts
+    }
+
+
+def build_manifest(root: str = OUTPUT_ROOT) -> Dict[str,Dict[str,int]]:
+    '''returns page stats for every generated page under root, keyed by path relative to root'''
+    manifest = {}
+    for pattern in OUTPUT_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            with open(path,'rb') as page:
+                manifest[os.path.relpath(path, root).replace(os.sep, '/')] = page_stats(page.read())
+    return manifest
+
+
+def check_budgets(manifest: Dict[str,Dict[str,int]],
+                  budgets: Dict,
+                  previous: Optional[Dict[str,Dict[str,int]]] = None) -> List[str]:
+    '''
+    compares page stats against per-page budgets and, if given, a previous manifest
+
+    :param manifest: page stats keyed by relative path
+    :param budgets: {"pages": {glob: {stat: max}}, "max_growth": fraction}; first matching glob applies
+    :param previous: manifest of the last build, used to flag pages growing more than max_growth
+    :returns: human-readable budget violations, including pages no budget matches
+    '''
+    violations = []
+    max_growth = budgets.get('max_growth')
+    pages = budgets.get('pages', {})
+    for page,stats in manifest.items():
+        for pattern,limits in pages.items():
+            if fnmatch.fnmatch(page, pattern):
+                for stat,limit in limits.items():
+                    if stats.get(stat, 0) > limit:
+                        violations.append(f'{page}: {stat} {stats[stat]} exceeds budget {limit}')
+                break
+        else:
+            if pages:   # a new page type should get a budget rather than go unchecked
+                violations.append(f'{page}: no page budget matches')
+        if max_growth is not None and previous and page in previous:
+            before = previous[page]['gzip_bytes']
+            if before > 0 and (stats['gzip_bytes'] - before) / before > max_growth:
+                violations.append(f'{page}: gzip bytes grew from {before} to {stats["gzip_bytes"]} '
+                                  f'(over {max_growth:.0%})')
+    return violations
+
+
+def is_output_page(rel_path: str) -> bool:
+    '''whether a path relative to the output root is a generated page tracked in the manifest'''
+    return any(fnmatch.fnmatch(rel_path, pattern) for pattern in OUTPUT_PATTERNS)
+
+
+def summarize_outputs(manifest: Dict[str,Dict[str,int]],
+                      previous: Optional[Dict[str,Dict[str,int]]] = None,
+                      budgets_path: str = BUDGETS_PATH) -> Tuple[Dict,List[str]]:
+    '''
+    checks page stats against page budgets and the previous build
+
+    :returns: manifest document {"totals": ..., "pages": manifest} and budget violations
+    '''
+    budgets = {}
+    if os.path.exists(budgets_path):
+        with open(budgets_path,'r') as bj:
+            budgets = json.load(bj)
+    violations = check_budgets(manifest, budgets, previous)
+    totals = {stat: sum(s[stat] for s in manifest.values()) for stat in ('bytes','gzip_bytes')}
+    return {'totals': totals, 'pages': manifest}, violations
+
+
+def report_violations(violations: List[str],
+                      strict: bool = False) -> None:
+    '''
+    warns about budget violations, or raises if strict
+
+    :raises RuntimeError: if strict and any budget is exceeded
+    '''
+    if violations:
+        msg = f'{len(violations)} page budget violations:\n' + '\n'.join(violations)
+        if strict:
+            raise RuntimeError(msg)
+        warnings.warn(msg)
+
+
+def record_outputs(root: str = OUTPUT_ROOT,
+                   budgets_path: str = BUDGETS_PATH,
+                   strict: bool = False) -> List[str]:
+    '''
+    writes the output manifest and checks it against page budgets and the previous build
+
+    :param strict: raise instead of warn when a page is over budget
+    :raises RuntimeError: if strict and any budget is exceeded
+    '''
+    manifest_path = os.path.join(root, 'manifest.json')
+    previous = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path,'r') as mj:
+            previous = json.load(mj).get('pages')
+
+    document, violations = summarize_outputs(build_manifest(root), previous, budgets_path)
+    with open(manifest_path,'w') as mj:
+        json.dump(document, mj, indent=1, sort_keys=True)
+    report_violations(violations, strict)
+    return violations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='record generated page sizes and check page budgets')
+    parser.add_argument('--root', default=OUTPUT_ROOT)
+    parser.add_argument('--budgets', default=BUDGETS_PATH)
+    parser.add_argument('--strict', action='store_true', help='fail when a page is over budget')
+    args = parser.parse_args()
+    record_outputs(args.root, args.budgets, args.strict)
@@ -1,18 +1,60 @@
+import copy
+import functools
+import multiprocessing
 import os
-from typing import Dict
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
 import plotly.graph_objects as go
-import plotly.io as pio
 from genpeds import (
     Admissions, 
     Enrollment, 
     Graduation
 )
 
-from utils import THEME
+from assets import asset_src
+from checkpoint import Checkpoint, error_record
+from html_min import minify_html
+from output_sink import DirectorySink, MemorySink, OutputTarget, write_figure
+from rankings import context_bands
+from shared_frames import SharedFrames, publish_frames
+from sharding import shard_schools
+from survey_loader import SurveyLoad, load_surveys
+from utils import THEME, SCHOOL_PAGE
 
-pio.templates['THEME'] = THEME
-pio.templates.default='THEME'
+# metric plotted against the national/peer distribution for each subject
+CONTEXT_METRICS = {
+    'admissions': ('accept_rate_men', 'Male Acceptance Rate'),
+    'enrollment_undergrad': ('totmen_share', 'Male Enrollment Share'),
+    'enrollment_grad': ('totmen_share', 'Male Enrollment Share'),
+    'graduation_two_year': ('gradrate_totmen', 'Male Graduation Rate'),
+    'graduation_four_year': ('gradrate_totmen', 'Male Graduation Rate')
+}
+# plotly typed-array dtypes, smallest first
+COMPACT_INT_DTYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]
+
+
+def compact_values(values, decimals: int = 0) -> np.ndarray:
+    '''
+    rounds values to display precision and casts them to the smallest sufficient dtype
+
+    whole numbers without missing values become the smallest integer dtype that holds them, anything
+    else float32; plotly serializes the result as a base64 typed array
+
+    :param decimals: decimal places kept
+    '''
+    arr = np.round(pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float), decimals)
+    if len(arr) > 0 and decimals <= 0 and np.isfinite(arr).all():
+        for dtype in COMPACT_INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= arr.min() and arr.max() <= info.max:
+                return arr.astype(dtype)
+    return arr.astype(np.float32)
 
 
 class PlotGenerator:
@@ -20,39 +62,108 @@ class PlotGenerator:
 
     def __init__(self,
                  schools: Dict[str,str],
-                 most_recent_year: int = 2023):
+                 most_recent_year: int = 2023,
+                 context_peer: str = 'national',
+                 compact: bool = True,
+                 theme: go.layout.Template = THEME,
+                 output: Optional[OutputTarget] = None,
+                 standalone: bool = False):
         '''
         HEMAC school plot generator
         
         :param schools: dict of partner school "ID: Name" key-value pairs
         :param most_recent_year: most recent year of data; defaults to 2023
+        :param context_peer: distribution for national-context plots; 'national' (all IPEDS institutions) or 'sector' (school's IPEDS sector)
+        :param compact: serialize figures with compact typed arrays and customdata hover templates instead of full-precision floats and per-point hover strings
+        :param theme: plotly template of every figure
+        :param output: output root and sink of the school pages; docs/ if not given
+        :param standalone: also write each figure as its own HTML page, for sites that embed single figures
+        :raises ValueError: if context_peer is not 'national' or 'sector'
         '''
+        if context_peer not in ('national', 'sector'):
+            raise ValueError(f"context_peer must be 'national' or 'sector', not {context_peer!r}")
         SHORT_RANGE = [i for i in range(2003,most_recent_year+1,2)]    # year range for admissions and graduation    
         LONG_RANGE = [i for i in range(1993,most_recent_year+1,2)]    # year range for enrollment
 
-        admit = Admissions(SHORT_RANGE).run(False,True,False)
-        enroll_undergrad = Enrollment(LONG_RANGE).run('undergrad',False,True,False)
-        enroll_grad = Enrollment(LONG_RANGE).run('grad',False,True,False)
-        grad_two_year = Graduation(SHORT_RANGE).run('assc',False,True,False)
-        grad_four_year = Graduation(SHORT_RANGE).run('bach',False,True,False)
-
-        data = {
-            'admissions': admit,
-            'enrollment_undergrad': enroll_undergrad,
-            'enrollment_grad': enroll_grad,
-            'graduation_two_year': grad_two_year,
-            'graduation_four_year': grad_four_year
-        }
+        data = load_surveys({
+            'admissions': SurveyLoad(Admissions,SHORT_RANGE,merge_with_char=True),
+            'enrollment_undergrad': SurveyLoad(Enrollment,LONG_RANGE,'undergrad',merge_with_char=True),
+            'enrollment_grad': SurveyLoad(Enrollment,LONG_RANGE,'grad',merge_with_char=True),
+            'graduation_two_year': SurveyLoad(Graduation,SHORT_RANGE,'assc',merge_with_char=True),
+            'graduation_four_year': SurveyLoad(Graduation,SHORT_RANGE,'bach',merge_with_char=True)
+        })
+        # percentile bands are aggregated from the national frames before they are dropped
+        self.context = {label: context_bands(df,CONTEXT_METRICS[label][0])
+                        for label,df in data.items()}
         for label,df in data.items():
             data[label] = df.loc[df['id'].isin(schools.keys())]
         
         self.data = data
         self.schools = schools
+        self.context_peer = context_peer
+        self.compact = compact
+        self.theme = theme
+        self.output = output if output is not None else OutputTarget()
+        self.standalone = standalone
+        self.errors: List[Dict[str,str]] = []     # per-school failures of the last gen_all_plots
+
+
+    def _num(self, values, decimals: int = 0):
+        '''returns plotted values, compacted to display precision in compact mode'''
+        return compact_values(values,decimals) if self.compact else values
+
+
+    def _hover(self,
+               df: pd.DataFrame,
+               header: str,
+               rows: List[Tuple[str,str,str]]) -> Dict:
+        '''
+        returns trace hover arguments; customdata + hovertemplate in compact mode, else per-point text
+
+        :param header: first hover line; '%{x}' is replaced by the year
+        :param rows: (label, column, suffix) per hover line; values are shown rounded to whole numbers
+        '''
+        if self.compact:
+            customdata = np.column_stack([compact_values(df[col]) for _,col,_ in rows])
+            lines = [f'{label}: %{{customdata[{i}]}}{suffix}' for i,(label,_,suffix) in enumerate(rows)]
+            return {'customdata': customdata,
+                    'hovertemplate': '<br>'.join([header] * bool(header) + lines) + '<extra></extra>'}
+        text = df['year'].astype(str).map(lambda y: header.replace('%{x}',y)) if header else None
+        for label,col,suffix in rows:
+            line = f'{label}: ' + df[col].round(0).astype(str) + suffix
+            text = line if text is None else text + '<br>' + line
+        return {'text': text, 'hovertemplate': '%{text}<extra></extra>'}
     
 
+    def variant(self,
+                schools: Optional[Dict[str,str]] = None,
+                theme: Optional[go.layout.Template] = None,
+                output: Optional[OutputTarget] = None) -> 'PlotGenerator':
+        '''
+        returns a generator sharing this one's loaded data, for building another roster subset, theme or
+        output root without loading again; variants hold no shared mutable state and can run concurrently
+
+        :param schools: roster of the variant, a subset of this generator's schools; defaults to all of them
+        :param theme: plotly template of the variant; defaults to this generator's
+        :param output: output root and sink of the variant; docs/ if not given
+        :raises ValueError: if schools has ids this generator has no data for
+        '''
+        pg = copy.copy(self)
+        if schools is not None:
+            unknown = sorted(set(schools) - set(self.schools))
+            if unknown:
+                raise ValueError(f'schools {unknown} are not in the loaded roster')
+            pg.schools = schools
+            pg.data = {label: df.loc[df['id'].isin(schools.keys())] for label,df in self.data.items()}
+        pg.theme = theme if theme is not None else self.theme
+        pg.output = output if output is not None else OutputTarget()
+        pg.errors = []
+        return pg
+
+
     def gen_admissions(self,
                        school_id: str,
-                       out_path_dir: str) -> go.Figure:
+                       out_path_dir: str) -> Optional[str]:
         '''generates Plotly figure of admissions rates over time'''
         adm_df = self.data['admissions']
         df = adm_df.loc[adm_df['id']==school_id].copy()
@@ -75,21 +186,19 @@ class PlotGenerator:
         ))
         for g in ['men','women']:
             if len(df[f'{g}_enrolled']) > 1 and df[f'{g}_enrolled'].max() > 0:
-                df[f'accept_rate_{g}_label'] = (
-                    '<u><b>' + df['year'].astype(str) + f'</b></u> ({g.title()})<br>' +
-                    '<b># Applied</b>: ' + df[f'{g}_applied'].round(0).astype(str) + '<br>'
-                    '<b># Admitted</b>: ' + df[f'{g}_admitted'].round(0).astype(str) + '<br>'
-                    '<b># Enrolled</b>: ' + df[f'{g}_enrolled'].round(0).astype(str) + '<br>' +
-                    '<b>% Acceptance Rate</b>: ' + df[f'accept_rate_{g}'].round(0).astype(str) + '%<br>' +
-                    '<b>% Yield Rate</b>: ' + df[f'yield_rate_{g}'].round(0).astype(str) + '%' 
-                )
+                hover = self._hover(df, f'<u><b>%{{x}}</b></u> ({g.title()})', [
+                    ('<b># Applied</b>', f'{g}_applied', ''),
+                    ('<b># Admitted</b>', f'{g}_admitted', ''),
+                    ('<b># Enrolled</b>', f'{g}_enrolled', ''),
+                    ('<b>% Acceptance Rate</b>', f'accept_rate_{g}', '%'),
+                    ('<b>% Yield Rate</b>', f'yield_rate_{g}', '%')
+                ])
                 fig.add_trace(go.Scatter(
                     name=f'<b>{g.title()}</b>',
-                    x=df['year'],
-                    y=df[f'accept_rate_{g}'],
+                    x=self._num(df['year']),
+                    y=self._num(df[f'accept_rate_{g}'],1),
                     mode='lines+markers',
-                    text=df[f'accept_rate_{g}_label'],
-                    hovertemplate='%{text}<extra></extra>',
+                    **hover,
                     marker={
                         'size': 15,
                         'color': '#4D6F91' if g == 'men' else '#E8E8FF' 
@@ -97,14 +206,13 @@ class PlotGenerator:
                     line={
                         'width': 6
                     }))
-        outpath_name = os.path.join(out_path_dir,'admissions.html')
-        fig.write_html(file=outpath_name,auto_play=False,include_plotlyjs='cdn')
+        return write_figure(fig,self.output,out_path_dir,'admissions',self.theme,self.standalone)
     
 
     def gen_enrollment(self,
                        level: str,
                        school_id: str,
-                       out_path_dir: str) -> go.Figure:
+                       out_path_dir: str) -> Optional[str]:
         '''
         generates Plotly figure of enrollment over time
         
@@ -128,18 +236,16 @@ class PlotGenerator:
         ))
         for g in ['men','women']:
             if len(df[f'tot{g}']) > 1 and df[f'tot{g}'].max() > 0:
-                df[f'tot{g}_label'] = (
-                    '<u><b>' + df['year'].astype(str) + f'</b></u> ({g.title()})<br>' +
-                    f'<b># Total {g.title()} Enrolled</b>: ' + df[f'tot{g}'].round(0).astype(str) + '<br>'
-                    '<b>% Male Enrollment Share</b>: ' + df[f'totmen_share'].round(0).astype(str) + '%' 
-                )
+                hover = self._hover(df, f'<u><b>%{{x}}</b></u> ({g.title()})', [
+                    (f'<b># Total {g.title()} Enrolled</b>', f'tot{g}', ''),
+                    ('<b>% Male Enrollment Share</b>', 'totmen_share', '%')
+                ])
                 fig.add_trace(go.Scatter(
                     name=f'<b>{g.title()}</b>',
-                    x=df['year'],
-                    y=df[f'tot{g}'],
+                    x=self._num(df['year']),
+                    y=self._num(df[f'tot{g}']),
                     mode='lines+markers',
-                    text=df[f'tot{g}_label'],
-                    hovertemplate='%{text}<extra></extra>',
+                    **hover,
                     marker={
                         'size': 15,
                         'color': '#4D6F91' if g == 'men' else '#E8E8FF' 
@@ -147,14 +253,13 @@ class PlotGenerator:
                     line={
                         'width': 6
                     }))
-        outpath_name = os.path.join(out_path_dir,f'enrollment_{level}.html')
-        fig.write_html(file=outpath_name,auto_play=False,include_plotlyjs='cdn')
+        return write_figure(fig,self.output,out_path_dir,f'enrollment_{level}',self.theme,self.standalone)
 
 
     def gen_enroll_demo(self,
                        level: str,
                        school_id: str,
-                       out_path_dir: str) -> go.Figure:
+                       out_path_dir: str) -> Optional[str]:
         '''
         generates Plotly figure of enrollment demographics over time
         
@@ -188,30 +293,24 @@ class PlotGenerator:
                     ))
 
         for demo,lab in demo_dict.items():
-            df[f'{lab[0]}_label'] = (
-                f'# <b>{lab[0]}</b>: ' + df[demo].round(0).astype(str)
-            )
-
             fig.add_trace(
                 go.Scatter(
                     name=f'<b>{lab[0]}</b>',
                     line_color=lab[1],
                     groupnorm='percent',
-                    text=df[f'{lab[0]}_label'],
-                    hovertemplate='%{text}<extra></extra>',
-                    x=df['year'],
-                    y=df[demo],
+                    **self._hover(df, '', [(f'# <b>{lab[0]}</b>', demo, '')]),
+                    x=self._num(df['year']),
+                    y=self._num(df[demo]),
                     stackgroup='one'
                 )
             )
-        outpath_name = os.path.join(out_path_dir,f'enrollment_demographics_{level}.html')
-        fig.write_html(file=outpath_name,auto_play=False,include_plotlyjs='cdn')
+        return write_figure(fig,self.output,out_path_dir,f'enrollment_demographics_{level}',self.theme,self.standalone)
     
 
     def gen_graduation(self,
                        level: str,
                        school_id: str,
-                       out_path_dir: str) -> go.Figure:
+                       out_path_dir: str) -> Optional[str]:
         '''
         generates Plotly figure of graduation over time
         
@@ -235,19 +334,17 @@ class PlotGenerator:
         ))
         for g in ['men','women']:
             if len(df[f'tot{g}']) > 1 and df[f'tot{g}'].max() > 0:
-                df[f'tot{g}_label'] = (
-                    '<u><b>' + df['year'].astype(str) + f'</b></u> ({g.title()})<br>' +
-                    f'<b># Total {g.title()} in cohort</b>: ' + df[f'tot{g}'].round(0).astype(str) + '<br>'
-                    f'<b># Total {g.title()} graduated</b>: ' + df[f'tot{g}_graduated'].round(0).astype(str) + '<br>'
-                    f'<b>% {g.title()} grad. rate</b>: ' + df[f'gradrate_tot{g}'].round(0).astype(str) + '%' 
-                )
+                hover = self._hover(df, f'<u><b>%{{x}}</b></u> ({g.title()})', [
+                    (f'<b># Total {g.title()} in cohort</b>', f'tot{g}', ''),
+                    (f'<b># Total {g.title()} graduated</b>', f'tot{g}_graduated', ''),
+                    (f'<b>% {g.title()} grad. rate</b>', f'gradrate_tot{g}', '%')
+                ])
                 fig.add_trace(go.Scatter(
                     name=f'<b>{g.title()}</b>',
-                    x=df['year'],
-                    y=df[f'gradrate_tot{g}'],
+                    x=self._num(df['year']),
+                    y=self._num(df[f'gradrate_tot{g}'],1),
                     mode='lines+markers',
-                    text=df[f'tot{g}_label'],
-                    hovertemplate='%{text}<extra></extra>',
+                    **hover,
                     marker={
                         'size': 15,
                         'color': '#4D6F91' if g == 'men' else '#E8E8FF' 
@@ -255,13 +352,101 @@ class PlotGenerator:
                     line={
                         'width': 6
                     }))
-        outpath_name = os.path.join(out_path_dir,f'graduation_{level}.html')
-        fig.write_html(file=outpath_name,auto_play=False,include_plotlyjs='cdn')
+        return write_figure(fig,self.output,out_path_dir,f'graduation_{level}',self.theme,self.standalone)
+
+
+    def gen_context(self,
+                    subject: str,
+                    school_id: str,
+                    out_path_dir: str) -> Optional[str]:
+        '''
+        generates Plotly figure of a school's metric against the national (or sector) distribution over time
+
+        :param subject: key of self.data, e.g. 'admissions' or 'graduation_four_year'
+        '''
+        metric, metric_label = CONTEXT_METRICS[subject]
+        df = self.data[subject]
+        df = df.loc[(df['id']==school_id) & df[metric].notna()].sort_values('year')
+
+        if len(df) < 2:
+            return None
+        
+        bands = self.context[subject]
+        peer = 'All'
+        if self.context_peer == 'sector':
+            sector = df['sector'].dropna() if 'sector' in df.columns else df.iloc[:0]
+            if len(sector) > 0 and sector.iloc[-1] in bands.index.get_level_values('peer'):
+                peer = sector.iloc[-1]
+            else:
+                warnings.warn(f'no {subject} sector band for {self.schools[school_id]} ({school_id}); '
+                              'its context plot compares against all institutions')
+        bands = bands.loc[peer]
+        bands = bands.loc[(bands.index >= df['year'].min()) & (bands.index <= df['year'].max())]
+        peer_label = 'all institutions' if peer == 'All' else peer
+
+        fig = go.Figure(layout=go.Layout(
+            title={'text': f'{metric_label} at {self.schools[school_id]} vs. {peer_label}'},
+            xaxis={'range': (df['year'].min() - 1, df['year'].max() + 1)},
+            yaxis={'range': (0,100)},
+            hoverlabel={'bgcolor': '#ffffff',
+                        'align': 'left',
+                        'bordercolor': 'black',
+                        'font': {'color': '#001A50'}}
+        ))
+        for low,high,color,name in [(.1,.9,'rgba(77,111,145,0.15)','10th-90th percentile'),
+                                    (.25,.75,'rgba(77,111,145,0.3)','25th-75th percentile')]:
+            fig.add_trace(go.Scattergl(
+                x=self._num(bands.index),
+                y=self._num(bands[low],1),
+                mode='lines',
+                line={'width': 0},
+                showlegend=False,
+                hoverinfo='skip'))
+            fig.add_trace(go.Scattergl(
+                name=f'<b>{name}</b>',
+                x=self._num(bands.index),
+                y=self._num(bands[high],1),
+                mode='lines',
+                line={'width': 0},
+                fill='tonexty',
+                fillcolor=color,
+                hoverinfo='skip'))
+        fig.add_trace(go.Scattergl(
+            name='<b>Median</b>',
+            x=self._num(bands.index),
+            y=self._num(bands[.5],1),
+            mode='lines',
+            line={'width': 3, 'dash': 'dash', 'color': '#4D6F91'},
+            hovertemplate=f'<b>%{{x}}</b> median ({peer_label}): %{{y:.0f}}%<extra></extra>'))
+        fig.add_trace(go.Scattergl(
+            name=f'<b>{self.schools[school_id]}</b>',
+            x=self._num(df['year']),
+            y=self._num(df[metric],1),
+            mode='lines+markers',
+            marker={'size': 15, 'color': '#001A50'},
+            line={'width': 6, 'color': '#001A50'},
+            hovertemplate=f'<u><b>%{{x}}</b></u><br><b>% {metric_label}</b>: %{{y:.0f}}%<extra></extra>'))
+        return write_figure(fig,self.output,out_path_dir,f'context_{subject}',self.theme,self.standalone)
+
 
+    def gen_school_page(self,
+                        school_id: str,
+                        out_path_dir: str,
+                        figures: List[str]) -> None:
+        '''
+        generates school page laying out the school's figures, each lazy-loaded from its JSON when scrolled into view
 
-    def gen_all_plots(self) -> None:
-        '''generates all applicable plots for each school'''
-        func_map = {
+        :param figures: names of the figures written for the school, in page order
+        '''
+        fig_divs = '\n'.join(f'<div class="hemac-fig" data-src="{name}.json"></div>' for name in figures)
+        page = SCHOOL_PAGE.format(name=self.schools[school_id],
+                                  plotlyjs=asset_src('plotly',out_path_dir,self.output.asset_root),
+                                  figures=fig_divs)
+        self.output.write(os.path.join(out_path_dir,'index.html'), minify_html(page))
+
+
+    def _plot_funcs(self) -> Dict[str,Dict]:
+        return {
             'admissions': {
                 'func': self.gen_admissions,
                 'spec': None
@@ -283,21 +468,145 @@ class PlotGenerator:
                 'spec': 'four_year'
             },
         }
-        
-        for schl in self.schools.keys():
-            dir_name = self.schools[schl].replace(' ','_')
-            fpath = os.path.join('docs','schools',dir_name)
-            os.makedirs(fpath,exist_ok=True)
-
-            for sbjct in func_map.keys():
-                if (lambda df,id_: len(df.loc[df['id'] == id_]) > 0)(self.data[sbjct],schl):
-                    spec = func_map[sbjct]['spec']
-                    func = func_map[sbjct]['func']
-                    if isinstance(func,tuple) and spec is not None:
-                        [f(spec,schl,fpath) for f in func]
-                    elif spec is not None:
-                        func(spec,schl,fpath)
-                    else:
-                        func(schl,fpath)
-            print(f'{dir_name} plots completed')
-        
\ No newline at end of file
+
+
+    def page_dir(self,
+                 schl: str) -> str:
+        '''returns a school's page directory relative to the output root'''
+        return f'schools/{self.schools[schl].replace(" ","_")}'
+
+
+    def gen_school(self,
+                   schl: str) -> str:
+        '''generates all applicable plots and the page of one school; returns its page directory relative to the output root'''
+        func_map = self._plot_funcs()
+        rel_dir = self.page_dir(schl)
+        fpath = self.output.path(*rel_dir.split('/'))
+
+        figures = []
+        for sbjct in func_map.keys():
+            if (lambda df,id_: len(df.loc[df['id'] == id_]) > 0)(self.data[sbjct],schl):
+                spec = func_map[sbjct]['spec']
+                func = func_map[sbjct]['func']
+                if isinstance(func,tuple) and spec is not None:
+                    figures.extend(f(spec,schl,fpath) for f in func)
+                elif spec is not None:
+                    figures.append(func(spec,schl,fpath))
+                else:
+                    figures.append(func(schl,fpath))
+                figures.append(self.gen_context(sbjct,schl,fpath))
+        self.gen_school_page(schl,fpath,[f for f in figures if f is not None])
+        print(f'{rel_dir.split("/")[-1]} plots completed')
+        return rel_dir
+
+
+    def try_gen_school(self,
+                       schl: str) -> Tuple[Optional[str],Optional[Dict[str,str]]]:
+        '''gen_school isolating failures; returns (page directory, None), or (None, error record) if the school raised'''
+        try:
+            return self.gen_school(schl), None
+        except Exception as e:
+            print(f'{self.page_dir(schl).split("/")[-1]} plots failed: {e!r}')
+            return None, error_record('plots',schl,self.schools[schl],e)
+
+
+    def _render(self,
+                schools: List[str],
+                workers: int) -> Iterator[Tuple[str,Tuple[Optional[str],Optional[Dict[str,str]]]]]:
+        '''yields (school id, try_gen_school result) as schools finish, in order'''
+        with tempfile.TemporaryDirectory(prefix='hemac-frames-') as root:
+            if workers > 1:
+                try:
+                    publish_frames(self.data,root)
+                except pa.ArrowException as e:     # e.g. a column mixing numbers and strings
+                    warnings.warn(f'frames could not be shared with workers, rendering serially: {e}')
+                    workers = 1
+            if workers <= 1:
+                for schl in schools:
+                    yield schl, self.try_gen_school(schl)
+                return
+
+            settings = {'schools': self.schools, 'context': self.context, 'context_peer': self.context_peer,
+                        'compact': self.compact, 'theme': self.theme, 'standalone': self.standalone}
+            collect = not isinstance(self.output.sink,DirectorySink)
+            gen_school = functools.partial(_gen_school,root=root,settings=settings,output_root=self.output.root,
+                                           asset_root=self.output.asset_root,collect=collect)
+            with ProcessPoolExecutor(workers,mp_context=multiprocessing.get_context('forkserver')) as pool:  # safe from threaded builds
+                for schl,(result,files) in zip(schools,pool.map(gen_school,schools)):
+                    for path,content in files:
+                        self.output.write(path,content)
+                    yield schl, result
+
+
+    def gen_all_plots(self,
+                      shard: Optional[Tuple[int,int]] = None,
+                      workers: int = 1,
+                      checkpoint: Optional[Checkpoint] = None) -> Dict[str,str]:
+        '''
+        generates all applicable plots for each school
+
+        a school that raises is skipped and recorded in self.errors rather than aborting the run;
+        schools completed under the checkpoint, with their pages still on disk, are not regenerated
+
+        with several workers, the frames are published once to memory-mapped Arrow files that each
+        worker process slices per school, instead of pickling every frame into every worker; workers
+        write pages directly under the output root, or hand them back to the parent for an archive output
+
+        :param shard: (i, N) to render only the schools in shard i of N, see sharding.shard_of
+        :param workers: worker processes rendering schools in parallel
+        :param checkpoint: records each completed school, compacted when the run ends; pass one opened with resume=True to continue a run
+        :returns: school id -> page directory relative to the output root, for schools whose pages are complete
+        '''
+        schools = self.schools if shard is None else shard_schools(self.schools,*shard)
+        self.errors = []
+        school_dirs = {}
+        todo = []
+        for schl in schools.keys():
+            rel_dir = self.page_dir(schl)
+            if (checkpoint is not None and checkpoint.done(schl,rel_dir)
+                    and os.path.exists(self.output.path(*rel_dir.split('/'),'index.html'))):
+                school_dirs[schl] = rel_dir
+            else:
+                todo.append(schl)
+        if school_dirs:
+            print(f'resuming: {len(school_dirs)} of {len(schools)} schools already done')
+
+        try:
+            for schl,(rel_dir,error) in self._render(todo,workers):
+                if error is not None:
+                    self.errors.append(error)
+                    continue
+                school_dirs[schl] = rel_dir
+                if checkpoint is not None:
+                    checkpoint.mark_done(schl,rel_dir)
+        finally:
+            if checkpoint is not None:
+                checkpoint.compact()
+        return school_dirs
+
+
+def _gen_school(schl: str,
+                root: str,
+                settings: Dict,
+                output_root: str,
+                asset_root: str,
+                collect: bool) -> Tuple[Tuple[Optional[str],Optional[Dict[str,str]]],List[Tuple[str,bytes]]]:
+    '''
+    renders one school in a worker process from the published frames
+
+    :param root: directory the frames were published to
+    :param settings: the small, non-frame generator state
+    :param output_root: output root of the parent's OutputTarget
+    :param asset_root: vendored assets of the parent's OutputTarget
+    :param collect: return pages to the parent instead of writing them
+    :returns: (try_gen_school result, pages to write as (path, content); empty unless collect)
+    '''
+    pg = PlotGenerator.__new__(PlotGenerator)
+    pg.__dict__.update(settings)
+    pg.data = SharedFrames(root).school_frames(schl)     # mapping is cheap; only this school's rows leave the files
+    if not collect:
+        pg.output = OutputTarget(output_root,asset_root=asset_root)
+        return pg.try_gen_school(schl), []
+    sink = MemorySink()
+    pg.output = OutputTarget(output_root,sink,asset_root)
+    return pg.try_gen_school(schl), sink.files
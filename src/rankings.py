@@ -0,0 +1,68 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+# metrics ranked for each landing survey
+RANK_METRICS = {
+    'admissions': ['accept_rate_men'],
+    'enrollment_undergrad': ['totmen_share'],
+    'enrollment_grad': ['totmen_share'],
+    'graduation_two_year': ['gradrate_totmen'],
+    'graduation_four_year': ['gradrate_totmen']
+}
+# characteristics columns defining each peer group; every group is also split by year
+PEER_GROUPS = {'national': [], 'sector': ['sector'], 'state': ['state']}
+PEER_LABELS = {
+    'national': 'all institutions',
+    'sector': 'institutions in its sector',
+    'state': 'institutions in its state'
+}
+# percentile bands of the national-context plots
+CONTEXT_QUANTILES = [.1, .25, .5, .75, .9]
+
+
+def add_percentiles(df: pd.DataFrame,
+                    metrics: List[str],
+                    peer: str = 'national') -> pd.DataFrame:
+    '''
+    adds a <metric>_pct column per metric: the percent of peer institutions reporting the metric that
+    year with a strictly lower value (0 for the lowest, 100 for the highest)
+
+    one grouped rank per metric over the full national frame; rows without the metric get no percentile
+
+    :param df: national (unfiltered) survey data; sector/state peers need characteristics merged in
+    :param peer: 'national', 'sector' or 'state'
+    :raises ValueError: if the frame lacks the peer group's columns
+    '''
+    keys = ['year'] + PEER_GROUPS[peer]
+    missing = [k for k in keys if k not in df.columns]
+    if missing:
+        raise ValueError(f'{peer} percentiles need columns {missing}; load the survey with merge_with_char=True')
+    grouped = df.groupby(keys)[metrics]
+    below = grouped.rank(method='min') - 1
+    peers = grouped.transform('count') - 1
+    pct = np.floor(below / peers.where(peers > 0) * 100)
+    return df.assign(**{f'{m}_pct': pct[m] for m in metrics})
+
+
+def context_bands(df: pd.DataFrame,
+                  metric: str,
+                  quantiles: List[float] = CONTEXT_QUANTILES) -> pd.DataFrame:
+    '''
+    computes yearly percentile bands of a metric across all institutions and within each sector
+
+    :param df: national (unfiltered) survey data
+    :param metric: column to aggregate
+    :param quantiles: band quantiles, as fractions
+    :returns: DataFrame indexed by (peer, year), one column per quantile; peer 'All' is the national band
+    '''
+    df = df.loc[df[metric].notna()]
+    national = df.groupby('year')[metric].quantile(quantiles).unstack()
+    national.index = pd.MultiIndex.from_product([['All'],national.index],names=['peer','year'])
+    if 'sector' not in df.columns:
+        return national
+    by_sector = df.groupby(['sector','year'])[metric].quantile(quantiles).unstack()
+    by_sector.index = by_sector.index.set_names(['peer','year'])
+    return pd.concat([national,by_sector])
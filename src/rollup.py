@@ -0,0 +1,178 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from assets import asset_src
+from html_min import minify_html
+from plot_generator import compact_values
+from output_sink import OutputTarget, write_figure
+from utils import SCHOOL_PAGE, THEME
+
+
+ROLLUP_DIR = 'rollup'   # under the output root
+COLORS = {'men': '#4D6F91', 'women': '#C55300'}
+
+# per survey: derived count columns, summed count columns, and pooled rates as (numerator, denominator)
+ROLLUP_SPECS = {
+    'admissions': {
+        'derived': {'women_applied': ('tot_applied','men_applied'),
+                    'women_admitted': ('tot_admitted','men_admitted'),
+                    'women_enrolled': ('tot_enrolled','men_enrolled')},
+        'counts': ['men_applied', 'women_applied', 'men_admitted', 'women_admitted', 'men_enrolled', 'women_enrolled'],
+        'rates': {'accept_men': ('men_admitted','men_applied'), 'accept_women': ('women_admitted','women_applied'),
+                  'yield_men': ('men_enrolled','men_admitted'), 'yield_women': ('women_enrolled','women_admitted')}
+    },
+    'enrollment': {
+        'derived': {},
+        'counts': ['totmen', 'totwomen'],
+        'rates': {'share_men': ('totmen','tot')}
+    },
+    'graduation': {
+        'derived': {},
+        'counts': ['totmen', 'totwomen', 'totmen_graduated', 'totwomen_graduated'],
+        'rates': {'gradrate_men': ('totmen_graduated','totmen'), 'gradrate_women': ('totwomen_graduated','totwomen')}
+    }
+}
+
+
+def pooled_by_year(df: pd.DataFrame,
+                   counts: List[str],
+                   rates: Dict[str,Tuple[str,str]]) -> pd.DataFrame:
+    '''
+    sums counts across schools per year and pools rates as sum(numerator) / sum(denominator), in one groupby pass
+
+    a school contributes to a rate only in years it reports both numerator and denominator, so rates
+    are weighted by school size rather than averaged across schools
+
+    :returns: DataFrame indexed by year with count columns, rate columns (in percent) and, per rate,
+              '<rate>_schools' contributing to it
+    '''
+    cols = {c: df[c] for c in counts}
+    schools = {}
+    for rate,(num,den) in rates.items():
+        both = df[num].notna() & (df[den] > 0)
+        cols[f'{rate}_num'] = df[num].where(both)
+        cols[f'{rate}_den'] = df[den].where(both)
+        schools[f'{rate}_schools'] = df['id'].where(both)
+    frame = pd.DataFrame({**cols, **schools}).assign(year=df['year'].to_numpy())
+    agg = frame.groupby('year').agg(**{c: (c,'sum') for c in cols}, **{c: (c,'nunique') for c in schools})
+    for rate in rates:
+        agg[rate] = agg[f'{rate}_num'] / agg[f'{rate}_den'].replace(0, np.nan) * 100
+    return agg.drop(columns=[c for c in cols if c.endswith(('_num','_den'))])
+
+
+class RollupGenerator:
+    '''HEMAC-wide roll-up dashboard across all partner schools'''
+    def __init__(self,
+                 data: Dict[str,pd.DataFrame],
+                 theme: go.layout.Template = THEME,
+                 output: Optional[OutputTarget] = None):
+        '''
+        :param data: partner schools' survey frames keyed like PlotGenerator.data
+        :param theme: plotly template of every figure
+        :param output: output root and sink of the dashboard; docs/ if not given
+        '''
+        self.theme = theme
+        self.output = output if output is not None else OutputTarget()
+        self.page_dir = self.output.path(ROLLUP_DIR)
+        self.rollups = {}
+        for label,df in data.items():
+            spec = ROLLUP_SPECS[label.split('_')[0]]
+            df = df.assign(**{col: df[tot] - df[men] for col,(tot,men) in spec['derived'].items()})
+            if 'totmen' in df.columns:
+                df = df.assign(tot=df['totmen'] + df['totwomen'])
+            self.rollups[label] = pooled_by_year(df, spec['counts'], spec['rates'])
+
+
+    @staticmethod
+    def _fig(title: str,
+             yaxis: Dict,
+             traces: List[go.Scatter]) -> go.Figure:
+        fig = go.Figure(layout=go.Layout(
+            title={'text': title},
+            yaxis=yaxis,
+            hoverlabel={'bgcolor': '#ffffff',
+                        'align': 'left',
+                        'bordercolor': 'black',
+                        'font': {'color': '#001A50'}},
+            hovermode='x unified'
+        ))
+        for trace in traces:
+            fig.add_trace(trace)
+        return fig
+
+
+    def _write(self,
+               fig: go.Figure,
+               name: str) -> str:
+        return write_figure(fig,self.output,self.page_dir,name,self.theme)
+
+
+    def _line(self,
+              label: str,
+              col: str,
+              name: str,
+              color: str,
+              dash: str = 'solid') -> go.Scatter:
+        agg = self.rollups[label].dropna(subset=[col])
+        return go.Scatter(
+            name=f'<b>{name}</b>',
+            x=compact_values(agg.index),
+            y=compact_values(agg[col],1),
+            customdata=compact_values(agg[f'{col}_schools']),
+            mode='lines+markers',
+            marker={'size': 10, 'color': color},
+            line={'width': 4, 'color': color, 'dash': dash},
+            hovertemplate=f'<b>{name}</b>: %{{y:.0f}}% (%{{customdata}} schools)<extra></extra>')
+
+
+    def gen_admissions(self) -> List[str]:
+        '''generates total applications/admissions and pooled acceptance/yield rates by gender'''
+        agg = self.rollups['admissions']
+        bars = [go.Bar(name=f'<b>{g.title()} {stage}</b>',
+                       x=compact_values(agg.index),
+                       y=compact_values(agg[f'{g}_{stage.lower()}']),
+                       marker={'color': COLORS[g], 'opacity': 1 if stage == 'Applied' else .6},
+                       hovertemplate=f'<b>{g.title()} {stage.lower()}</b>: %{{y:,}}<extra></extra>')
+                for stage in ['Applied','Admitted','Enrolled'] for g in ['men','women']]
+        counts = self._fig('Applications, admissions and enrollment across HEMAC partners', {}, bars)
+        counts.update_layout(barmode='group')
+        rates = self._fig('Pooled acceptance and yield rates across HEMAC partners', {'range': (0,100)}, [
+            self._line('admissions', f'{rate}_{g}', f'{g.title()} {name}', COLORS[g], dash)
+            for rate,name,dash in [('accept','acceptance','solid'),('yield','yield','dash')] for g in ['men','women']
+        ])
+        return [self._write(counts,'admissions_counts'),
+                self._write(rates,'admissions_rates')]
+
+
+    def gen_enrollment(self) -> List[str]:
+        '''generates pooled male enrollment share for undergraduate and graduate students'''
+        share = self._fig('Male enrollment share across HEMAC partners', {'range': (0,100)}, [
+            self._line(f'enrollment_{level}', 'share_men', f'{level.title()}uate male share', COLORS['men'], dash)
+            for level,dash in [('undergrad','solid'),('grad','dash')] if f'enrollment_{level}' in self.rollups
+        ])
+        return [self._write(share,'enrollment_share')]
+
+
+    def gen_graduation(self) -> List[str]:
+        '''generates pooled graduation rates by gender for two- and four-year cohorts'''
+        grad = self._fig('Pooled graduation rates across HEMAC partners', {'range': (0,100)}, [
+            self._line(f'graduation_{level}', f'gradrate_{g}', f'{g.title()} ({level.replace("_","-")})', COLORS[g], dash)
+            for level,dash in [('four_year','solid'),('two_year','dash')] if f'graduation_{level}' in self.rollups
+            for g in ['men','women']
+        ])
+        return [self._write(grad,'graduation_rates')]
+
+
+    def gen_dashboard(self) -> None:
+        '''generates all roll-up figures and the dashboard page laying them out'''
+        figures = self.gen_admissions() + self.gen_enrollment() + self.gen_graduation()
+        fig_divs = '\n'.join(f'<div class="hemac-fig" data-src="{name}.json"></div>' for name in figures)
+        page = SCHOOL_PAGE.format(name='HEMAC Network',
+                                  plotlyjs=asset_src('plotly',self.page_dir,self.output.asset_root),
+                                  figures=fig_divs)
+        self.output.write(os.path.join(self.page_dir,'index.html'), minify_html(page))
+        print('rollup dashboard completed')
@@ -0,0 +1,158 @@
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class ValidatedSurvey:
+    '''survey frame validated against a SurveySchema, indexed by school id'''
+    def __init__(self,
+                 name: str,
+                 frame: pd.DataFrame,
+                 present: pd.Series,
+                 issues: pd.DataFrame):
+        '''
+        :param name: survey label, e.g. 'admissions'
+        :param frame: nullable integer ("Int64") fields indexed by school id
+        :param present: boolean mask over frame's index; True where all required fields are non-null
+        :param issues: one row per (id, column, issue) found during validation
+        '''
+        self.name = name
+        self.frame = frame
+        self.present = present
+        self.issues = issues
+        records = frame.loc[present].astype(object)
+        self._records = records.where(records.notna(), None).to_dict('index')
+
+
+    def record(self, school_id: str) -> Optional[Dict[str,Optional[int]]]:
+        '''returns school's fields (None where missing), or None if the school has no usable row'''
+        return self._records.get(school_id)
+
+
+    def report(self) -> None:
+        '''prints a one-line summary of validation issues, grouped by column and issue'''
+        if len(self.issues) == 0:
+            return None
+        counts = self.issues.groupby(['column','issue']).size()
+        summary = ', '.join(f'{col} {issue} ({n})' for (col,issue),n in counts.items())
+        print(f'{self.name}: {self.issues["id"].nunique()} schools with data issues: {summary}')
+
+
+    def error_records(self,
+                      stage: str,
+                      schools: Dict[str,str]) -> List[Dict[str,str]]:
+        '''
+        returns one record per school with invalid or duplicate rows, shaped like checkpoint.error_record
+
+        missing values are not errors; invalid values were masked and render as missing
+
+        :param stage: build stage, e.g. 'map'
+        :param schools: school id -> name; schools not in it are not reported
+        '''
+        bad = self.issues.loc[(self.issues['issue'] != 'missing') & self.issues['id'].isin(schools.keys())]
+        return [{'stage': stage, 'id': id_, 'school': schools[id_], 'error': 'InvalidData',
+                 'message': f'{self.name}: ' + ', '.join(f'{col} {issue}' for col,issue in zip(rows['column'],rows['issue'])),
+                 'where': ''}
+                for id_,rows in bad.groupby('id', sort=False)]
+
+
+class SurveySchema:
+    '''declares the integer fields extracted from a survey frame'''
+    def __init__(self,
+                 name: str,
+                 fields: Dict[str,str],
+                 required: List[str],
+                 derived: Optional[Dict[str,Callable[[pd.DataFrame],pd.Series]]] = None):
+        '''
+        :param name: survey label, e.g. 'admissions'
+        :param fields: output field -> source column; source columns may be derived columns
+        :param required: output fields that must be non-null for a school's section to render
+        :param derived: source column -> function computing it from the raw frame
+        '''
+        self.name = name
+        self.fields = fields
+        self.required = required
+        self.derived = derived or {}
+
+
+    def validate(self, df: pd.DataFrame) -> ValidatedSurvey:
+        '''
+        validates a survey frame once: derives columns, casts fields to nullable integers and computes presence masks
+
+        :raises ValueError: if a required field's source column is not in the frame
+        '''
+        derived_from = set(self.derived)
+        missing = [self.fields[f] for f in self.required
+                   if self.fields[f] not in df.columns and self.fields[f] not in derived_from]
+        if missing:
+            raise ValueError(f'{self.name} data is missing required columns: {missing}')
+
+        issues = []
+        dup_ids = df.loc[df['id'].duplicated(), 'id'].unique()
+        df = df.drop_duplicates('id').set_index('id')
+        issues.extend({'id': id_, 'column': 'id', 'issue': 'duplicate'} for id_ in dup_ids)
+
+        cols = {}
+        for field,src in self.fields.items():
+            if src in self.derived:
+                col = self.derived[src](df)
+            elif src in df.columns:
+                col = df[src]
+            else:
+                col = pd.Series(np.nan, index=df.index)
+            col = pd.to_numeric(col, errors='coerce').astype('Float64')
+            bad = ~np.isfinite(col.fillna(0).to_numpy(dtype=float)) | (col < 0).fillna(False).to_numpy()
+            if bad.any():
+                issues.extend({'id': id_, 'column': src, 'issue': 'invalid'} for id_ in df.index[bad])
+                col = col.mask(bad)
+            cols[field] = np.trunc(col).astype('Int64')
+        frame = pd.DataFrame(cols, index=df.index)
+
+        present = frame[self.required].notna().all(axis=1)
+        partial = present & frame.isna().any(axis=1)
+        for field in self.fields:
+            ids = frame.index[partial & frame[field].isna()]
+            issues.extend({'id': id_, 'column': self.fields[field], 'issue': 'missing'} for id_ in ids)
+        absent = frame.index[~present]
+        issues.extend({'id': id_, 'column': 'required', 'issue': 'missing'} for id_ in absent)
+
+        return ValidatedSurvey(self.name, frame, present,
+                               pd.DataFrame(issues, columns=['id','column','issue']))
+
+
+def _women(tot: str, men: str) -> Callable[[pd.DataFrame],pd.Series]:
+    '''derives a women's count as total minus men'''
+    return lambda df: df[tot] - df[men]
+
+
+GRADUATION_FIELDS = {
+    'men': 'totmen', 'mengrad': 'totmen_graduated', 'menrate': 'gradrate_totmen',
+    'women': 'totwomen', 'womengrad': 'totwomen_graduated', 'womenrate': 'gradrate_totwomen',
+    'menrate_pct': 'gradrate_totmen_pct'
+}
+ENROLLMENT_FIELDS = {'men': 'totmen', 'women': 'totwomen', 'share': 'totmen_share', 'share_pct': 'totmen_share_pct'}
+
+LANDING_SCHEMAS = {
+    'admissions': SurveySchema(
+        'admissions',
+        fields={'men_app': 'men_applied', 'men_admit': 'men_admitted', 'men_enroll': 'men_enrolled',
+                'women_app': 'women_applied_calc', 'women_admit': 'women_admitted_calc',
+                'women_enroll': 'women_enrolled_calc',
+                'accept_men': 'accept_rate_men', 'yield_men': 'yield_rate_men',
+                'accept_women': 'accept_rate_women', 'yield_women': 'yield_rate_women',
+                'accept_men_pct': 'accept_rate_men_pct'},
+        required=['men_app', 'men_admit', 'men_enroll', 'accept_men', 'yield_men'],
+        derived={'women_applied_calc': _women('tot_applied','men_applied'),
+                 'women_admitted_calc': _women('tot_admitted','men_admitted'),
+                 'women_enrolled_calc': _women('tot_enrolled','men_enrolled')}
+    ),
+    'enrollment_undergrad': SurveySchema('enrollment_undergrad', ENROLLMENT_FIELDS,
+                                         required=['men', 'women', 'share']),
+    'enrollment_grad': SurveySchema('enrollment_grad', ENROLLMENT_FIELDS,
+                                    required=['men', 'women', 'share']),
+    'graduation_two_year': SurveySchema('graduation_two_year', GRADUATION_FIELDS,
+                                        required=['men', 'mengrad', 'menrate']),
+    'graduation_four_year': SurveySchema('graduation_four_year', GRADUATION_FIELDS,
+                                         required=['men', 'mengrad', 'menrate'])
+}
@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from genpeds import Characteristics
+
+from fixtures import run_survey
+
+
+INDEX_DIR = 'data'
+TEXT_FIELDS = ('id', 'name', 'city', 'state', 'webaddr')
+COORD_FIELDS = ('lat', 'lon')
+
+
+class SchoolRecord:
+    '''header metadata for one school'''
+    __slots__ = ('id', 'name', 'city', 'state', 'lat', 'lon', 'webaddr')
+
+    def __init__(self,
+                 id: str,
+                 name: str,
+                 city: str,
+                 state: str,
+                 lat: float,
+                 lon: float,
+                 webaddr: str):
+        self.id = id
+        self.name = name
+        self.city = city
+        self.state = state
+        self.lat = lat
+        self.lon = lon
+        self.webaddr = webaddr
+
+
+class SchoolIndex:
+    '''compact, column-oriented index of school metadata (id -> name, city, state, lat/lon, web) for one year'''
+    def __init__(self,
+                 year: int,
+                 columns: Dict[str,list]):
+        '''
+        :param year: data year of the index
+        :param columns: equal-length columns keyed by TEXT_FIELDS and COORD_FIELDS
+        '''
+        self.year = year
+        self._text = {f: columns[f] for f in TEXT_FIELDS}
+        self._coords = {f: array('d', columns[f]) for f in COORD_FIELDS}
+        self._pos = {id_: i for i, id_ in enumerate(columns['id'])}
+
+
+    @staticmethod
+    def path(year: int) -> str:
+        '''location of the persisted index for a year'''
+        return os.path.join(INDEX_DIR, f'school_index_{year}.json')
+
+
+    @classmethod
+    def build(cls,
+              year: int) -> 'SchoolIndex':
+        '''builds the index from the full IPEDS Characteristics survey'''
+        char = run_survey(Characteristics,year,False,False)
+        char = char.drop_duplicates('id')
+        webaddr = char['webaddress'].fillna('').astype(str).str.strip()
+        webaddr = webaddr.where(webaddr.str.match(r'^https?://') | (webaddr == ''), 'https://' + webaddr)
+        columns = {
+            'id': char['id'].astype(str).tolist(),
+            'name': char['name'].fillna('').astype(str).tolist(),
+            'city': char['city'].fillna('').astype(str).tolist(),
+            'state': char['state'].fillna('').astype(str).tolist(),
+            'webaddr': webaddr.tolist(),
+            'lat': pd.to_numeric(char['latitude'], errors='coerce').astype(float).tolist(),
+            'lon': pd.to_numeric(char['longitude'], errors='coerce').astype(float).tolist()
+        }
+        return cls(year, columns)
+
+
+    @classmethod
+    def load(cls,
+             year: int,
+             rebuild: bool = False) -> 'SchoolIndex':
+        '''
+        loads the persisted index for a year, building and saving it on first use
+
+        :param rebuild: ignore any persisted index and rebuild from Characteristics
+        '''
+        path = cls.path(year)
+        if os.path.exists(path) and not rebuild:
+            with open(path,'r') as idxj:
+                stored = json.load(idxj)
+            return cls(stored['year'], stored['columns'])
+        index = cls.build(year)
+        index.save()
+        return index
+
+
+    def save(self) -> None:
+        '''persists index as compact JSON'''
+        columns = dict(self._text)
+        columns.update({f: self._coords[f].tolist() for f in COORD_FIELDS})
+        path = self.path(self.year)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # written beside the index and renamed over it, so a concurrent load never reads a partial file
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path) or '.', prefix='.hemac-', suffix='.part',
+                                         delete=False) as part:
+            json.dump({'year': self.year, 'columns': columns}, part, separators=(',',':'))
+        os.replace(part.name, path)
+
+
+    def __contains__(self, school_id: str) -> bool:
+        return school_id in self._pos
+
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+
+    def get(self, school_id: str) -> Optional[SchoolRecord]:
+        '''returns record for a school, or None if the school is not in the index'''
+        i = self._pos.get(school_id)
+        if i is None:
+            return None
+        return SchoolRecord(*(self._text[f][i] for f in ('id', 'name', 'city', 'state')),
+                            self._coords['lat'][i],
+                            self._coords['lon'][i],
+                            self._text['webaddr'][i])
+
+
+    def records(self,
+                schools: Dict[str,str]) -> List[SchoolRecord]:
+        '''
+        returns records of partner schools present in the index, named by the partner sheet
+
+        :param schools: dict of partner school "ID: Name" key-value pairs
+        '''
+        recs = []
+        for schl, name in schools.items():
+            rec = self.get(schl)
+            if rec is not None:
+                rec.name = name
+                recs.append(rec)
+        return recs
+
+
+    def frame(self,
+              schools: Dict[str,str],
+              fields: Iterable[str] = ('id', 'name', 'city', 'state')) -> pd.DataFrame:
+        '''returns partner school records as a DataFrame with the given fields'''
+        recs = self.records(schools)
+        return pd.DataFrame({f: [getattr(r, f) for r in recs] for f in fields})
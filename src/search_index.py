@@ -0,0 +1,60 @@
+import json
+import re
+import unicodedata
+from typing import Dict, List, Sequence, Tuple
+
+from utils import SEARCH_CONTROL
+
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    '''lowercases, strips accents and collapses punctuation to single spaces; mirrored by the client'''
+    text = unicodedata.normalize('NFD', str(text).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def build_search_index(docs: Sequence[Tuple[str,str,str]],
+                       markers: Sequence[str]) -> Dict:
+    '''
+    builds a compact prefix/trigram index over school name, city and state
+
+    query words of three or more characters are looked up by their trigrams, shorter ones by word
+    prefix; the client intersects posting lists and confirms candidates against the normalized text
+
+    :param docs: (name, city, state) per school
+    :param markers: marker JS variable per school, in docs order
+    :returns: {"docs": display strings, "text": normalized strings, "markers": [...],
+               "tri": {trigram: [positions]}, "pre": {prefix: [positions]}}
+    '''
+    tri: Dict[str,List[int]] = {}
+    pre: Dict[str,List[int]] = {}
+    text = []
+    for i,(name,city,state) in enumerate(docs):
+        norm = normalize(f'{name} {city} {state}')
+        text.append(norm)
+        for word in set(norm.split()):
+            keys = [(pre, word[:n]) for n in (1, 2) if len(word) >= n]
+            keys += [(tri, word[j:j+3]) for j in range(len(word) - 2)]
+            for table,key in keys:
+                postings = table.setdefault(key, [])
+                if not postings or postings[-1] != i:   # positions stay sorted and unique
+                    postings.append(i)
+    return {
+        'docs': [f'{name} ({city}, {state})' for name,city,state in docs],
+        'text': text,
+        'markers': list(markers),
+        'tri': tri,
+        'pre': pre
+    }
+
+
+def search_control(index: Dict,
+                   map_name: str,
+                   placeholder: str = 'Search by HEMAC school name/location') -> str:
+    '''returns the search box and script querying index client-side; selecting a result opens its marker'''
+    return SEARCH_CONTROL.format(placeholder=placeholder,
+                                 map=map_name,
+                                 index=json.dumps(index, separators=(',',':'), sort_keys=True).replace('</','<\\/'))
@@ -0,0 +1,132 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Tuple
+
+from page_budget import OUTPUT_ROOT, page_stats, record_outputs
+
+
+SHARD_DIR = 'shards'    # partial manifests, relative to the output root
+
+
+def parse_shard(spec: str) -> Tuple[int,int]:
+    '''
+    parses a shard spec "i/N" into (i, N), with shards numbered from 0
+
+    :raises ValueError: if spec is malformed or i is not in [0, N)
+    '''
+    try:
+        index,count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f'shard must look like i/N, got {spec!r}') from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f'shard {spec!r} out of range; expected 0 <= i < N')
+    return index, count
+
+
+def shard_of(school_id: str, count: int) -> int:
+    '''returns the shard of a school id; stable across machines, runs and roster changes'''
+    return int(hashlib.sha256(str(school_id).encode('utf-8')).hexdigest()[:16], 16) % count
+
+
+def shard_schools(schools: Dict[str,str],
+                  index: int,
+                  count: int) -> Dict[str,str]:
+    '''returns the "ID: Name" pairs of schools falling in shard index of count'''
+    return {id_: name for id_,name in schools.items() if shard_of(id_, count) == index}
+
+
+def shard_manifest_path(root: str, index: int, count: int) -> str:
+    return os.path.join(root, SHARD_DIR, f'shard-{index}-of-{count}.json')
+
+
+def write_shard_manifest(school_dirs: Dict[str,str],
+                         index: int,
+                         count: int,
+                         root: str = OUTPUT_ROOT,
+                         extra_dirs: List[str] = ()) -> str:
+    '''
+    writes the partial manifest of one shard: its schools and the stats and digest of every file in their page directories
+
+    :param school_dirs: school id -> page directory relative to root, as returned by PlotGenerator.gen_all_plots
+    :param extra_dirs: other directories relative to root merged from this shard, e.g. the roll-up dashboard
+    :returns: manifest path
+    '''
+    pages = {}
+    for rel_dir in [*school_dirs.values(), *extra_dirs]:
+        for fname in sorted(os.listdir(os.path.join(root, rel_dir))):
+            rel = os.path.join(rel_dir, fname).replace(os.sep, '/')
+            with open(os.path.join(root, rel),'rb') as page:
+                content = page.read()
+            pages[rel] = dict(page_stats(content), sha256=hashlib.sha256(content).hexdigest())
+    path = shard_manifest_path(root, index, count)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path,'w') as mj:
+        json.dump({'shard': index, 'shards': count, 'schools': school_dirs, 'pages': pages},
+                  mj, indent=1, sort_keys=True)
+    return path
+
+
+def merge_shards(shard_roots: List[str],
+                 root: str = OUTPUT_ROOT,
+                 strict_budgets: bool = False) -> Dict[str,str]:
+    '''
+    copies every shard's school pages into root and records the combined output manifest
+
+    shard roots are output trees of shard builds (e.g. CI artifacts); root already holds the
+    unsharded landing map and table, and may itself be one of the shard roots
+
+    :param shard_roots: directories holding shards/shard-*-of-N.json and the pages they list
+    :param strict_budgets: raise instead of warn when a merged page is over budget
+    :returns: school id -> page directory across all shards
+    :raises ValueError: if shards are missing or duplicated, disagree on N, overlap or list files that don't match
+    '''
+    partials = {}
+    for shard_root in shard_roots:
+        shard_dir = os.path.join(shard_root, SHARD_DIR)
+        for fname in sorted(os.listdir(shard_dir)) if os.path.isdir(shard_dir) else []:
+            with open(os.path.join(shard_dir, fname),'r') as mj:
+                partial = json.load(mj)
+            key = (partial['shard'], partial['shards'])
+            if key in partials and partials[key][0] != os.path.abspath(shard_root):
+                raise ValueError(f'shard {key[0]}/{key[1]} found in both {partials[key][0]} and {shard_root}')
+            partials[key] = (os.path.abspath(shard_root), partial)
+
+    counts = {count for _,count in partials}
+    if len(counts) != 1:
+        raise ValueError(f'expected partial manifests of one shard count, found {sorted(counts) or "none"}')
+    count = counts.pop()
+    missing = sorted(set(range(count)) - {index for index,_ in partials})
+    if missing:
+        raise ValueError(f'missing shards {missing} of {count}')
+
+    school_dirs = {}
+    for (index,_),(shard_root,partial) in sorted(partials.items()):
+        for id_,rel_dir in partial['schools'].items():
+            if id_ in school_dirs or rel_dir in school_dirs.values():
+                raise ValueError(f'school {id_} ({rel_dir}) appears in more than one shard')
+            school_dirs[id_] = rel_dir
+        for rel,stats in partial['pages'].items():
+            src = os.path.join(shard_root, rel)
+            with open(src,'rb') as page:
+                if hashlib.sha256(page.read()).hexdigest() != stats['sha256']:
+                    raise ValueError(f'{src} does not match shard {index} manifest')
+            dest = os.path.join(root, rel)
+            if os.path.abspath(src) != os.path.abspath(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.copyfile(src, dest)
+        print(f'merged shard {index}/{count}: {len(partial["schools"])} schools, {len(partial["pages"])} files')
+
+    record_outputs(root, strict=strict_budgets)     # combined manifest vs. page budgets
+    return school_dirs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='merge sharded school page builds into one publishable tree')
+    parser.add_argument('shard_roots', nargs='+', help='docs directories of the shard builds')
+    parser.add_argument('--root', default=OUTPUT_ROOT, help='tree to merge into')
+    parser.add_argument('--strict', action='store_true', help='fail when a page is over budget')
+    args = parser.parse_args()
+    merge_shards(args.shard_roots, args.root, args.strict)
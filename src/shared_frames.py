@@ -0,0 +1,76 @@
+import json
+import os
+from typing import Dict, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+INDEX_NAME = 'index.json'
+
+
+def publish_frames(data: Dict[str,pd.DataFrame],
+                   root: str) -> str:
+    '''
+    writes survey frames once as uncompressed Arrow files sorted by id, with an id -> row range index
+
+    uncompressed Arrow IPC files can be memory-mapped and sliced without copying, so any number of
+    worker processes share one copy in the page cache instead of each unpickling its own
+
+    :param data: survey frames keyed by label, e.g. PlotGenerator.data
+    :param root: directory to write to; usually a temporary directory removed after the workers finish
+    :returns: root, to hand to SharedFrames in workers
+    '''
+    os.makedirs(root, exist_ok=True)
+    index = {}
+    for label,df in data.items():
+        df = df.sort_values('id', kind='stable').reset_index(drop=True)
+        fname = f'{label}.arrow'
+        feather.write_feather(df, os.path.join(root, fname), compression='uncompressed')
+        bounds = df.groupby('id', sort=False).indices
+        index[label] = {'file': fname,
+                        'rows': len(df),
+                        'ids': {str(id_): [int(rows[0]), int(rows[-1]) + 1] for id_,rows in bounds.items()}}
+    with open(os.path.join(root, INDEX_NAME),'w') as ij:
+        json.dump(index, ij, sort_keys=True)
+    return root
+
+
+class SharedFrames:
+    '''read-only, memory-mapped view of frames written by publish_frames'''
+    def __init__(self,
+                 root: str):
+        '''
+        :param root: directory written by publish_frames
+        '''
+        with open(os.path.join(root, INDEX_NAME),'r') as ij:
+            self.index = json.load(ij)
+        self.tables = {}
+        for label,entry in self.index.items():
+            with pa.memory_map(os.path.join(root, entry['file']),'r') as source:
+                self.tables[label] = pa.ipc.open_file(source).read_all()    # buffers stay mapped after close
+
+
+    def _range(self, label: str, school_id: str) -> Tuple[int,int]:
+        return tuple(self.index[label]['ids'].get(str(school_id), (0, 0)))
+
+
+    def school(self,
+               label: str,
+               school_id: str) -> pd.DataFrame:
+        '''returns one school's rows of a frame; only the slice is converted to pandas'''
+        start,stop = self._range(label, school_id)
+        return self.tables[label].slice(start, stop - start).to_pandas()
+
+
+    def school_frames(self,
+                      school_id: str) -> Dict[str,pd.DataFrame]:
+        '''returns one school's rows of every frame, keyed like the published data'''
+        return {label: self.school(label, school_id) for label in self.tables}
+
+
+    def frame(self,
+              label: str) -> pd.DataFrame:
+        '''returns a whole frame as pandas; copies, so prefer school() in workers'''
+        return self.tables[label].to_pandas()
@@ -1,85 +1,73 @@
-import os
-from typing import Dict
+from typing import Dict, Optional
 
 import folium
 import folium.plugins
-from genpeds import Characteristics
 
-
-# MAP
-_map = folium.Map(location=(39.8097343, -98.5556199),
-                  zoom_control='topright',
-                  tiles='Cartodb voyager',
-                  zoom_start=5)
-# full screen
-_fullscreen = folium.plugins.Fullscreen(position='topright')
-_fullscreen.add_to(_map)
-
-# rm leaflet attr, cleaner attribution line
-# Note that Leaflet creator himself says this is okay: https://groups.google.com/g/leaflet-js/c/fA6M7fbchOs/m/JTNVhqdc7JcJ
-map_id = _map.get_name()
-remove_leaflet_text_js = f'''
-<script>
-    setTimeout(function() {{
-        if (typeof {map_id} !== 'undefined' && {map_id}.attributionControl && {map_id}.attributionControl.setPrefix) {{
-            {map_id}.attributionControl.setPrefix('');
-        }}
-    }}, 50);
-</script>
-'''
-_map.get_root().html.add_child(folium.Element(remove_leaflet_text_js))
+from html_min import StyleRegistry, minify_html
+from landing_map import base_map
+from school_index import SchoolIndex
+from search_index import build_search_index, search_control
+from output_sink import OutputTarget
+from stable_output import StableIds
+from utils import LMLABEL_HEAD, TOOLTIP_STYLE
 
 
 class SimpleLandingMap:
     '''simplified version of HEMAC landing page map'''
     def __init__(self,
                  schools: Dict[str,str],
-                 most_recent_year: int = 2023):
+                 most_recent_year: int = 2023,
+                 deterministic: bool = True,
+                 output: Optional[OutputTarget] = None):
         '''
         Build HEMAC landing page map of partner schools
         
         :param schools: dict of partner school "ID: Name" key-value pairs
         :param most_recent_year: most recent year of data; defaults to 2023
+        :param deterministic: seed element ids from stable keys so identical inputs render byte-identical pages
+        :param output: output root and sink the map is written to; docs/ if not given
         '''
-        dat = Characteristics(year_range=most_recent_year).run()
-        dat = dat.loc[dat['id'].isin(schools.keys())]
-        dat['name'] = dat['id'].map(schools)
-        
         self.schools = schools
-        self.dat = dat
-        self.map = _map
+        self.records = SchoolIndex.load(most_recent_year).records(schools)
+        self.deterministic = deterministic
+        self.output = output if output is not None else OutputTarget()
+        self.map = base_map(StableIds('simple_landing_map',deterministic))
+        self.styles = StyleRegistry()   # inline popup/tooltip styles, hoisted into one stylesheet
     
 
-    def build_map(self) -> None:
-        '''builds folium map'''
-        fg = folium.FeatureGroup()
+    def build_map(self,
+                  filename: str = 'simple_landing_map.html') -> None:
+        '''
+        builds folium map
+
+        :param filename: output file name in map/ under the output root
+        '''
+        ids = StableIds(filename,self.deterministic)
+        fg = ids.assign(folium.FeatureGroup())
         fg.add_to(self.map)
-        search_bar = folium.plugins.Search(layer=fg,
-                                           search_label='name',
-                                           placeholder='Search by HEMAC school name/location',
-                                           color='#06474D')
-        search_bar.add_to(self.map)
-        
-        for idx, r in self.dat.iterrows():
-            popup = (
-                '<html><div style="color:#001A50;">' +
-                f'<div style="font-size:18px;font-family:Source Sans Pro;"><b>{r['name']}</b></div>' +
-                f'<div style="font-size:13px;"><i>{r['city']}, {r['state']}</i></div>' +
-                f'<div style="font-size:13px;"><a target="_blank" rel="noopener noreferrer" href="{r['webaddress']}">{r['webaddress']}</a></div>'
-                '<br>'
-            )
+        markers = []
+        for r in self.records:
+            popup = LMLABEL_HEAD.format(name=r.name,
+                                        city=r.city,
+                                        state=r.state,
+                                        webaddr=r.webaddr) + '</div></html>'
             mkr = folium.Marker(
-                location=[r['latitude'], r['longitude']],
-                popup=popup,
-                tooltip=folium.Tooltip(text=f"<b>{r['name']}</b><br>({r['city']}, {r['state']})",
-                                       style='color:#001A50;font-family:Source Sans Pro;font-size:13px;text-align:center;'),
+                location=[r.lat, r.lon],
+                popup=self.styles.hoist(minify_html(popup)),
+                tooltip=folium.Tooltip(text=self.styles.hoist(
+                    f'<div style="{TOOLTIP_STYLE}"><b>{r.name}</b><br>({r.city}, {r.state})</div>')),
                 icon=folium.plugins.BeautifyIcon(icon_shape='marker',
-                                       icon='institution',
-                                       text_color="white",
-                                       border_width=0,
-                                       background_color="#001950B1"),
-                name=r['name']
+                                                 icon='institution',
+                                                 text_color="white",
+                                                 border_width=0,
+                                                 background_color="#001950B1")
             )
+            ids.assign(mkr,r.id)    # a school's element ids don't depend on the other schools
             mkr.add_to(fg)
+            markers.append(mkr.get_name())
         
-        self.map.save(os.path.join('docs','map','simple_landing_map.html'))
+        index = build_search_index([(r.name,r.city,r.state) for r in self.records], markers)
+        self.map.get_root().html.add_child(folium.Element(search_control(index,self.map.get_name())))
+        self.map.get_root().header.add_child(folium.Element(self.styles.stylesheet()))
+        page = minify_html(self.map.get_root().render())
+        self.output.write(self.output.path('map',filename), page)
@@ -1,30 +1,39 @@
 import os
-from typing import Dict
+from typing import Dict, Optional
 
-from genpeds import Characteristics
+from assets import TABLE_CSS, TABLE_JS, asset_tags
+from html_min import minify_html
+from school_index import SchoolIndex
+from output_sink import OutputTarget
 
 
 class SimpleLandingTable:
     '''HEMAC partners landing table'''
     def __init__(self,
                  schools: Dict[str,str],
-                 most_recent_year: int = 2023):
+                 most_recent_year: int = 2023,
+                 output: Optional[OutputTarget] = None):
         '''
         Build HEMAC landing page table of partner schools
         
         :param schools: dict of partner school "ID: Name" key-value pairs
         :param most_recent_year: most recent year of data; defaults to 2023
+        :param output: output root and sink the table is written to; docs/ if not given
         '''
-        dat = Characteristics(year_range=most_recent_year).run()
-        dat = dat.loc[dat['id'].isin(schools.keys())]
-        dat['name'] = dat['id'].map(schools)
+        dat = SchoolIndex.load(most_recent_year).frame(schools)
         
         self.schools = schools
         self.dat = dat
+        self.output = output if output is not None else OutputTarget()
     
 
-    def build_table(self) -> None:
-        '''generate landing table'''
+    def build_table(self,
+                    filename: str = 'simple_landing_table.html') -> None:
+        '''
+        generate landing table
+
+        :param filename: output file name in table/ under the output root
+        '''
         COLS2KEEP = {
             'name': 'School',
             'city': 'City',
@@ -37,6 +46,7 @@ class SimpleLandingTable:
                                    table_id='hemac_schools',
                                    classes='cell-border display compact hover table table-striped')
 
+        page_dir = self.output.path('table')
         dataTable = f'''
                     <!DOCTYPE html>
                         <html lang="en">
@@ -44,19 +54,8 @@ class SimpleLandingTable:
                         <meta charset="UTF-8">
                         <title>HEMAC Schools</title>
 
-                        <!-- Bootstrap CSS -->
-                        <link
-                            href="https://cdnjs.cloudflare.com/ajax/libs/twitter-bootstrap/5.3.0/css/bootstrap.min.css"
-                            rel="stylesheet"
-                            integrity="sha384-…"
-                            crossorigin="anonymous"
-                        />
-
-                        <!-- DataTables + Buttons CSS -->
-                        <link
-                            href="https://cdn.datatables.net/v/bs5/dt-2.3.1/r-3.0.4/b-3.2.3/b-html5-3.2.3/b-print-3.2.3/datatables.min.css"
-                            rel="stylesheet"
-                        />
+                        <!-- Bootstrap + DataTables CSS -->
+                        {asset_tags(TABLE_CSS, page_dir, self.output.asset_root)}
                         <style>
                             /* ==== Pagination ==== */
                             .dataTables_wrapper .dataTables_paginate .pagination .page-item.active .page-link {{
@@ -127,22 +126,7 @@ class SimpleLandingTable:
                         {dat_html}
 
                         <!-- JS dependencies at end for faster load -->
-                        <script
-                            src="https://code.jquery.com/jquery-3.7.0.min.js"
-                            integrity="sha256-…"
-                            crossorigin="anonymous">
-                        </script>
-                        <script
-                            src="https://cdnjs.cloudflare.com/ajax/libs/twitter-bootstrap/5.3.0/js/bootstrap.bundle.min.js"
-                            integrity="sha384-…"
-                            crossorigin="anonymous">
-                        </script>
-                        <script
-                            src="https://cdn.datatables.net/v/bs5/dt-2.3.1/b-3.2.3/b-html5-3.2.3/b-print-3.2.3/datatables.min.js">
-                        </script>
-                        <script src="https://cdnjs.cloudflare.com/ajax/libs/pdfmake/0.2.7/pdfmake.min.js"></script>
-                        <script src="https://cdnjs.cloudflare.com/ajax/libs/pdfmake/0.2.7/vfs_fonts.js"></script>
-                        <script src="https://cdnjs.cloudflare.com/ajax/libs/jszip/3.10.1/jszip.min.js"></script>
+                        {asset_tags(TABLE_JS, page_dir, self.output.asset_root)}
 
                         <script>
                         $(function () {{
@@ -165,6 +149,5 @@ class SimpleLandingTable:
                         </body>
                     </html>
 '''
-        with open(os.path.join('docs','table','simple_landing_table.html'),'w') as lt_html:
-            lt_html.write(dataTable)
+        self.output.write(os.path.join(page_dir,filename), minify_html(dataTable))
         
\ No newline at end of file
@@ -0,0 +1,112 @@
+from functools import reduce
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+SPARK_WIDTH, SPARK_HEIGHT, SPARK_PAD = 60, 16, 1.5
+# trend per key: (label, surveys, minuend column, subtrahend column or None, unit)
+# a school's trend comes from the first of the surveys it has rows in
+SPARK_METRICS = {
+    'share_ug': ('Undergrad male share', ('enrollment_undergrad',), 'totmen_share', None, '%'),
+    'share_g': ('Graduate male share', ('enrollment_grad',), 'totmen_share', None, '%'),
+    'grad_gap': ('Graduation gap (men - women)', ('graduation_four_year', 'graduation_two_year'),
+                 'gradrate_totmen', 'gradrate_totwomen', 'pp'),
+    'accept_gap': ('Acceptance gap (men - women)', ('admissions',), 'accept_rate_men', 'accept_rate_women', 'pp')
+}
+SPARK_CSS = (f'.hs{{width:{SPARK_WIDTH}px;height:{SPARK_HEIGHT}px;fill:none;stroke:#4D6F91;stroke-width:1.5;vertical-align:middle}}'
+             '.hs circle{fill:#4D6F91;stroke:none}.hs line{stroke:#bbb;stroke-width:.5}')
+
+
+def _fmt(values: np.ndarray) -> np.ndarray:
+    return np.char.mod('%.1f', np.round(values, 1))
+
+
+def sparkline_svgs(wide: pd.DataFrame,
+                   label: str,
+                   unit: str = '') -> pd.Series:
+    '''
+    renders one inline SVG sparkline per row of a schools x years frame, vectorized across schools
+
+    each row is scaled to its own range; gaps in the series break the line, a zero line is drawn
+    when the range crosses zero and the latest point is marked. rows without values give ''.
+    sizes and colors come from SPARK_CSS, which pages showing sparklines must include
+
+    :param wide: values indexed by school id, one column per year in ascending order
+    :param label: metric name for the SVG title (hover text and accessible name)
+    :param unit: suffix of the first/last values in the title, e.g. '%'
+    '''
+    arr = wide.to_numpy(dtype=float)
+    if arr.size == 0:
+        return pd.Series('', index=wide.index, dtype=object)
+    years = wide.columns.to_numpy(dtype=float)
+    valid = ~np.isnan(arr)
+    has_any = valid.any(axis=1)
+    filled = np.where(valid, arr, 0)
+    lo = np.where(valid, arr, np.inf).min(axis=1, keepdims=True)
+    hi = np.where(valid, arr, -np.inf).max(axis=1, keepdims=True)
+    span = np.where(hi > lo, hi - lo, 1)
+    inner_w, inner_h = SPARK_WIDTH - 2 * SPARK_PAD, SPARK_HEIGHT - 2 * SPARK_PAD
+    x = SPARK_PAD + (years - years.min()) / max(years.max() - years.min(), 1) * inner_w
+    y = np.where(hi > lo, SPARK_PAD + (hi - filled) / span * inner_h, SPARK_HEIGHT / 2)
+
+    # one path command per cell: M after a gap, L otherwise, nothing for missing values
+    prev_valid = np.hstack([np.zeros((len(arr), 1), dtype=bool), valid[:, :-1]])
+    cells = np.char.add(np.char.add(np.where(prev_valid, 'L', 'M'), np.broadcast_to(_fmt(x), arr.shape)),
+                        np.char.add(' ', _fmt(y)))
+    cells = np.where(valid, cells, '')
+    paths = reduce(np.char.add, cells.T.astype(object)) if arr.shape[1] > 1 else cells[:, 0].astype(object)
+
+    rows = np.arange(len(arr))
+    first = valid.argmax(axis=1)
+    last = arr.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    zero_y = SPARK_PAD + hi[:, 0] / span[:, 0] * inner_h
+    crosses = (lo[:, 0] < 0) & (hi[:, 0] > 0)
+
+    s = lambda a: pd.Series(a, index=wide.index).astype(str)
+    yr = lambda i: s(years[i].astype(int))
+    val = lambda i: s(np.round(np.nan_to_num(arr[rows, i])).astype(int))
+    title = (f'{label} ' + yr(first) + '–' + yr(last) + ': ' + val(first) + unit
+             + ' → ' + val(last) + unit)
+    zero = pd.Series(np.where(crosses, np.char.add(np.char.add(f'<line x1="0" x2="{SPARK_WIDTH}" y1="', _fmt(zero_y)),
+                                                   np.char.add('" y2="', np.char.add(_fmt(zero_y), '"/>'))), ''),
+                     index=wide.index)
+    svg = (f'<svg class="hs" viewBox="0 0 {SPARK_WIDTH} {SPARK_HEIGHT}" role="img">'
+           + '<title>' + title + '</title>' + zero + '<path d="' + pd.Series(paths, index=wide.index) + '"/>'
+           + '<circle cx="' + s(_fmt(x[last])) + '" cy="' + s(_fmt(y[rows, last])) + '" r="1.5"/></svg>')
+    return svg.where(has_any, '')
+
+
+def _first_survey_rows(data: Dict[str,pd.DataFrame],
+                       surveys: Tuple[str,...]) -> Optional[pd.DataFrame]:
+    '''rows of each school from the first of the surveys reporting it, e.g. four-year graduation before two-year'''
+    frames, seen = [], set()
+    for survey in surveys:
+        if survey not in data:
+            continue
+        df = data[survey]
+        frames.append(df.loc[~df['id'].isin(seen)])
+        seen.update(df['id'])
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def build_sparklines(data: Dict[str,pd.DataFrame]) -> Dict[str,Dict[str,str]]:
+    '''
+    builds every school's trend sparklines from multi-year survey frames, one vectorized pass per metric
+
+    :param data: survey frames keyed like PlotGenerator.data
+    :returns: school id -> {SPARK_METRICS key: SVG, or '' without data}
+    '''
+    columns = {}
+    for key,(label,surveys,col,minus,unit) in SPARK_METRICS.items():
+        df = _first_survey_rows(data, surveys)
+        if df is None:
+            continue
+        values = df[col] if minus is None else df[col] - df[minus]
+        wide = (pd.DataFrame({'id': df['id'].to_numpy(), 'year': df['year'].to_numpy(), 'value': values.to_numpy()})
+                .pivot_table(index='id', columns='year', values='value', aggfunc='mean', dropna=False)
+                .sort_index(axis=1))
+        columns[key] = sparkline_svgs(wide, label, unit)
+    trends = pd.DataFrame(columns).reindex(columns=list(SPARK_METRICS)).fillna('')
+    return trends.to_dict('index')
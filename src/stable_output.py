@@ -0,0 +1,89 @@
+import hashlib
+import os
+from collections import Counter, OrderedDict
+from typing import Union
+
+from branca.element import Element
+
+
+def stable_id(*keys) -> str:
+    '''returns a 32 character hex id derived from keys, in place of a random uuid'''
+    return hashlib.sha256('/'.join(str(k) for k in keys).encode('utf-8')).hexdigest()[:32]
+
+
+class StableIds:
+    '''
+    id factory giving folium/branca elements ids from stable keys, so identical inputs render identical pages
+
+    elements get ids from (key, scope, n), where n counts elements given ids in that scope; scoping
+    markers by school id keeps a school's ids unchanged when other schools are added or removed.
+    each page owns its factory and assigns ids explicitly, so nothing is patched into branca and
+    pages can be built concurrently
+    '''
+    def __init__(self,
+                 key: str,
+                 enabled: bool = True):
+        '''
+        :param key: page key, e.g. the output file name
+        :param enabled: if False, elements keep branca's random ids
+        '''
+        self.key = key
+        self.enabled = enabled
+        self._counts = Counter()
+
+
+    def _next_id(self, scope: str) -> str:
+        self._counts[scope] += 1
+        return stable_id(self.key, scope, self._counts[scope])
+
+
+    def assign(self,
+               element: Element,
+               scope: str = '') -> Element:
+        '''
+        gives an element and its descendants stable ids, in tree order; returns the element
+
+        call before the element's name is used, e.g. baked into a script or added to a parent
+
+        :param scope: ids depend only on the key, scope and order of assignment within the scope
+        '''
+        if self.enabled:
+            parent = element._parent
+            keyed = parent is not None and parent._children.get(element.get_name()) is element
+            self._assign_tree(element, str(scope))
+            if keyed:
+                parent._children = OrderedDict((child.get_name() if child is element else key, child)
+                                               for key,child in parent._children.items())
+        return element
+
+
+    def _assign_tree(self,
+                     element: Element,
+                     scope: str) -> None:
+        # children are keyed by their name when added; keys follow the new names
+        by_name = [(key == child.get_name(), key, child) for key,child in element._children.items()]
+        element._id = self._next_id(scope)
+        for _,_,child in by_name:
+            self._assign_tree(child, scope)
+        element._children = OrderedDict((child.get_name() if named else key, child) for named,key,child in by_name)
+        for part in ('header', 'html', 'script'):   # a Figure's sections are attributes rather than children
+            section = element.__dict__.get(part)
+            if isinstance(section, Element):
+                self._assign_tree(section, scope)
+
+
+def write_if_changed(path: str,
+                     content: Union[str,bytes]) -> bool:
+    '''
+    writes content to path unless the file already holds exactly that content
+
+    :returns: whether the file was written
+    '''
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path,'rb') as existing:
+            if existing.read() == data:
+                return False
+    with open(path,'wb') as out:
+        out.write(data)
+    return True
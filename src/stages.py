@@ -0,0 +1,102 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Sequence
+
+
+class Stage:
+    '''one step of the build; runs once all its dependencies have finished'''
+    def __init__(self,
+                 name: str,
+                 func: Callable[..., Any],
+                 deps: Sequence[str] = ()):
+        '''
+        :param name: unique stage name, used by other stages' deps
+        :param func: called with the results of deps, in deps order
+        :param deps: names of stages that must finish first
+        '''
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+
+
+def topological_order(stages: Sequence[Stage]) -> List[str]:
+    '''
+    returns stage names with every stage after its dependencies
+
+    :raises ValueError: on duplicate names, unknown dependencies or cycles
+    '''
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f'duplicate stage {stage.name!r}')
+        by_name[stage.name] = stage
+    for stage in stages:
+        unknown = [d for d in stage.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f'stage {stage.name!r} depends on unknown stages {unknown}')
+    order, done = [], set()
+    while len(order) < len(stages):
+        ready = [s.name for s in stages if s.name not in done and all(d in done for d in s.deps)]
+        if not ready:
+            raise ValueError(f'dependency cycle among {sorted(set(by_name) - done)}')
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+def run_stages(stages: Sequence[Stage],
+               max_workers: int = 4) -> Dict[str,Any]:
+    '''
+    runs stages concurrently as soon as their dependencies finish, so independent loads and renders overlap
+
+    stages run on threads: survey loads wait on the network and disk, and the plots stage fans
+    rendering out to its own processes. after a failure no new stage starts; stages already running
+    finish, then the first error is raised
+
+    :param max_workers: stages running at once
+    :returns: stage name -> result
+    :raises ValueError: if the stage graph is invalid
+    '''
+    topological_order(stages)   # validate before starting anything
+    pending = {s.name: s for s in stages}
+    results: Dict[str,Any] = {}
+    timings: Dict[str,float] = {}
+    running: Dict[Future,str] = {}
+    error = None
+    start = time.perf_counter()
+
+    def timed(stage: Stage, args: List[Any]) -> Any:
+        began = time.perf_counter()
+        try:
+            return stage.func(*args)
+        finally:
+            timings[stage.name] = time.perf_counter() - began
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        while pending or running:
+            if error is None:
+                for name in [n for n,s in pending.items() if all(d in results for d in s.deps)]:
+                    stage = pending.pop(name)
+                    running[pool.submit(timed, stage, [results[d] for d in stage.deps])] = name
+            if not running:
+                break
+            done,_ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    error = error or e
+                    print(f'stage {name} failed: {e!r}')
+                    continue
+                print(f'stage {name} done in {timings[name]:.1f}s')
+    if error is not None:
+        raise error
+
+    # longest chain of stage run times, the floor on wall time however many workers run
+    path: Dict[str,float] = {}
+    for name in topological_order(stages):
+        deps = next(s.deps for s in stages if s.name == name)
+        path[name] = timings[name] + max((path[d] for d in deps), default=0)
+    print(f'build stages finished in {time.perf_counter() - start:.1f}s; critical path {max(path.values(), default=0):.1f}s')
+    return results
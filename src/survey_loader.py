@@ -0,0 +1,260 @@
+import functools
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+import zipfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from download_cache import DownloadCache, place, shared_cache
+from fixtures import replaying, run_survey
+
+
+NCES_RECENT_URL = 'https://nces.ed.gov/ipeds/complete-data-files/'    # years after 2022
+NCES_ARCHIVE_URL = 'https://nces.ed.gov/ipeds/datacenter/data/'
+REQUEST_TIMEOUT = (10, 120)     # connect and per-read timeouts, in seconds
+RETRYABLE = (OSError, RuntimeError, zipfile.BadZipFile)    # requests errors are OSErrors
+BASE_URL = os.environ.get('HEMAC_IPEDS_URL')    # stand-in file server for all downloads, if set
+
+_placed = Counter()     # raw files in use by running loads, removed when no load needs them
+_placed_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _genpeds_endpoints() -> Dict[str,Dict[str,str]]:
+    import genpeds
+    with open(Path(genpeds.__file__).parent / 'cfg.json','r') as cfgjf:
+        return {subject: spec['endpoints'] for subject,spec in json.load(cfgjf).items() if 'endpoints' in spec}
+
+
+def genpeds_files(survey,
+                  year_range) -> Dict[Tuple[str,int],Tuple[str,str]]:
+    '''
+    (subject, year) -> (IPEDS file name, local raw path) of each raw file genpeds reads to load a survey
+
+    the one place relying on genpeds internals: the subject attribute of survey classes, the endpoints
+    of its cfg.json, downloader.get_year_iter and the <subject>data/ layout of raw files. none of these
+    are public API, so genpeds is pinned in requirements.txt; tests stub this function instead
+
+    :param survey: genpeds survey class, e.g. Admissions, or its subject name, e.g. 'admissions'
+    :param year_range: single year or list of years
+    '''
+    from genpeds.downloader import get_year_iter
+    subject = survey if isinstance(survey, str) else survey.subject
+    endpoints = _genpeds_endpoints()[subject]
+    return {(subject, year): (endpoints[str(year)], os.path.join(f'{subject}data', f'{subject}_{year}.csv'))
+            for year in get_year_iter(subject, year_range)}
+
+
+def raw_path(subject: str, year: int) -> str:
+    '''where genpeds looks for a subject-year raw file'''
+    return genpeds_files(subject, year)[subject, year][1]
+
+
+def raw_url(subject: str,
+            year: int,
+            base_url: Optional[str] = None) -> str:
+    '''
+    URL of a subject-year IPEDS zip
+
+    :param base_url: server to download from instead of NCES, e.g. a local stand-in file server; defaults to BASE_URL
+    '''
+    base_url = base_url or BASE_URL
+    if base_url is None:
+        base_url = NCES_RECENT_URL if year > 2022 else NCES_ARCHIVE_URL
+    return base_url.rstrip('/') + '/' + genpeds_files(subject, year)[subject, year][0] + '.zip'
+
+
+def fetch_raw(subject: str,
+              year: int,
+              base_url: Optional[str] = None,
+              timeout: Tuple[float,float] = REQUEST_TIMEOUT,
+              cache: Optional[DownloadCache] = None) -> str:
+    '''
+    puts a subject-year raw file where genpeds expects it, from the cache or else downloaded and extracted
+
+    :param cache: download cache keyed by URL; without one, a raw file already on disk is used as is
+    :returns: path of the raw file
+    :raises KeyError: if IPEDS has no file for the subject-year
+    '''
+    path = raw_path(subject, year)
+    url = raw_url(subject, year, base_url)
+    obj = cache.lookup(url) if cache is not None else None
+    if obj is None:
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            if cache is None:
+                return path
+            with open(path,'rb') as existing:    # adopt a raw file left by an earlier build
+                content = existing.read()
+        else:
+            content = _download(url, subject, year, timeout)
+            if cache is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.hemac-', suffix='.part',
+                                                 delete=False) as part:
+                    part.write(content)
+                os.replace(part.name, path)
+                return path
+        obj = cache.put(url, content)
+    place(obj, path)
+    return path
+
+
+def _download(url: str,
+              subject: str,
+              year: int,
+              timeout: Tuple[float,float]) -> bytes:
+    '''downloads an IPEDS zip and returns its csv'''
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    with zipfile.ZipFile(io.BytesIO(resp.content)) as archive:
+        members = [m for m in archive.infolist() if m.filename.lower().endswith('.csv')]
+        if not members:
+            raise zipfile.BadZipFile(f'no csv in {subject} {year} download')
+        # revised (_rv) files supersede the originals, as in genpeds
+        member = max(members, key=lambda m: (Path(m.filename).stem.lower().endswith('_rv'), m.filename.lower()))
+        return archive.read(member)
+
+
+def with_retries(func: Callable,
+                 *args,
+                 retries: int = 2,
+                 backoff: float = 2.0):
+    '''calls func, retrying transient failures with exponential backoff (backoff, 2*backoff, ...)'''
+    for attempt in range(retries + 1):
+        try:
+            return func(*args)
+        except RETRYABLE as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            print(f'{getattr(func, "__name__", func)}{args} failed ({e}), retrying in {delay:g}s')
+            time.sleep(delay)
+
+
+class SurveyLoad:
+    '''one genpeds survey load: survey class, years and run() arguments'''
+    def __init__(self,
+                 survey: type,
+                 year_range,
+                 *level: str,
+                 merge_with_char: bool = False):
+        '''
+        :param survey: genpeds survey class, e.g. Admissions
+        :param year_range: single year or list of years
+        :param level: student/degree level for Enrollment and Graduation, e.g. 'undergrad' or 'bach'
+        :param merge_with_char: merge Characteristics (name, sector, ...) into the survey
+        '''
+        self.survey = survey
+        self.year_range = year_range
+        self.level = level
+        self.merge_with_char = merge_with_char
+
+
+    def raw_files(self) -> List[Tuple[str,int]]:
+        '''(subject, year) raw files the load reads'''
+        surveys = [self.survey] + ['characteristics'] * self.merge_with_char
+        return [f for survey in surveys for f in genpeds_files(survey, self.year_range)]
+
+
+    def run(self) -> pd.DataFrame:
+        '''runs the genpeds load, or replays its fixture; raw files already on disk are not downloaded again'''
+        return run_survey(self.survey, self.year_range, *self.level, False, self.merge_with_char, False)
+
+
+def _run_all(pool: ThreadPoolExecutor,
+             jobs: Dict,
+             timeout: float) -> Dict:
+    '''
+    runs jobs (key -> zero-argument callable) on pool; returns key -> result
+
+    :param timeout: seconds each job may run, counted from when it starts
+    :raises TimeoutError: when a job runs longer than timeout
+    '''
+    started = {}
+    def timed(key, job):
+        started[key] = time.monotonic()
+        return job()
+
+    futures = {pool.submit(timed, key, job): key for key,job in jobs.items()}
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=min(1, timeout), return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for fut in pending:
+            key = futures[fut]
+            if key in started and now - started[key] > timeout:
+                raise TimeoutError(f'{key} did not finish within {timeout:.0f}s')
+    return {key: fut.result() for fut,key in futures.items()}
+
+
+def load_surveys(surveys: Dict[str,SurveyLoad],
+                 max_workers: int = 4,
+                 timeout: float = 900,
+                 retries: int = 2,
+                 backoff: float = 2.0,
+                 base_url: Optional[str] = None,
+                 cache: Optional[DownloadCache] = None,
+                 keep_raw: bool = False) -> Dict[str,pd.DataFrame]:
+    '''
+    loads surveys concurrently, so loading takes about as long as the slowest survey
+
+    raw files are fetched first, once per (subject, year) across all surveys, then each survey is
+    cleaned by genpeds from disk; both phases use a bounded thread pool and retry transient failures.
+    when replaying fixtures nothing is fetched
+
+    :param surveys: label -> SurveyLoad
+    :param max_workers: pool size; also caps concurrent requests to NCES
+    :param timeout: seconds each download or survey may take, counted from when it starts
+    :param retries: retries per download or survey after the first attempt
+    :param backoff: seconds before the first retry, doubled for each following retry
+    :param base_url: server to download raw files from instead of NCES, e.g. a local stand-in file server
+    :param cache: download cache; defaults to the shared cache under CACHE_ROOT
+    :param keep_raw: keep genpeds' working copies of raw files after loading; otherwise only the cache keeps them
+    :returns: label -> survey frame
+    :raises TimeoutError: if a download or survey runs longer than timeout
+    '''
+    raw = [] if replaying() else sorted({f for load in surveys.values() for f in load.raw_files()})
+    cache = cache if cache is not None else shared_cache()
+    with _placed_lock:
+        _placed.update(raw)
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    finished = False
+    try:
+        def prefetch(f):
+            try:
+                with_retries(fetch_raw, *f, base_url, REQUEST_TIMEOUT, cache, retries=retries, backoff=backoff)
+            except (KeyError, *RETRYABLE) as e:
+                return e
+        fetched = _run_all(pool, {f: (lambda f=f: prefetch(f)) for f in raw}, timeout)
+        failed = [f'{subject} {year}' for (subject,year),e in fetched.items() if e is not None]
+        if failed:
+            # genpeds tries these again, and reports what is unavailable, when the surveys run
+            warnings.warn(f'{len(failed)} raw files could not be prefetched: {", ".join(failed)}')
+
+        runs = {label: (lambda load=load: with_retries(load.run, retries=retries, backoff=backoff))
+                for label,load in surveys.items()}
+        loaded = _run_all(pool, runs, timeout)
+        finished = True
+        return loaded
+    finally:
+        pool.shutdown(wait=finished, cancel_futures=True)
+        # after a failure, abandoned workers may still be reading their raw files, so those stay placed
+        # for the life of the process; the next build's fetch_raw adopts or replaces them
+        if finished:
+            with _placed_lock:
+                _placed.subtract(raw)
+                unused = [f for f in raw if _placed[f] <= 0]
+                for f in unused:
+                    del _placed[f]
+                    if not keep_raw and os.path.exists(raw_path(*f)):
+                        os.remove(raw_path(*f))
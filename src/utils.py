@@ -87,6 +87,213 @@ LMLABEL_GRADUATION_BACH = '''
 </div>'''
 
 
+# peer percentile line shown under a section
+LMLABEL_PERCENTILE = '<div style="color:#4D6F91;font-size:12px;font-family:Source Sans Pro;"><i>{metric} higher than <b>{pct}%</b> of {peer}</i></div><br>'
+
+
+# inline SVG sparklines of the school's trends; {trends} holds one LMLABEL_TREND_ITEM per metric with data
+LMLABEL_TRENDS = '<div style="color:#001A50;font-size:13px;font-family:Source Sans Pro;"><b>Trends</b><br>{trends}</div><br>'
+LMLABEL_TREND_ITEM = '<span style="margin-right:12px;white-space:nowrap;">{label} {svg}</span>'
+
+
+# fixed-width spacer that sets the popup width, then closes LMLABEL_HEAD
+LMLABEL_TAIL = '<div style="width:480px;"></div></div></html>'
+
+TOOLTIP_STYLE = 'color:#001A50;font-family:Source Sans Pro;font-size:13px;text-align:center;'
+
+
+# year selector for multi-year maps; re-renders every popup from LABEL_SECTIONS and per-year values
+YEAR_SELECT = r'''
+<div style="position:absolute;top:52px;left:60px;z-index:1000;background:#ffffff;padding:4px 8px;border-radius:4px;font-family:Source Sans Pro;color:#001A50;">
+<label for="hemac-year-select"><b>Year</b></label>
+<select id="hemac-year-select">{options}</select>
+</div>
+<script>
+(function () {{
+    const blob = {blob};
+    const fill = function (template, vals) {{
+        return template.replace(/\{{(\w+)\}}/g, function (m, key) {{ return key in vals ? vals[key] : m; }});
+    }};
+    const render = function (year) {{
+        const rows = blob.years[year];
+        Object.keys(blob.markers).forEach(function (schl) {{
+            const row = rows[schl];
+            const vals = Object.assign({{}}, blob.headers[schl]);
+            blob.fields.forEach(function (field, i) {{ vals[field] = row ? row[i] : 0; }});
+            const html = blob.sections
+                .filter(function (sec) {{ return sec[0] === null || vals[sec[0]]; }})
+                .map(function (sec) {{ return fill(sec[1], vals); }})
+                .join('');
+            window[blob.markers[schl]].setPopupContent(html);
+        }});
+    }};
+    document.getElementById('hemac-year-select').addEventListener('change', function (e) {{
+        render(e.target.value);
+    }});
+}})();
+</script>
+'''
+
+
+# map search box over a prebuilt prefix/trigram index (see search_index.py)
+SEARCH_CONTROL = r'''
+<div style="position:absolute;top:10px;left:60px;z-index:1001;width:320px;font-family:Source Sans Pro;color:#001A50;">
+<input id="hemac-search" type="search" autocomplete="off" placeholder="{placeholder}" aria-label="{placeholder}"
+ style="width:100%;padding:6px 10px;border:2px solid #06474D;border-radius:4px;">
+<div id="hemac-search-results" role="listbox" style="background:#ffffff;border-radius:4px;max-height:260px;overflow-y:auto;"></div>
+</div>
+<script>
+(function () {{
+    const idx = {index};
+    const input = document.getElementById('hemac-search');
+    const results = document.getElementById('hemac-search-results');
+    const norm = function (s) {{
+        return s.toLowerCase().normalize('NFD').replace(/[\u0300-\u036f]/g, '').replace(/[^a-z0-9]+/g, ' ').trim();
+    }};
+    const intersect = function (a, b) {{
+        if (a === null) return b;
+        const keep = new Set(b);
+        return a.filter(function (i) {{ return keep.has(i); }});
+    }};
+    const search = function (q) {{
+        const words = norm(q).split(' ').filter(Boolean);
+        let hits = null;
+        words.forEach(function (w) {{
+            if (w.length < 3) {{
+                hits = intersect(hits, idx.pre[w] || []);
+            }} else {{
+                for (let j = 0; j + 3 <= w.length; j++) hits = intersect(hits, idx.tri[w.substr(j, 3)] || []);
+            }}
+        }});
+        return (hits || []).filter(function (i) {{
+            const text = ' ' + idx.text[i];
+            return words.every(function (w) {{ return w.length < 3 ? text.includes(' ' + w) : text.includes(w); }});
+        }}).slice(0, 8);
+    }};
+    const select = function (i) {{
+        const marker = window[idx.markers[i]];
+        {map}.setView(marker.getLatLng(), Math.max({map}.getZoom(), 10));
+        marker.openPopup();
+        results.innerHTML = '';
+        input.value = idx.docs[i];
+    }};
+    input.addEventListener('input', function () {{
+        results.innerHTML = '';
+        search(input.value).forEach(function (i) {{
+            const item = document.createElement('div');
+            item.textContent = idx.docs[i];
+            item.setAttribute('role', 'option');
+            item.style.cssText = 'padding:4px 10px;cursor:pointer;';
+            item.addEventListener('click', function () {{ select(i); }});
+            results.appendChild(item);
+        }});
+    }});
+    input.addEventListener('keydown', function (e) {{
+        if (e.key !== 'Enter') return;
+        const hits = search(input.value);
+        if (hits.length > 0) select(hits[0]);
+    }});
+}})();
+</script>
+'''
+
+
+# landing table facet selects and pooled summary; {selects} holds one <select> per facet
+TABLE_FACETS = r'''
+<div id="hemac_facets" style="margin-bottom:8px;">{selects}</div>
+<p id="hemac_summary" style="color:#001A50;"></p>
+'''
+
+# runs inside the table's $(function () {{...}}) after `table` exists; {cube} is relative to the page,
+# resolved against its base URL; the facet controls are hidden if the cube can't be loaded
+TABLE_FACETS_JS = r'''
+const facetCols = {columns};
+const decode = function (d) {{ const ta = document.createElement('textarea'); ta.innerHTML = d; return ta.value; }};
+$.getJSON(new URL('{cube}', document.baseURI).href, function (cube) {{
+    const summarize = function () {{
+        const want = {{}};
+        $('.hemac-facet').each(function () {{
+            if (this.value) want[this.dataset.facet] = cube.dims[this.dataset.facet].map(String).indexOf(this.value);
+        }});
+        const year = $('#hemac_year').length ? $('#hemac_year').val() : String(cube.dims.year[cube.dims.year.length - 1]);
+        want.year = cube.dims.year.map(String).indexOf(year);
+        let men = 0, women = 0;
+        const reports = {{}};
+        for (let i = 0; i < cube.cells.men.length; i++) {{
+            let hit = true;
+            for (const f in want) {{ if (cube.cells[f][i] !== want[f]) {{ hit = false; break; }} }}
+            if (!hit) continue;
+            men += cube.cells.men[i];
+            women += cube.cells.women[i];
+            const level = cube.dims.level[cube.cells.level[i]];
+            reports[level] = (reports[level] || 0) + cube.cells.schools[i];
+        }}
+        const total = men + women;
+        const from = Object.keys(reports).map(function (l) {{ return reports[l] + ' ' + l.toLowerCase(); }}).join(' and ');
+        $('#hemac_summary').html(total === 0 ? '<small>No partner enrollment reported for this selection</small>' :
+            '<small><b>Pooled ' + year + '</b>: ' + men.toLocaleString() + ' men and ' + women.toLocaleString() +
+            ' women enrolled, <b>' + Math.round(men / total * 100) + '% men</b> (' + from + ' reports)</small>');
+    }};
+    $('.hemac-facet').on('change', function () {{
+        const col = facetCols[this.dataset.facet], value = this.value;
+        if (col !== undefined) {{
+            table.column(col).search(value ? function (d) {{ return decode(d) === value; }} : '').draw();
+        }}
+        summarize();
+    }});
+    $('#hemac_year').on('change', summarize);
+    summarize();
+}}).fail(function (xhr, status, err) {{
+    $('#hemac_facets, #hemac_summary').hide();
+    if (window.console) console.warn('HEMAC filter cube could not be loaded:', status, err);
+}});
+'''
+
+
+# per-school page; figures are fetched and drawn only when scrolled into view
+SCHOOL_PAGE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>{name} | HEMAC</title>
+<style>
+    body {{ font-family: 'Source Sans Pro'; color: #001A50; margin: 0 auto; max-width: 1100px; padding: 16px; }}
+    h1 {{ font-family: 'Merriweather'; }}
+    .hemac-fig {{ height: 500px; margin-bottom: 32px; }}
+</style>
+<script src="{plotlyjs}" defer></script>
+</head>
+<body>
+<h1>{name}</h1>
+{figures}
+<script>
+document.addEventListener('DOMContentLoaded', function () {{
+    const draw = function (el) {{
+        fetch(el.dataset.src)
+            .then(function (resp) {{ return resp.json(); }})
+            .then(function (fig) {{ Plotly.newPlot(el, fig.data, fig.layout, {{responsive: true}}); }});
+    }};
+    const figs = document.querySelectorAll('.hemac-fig');
+    if (!('IntersectionObserver' in window)) {{
+        figs.forEach(draw);
+        return;
+    }}
+    const observer = new IntersectionObserver(function (entries) {{
+        entries.forEach(function (entry) {{
+            if (entry.isIntersecting) {{
+                observer.unobserve(entry.target);
+                draw(entry.target);
+            }}
+        }});
+    }}, {{rootMargin: '200px'}});
+    figs.forEach(function (el) {{ observer.observe(el); }});
+}});
+</script>
+</body>
+</html>
+'''
+
+
 # LMLABEL_ADMISSIONS = (
 #     '<div style="font-size:15px;font-family:Source Sans Pro;"><b><u>Admissions</u></b>:</div>' +
 #     '<div style="font-size:13px;"><b># Applied</b>: Men - {male_applied} | Women - {female_applied}</div>' +
@@ -120,4 +327,4 @@ LMLABEL_GRADUATION_BACH = '''
 #     '<div style="font-size:15px;font-family:Source Sans Pro;"><b><u>Enrollment (Graduate)</u></b>:</div>' +
 #     '<div style="font-size:13px;"><b># Total Enrollment</b>: Men - {totmen_enroll}% | Women - {totwomen_enroll}%</div>' +    
 #     '<div style="font-size:13px;"><b>% Male Enrollment Share</b>: {totmen_share}%</div>' 
-# )
\ No newline at end of file
+# )
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# src/ holds flat modules imported by name, as the build scripts do
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,43 @@
+import json
+
+from checkpoint import Checkpoint
+
+
+def _lines(checkpoint):
+    with open(checkpoint.path,'r') as cj:
+        return [json.loads(line) for line in cj.read().splitlines()]
+
+
+def test_marks_are_appended_and_compacted(tmp_path):
+    checkpoint = Checkpoint('plots', 'run-a', root=str(tmp_path))
+    checkpoint.mark_done('2', 'schools/Two')
+    checkpoint.mark_done('1', 'schools/One')
+    checkpoint.mark_done('2', 'schools/Two-b')
+    assert len(_lines(checkpoint)) == 4     # header and one line per mark, written as they happen
+    checkpoint.compact()
+    assert _lines(checkpoint) == [{'run_key': 'run-a'}, {'key': '1', 'value': 'schools/One'},
+                                  {'key': '2', 'value': 'schools/Two-b'}]
+
+
+def test_resume_keeps_work_of_the_same_run(tmp_path):
+    first = Checkpoint('plots', 'run-a', root=str(tmp_path))
+    first.mark_done('1', 'schools/One')
+    resumed = Checkpoint('plots', 'run-a', resume=True, root=str(tmp_path))
+    assert resumed.done('1', 'schools/One') and not resumed.done('1', 'schools/Other')
+    resumed.mark_done('2', 'schools/Two')
+    assert Checkpoint('plots', 'run-a', resume=True, root=str(tmp_path)).completed == {
+        '1': 'schools/One', '2': 'schools/Two'}
+    assert Checkpoint('plots', 'run-b', resume=True, root=str(tmp_path)).completed == {}
+    assert Checkpoint('plots', 'run-a', root=str(tmp_path)).completed == {}
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    checkpoint = Checkpoint('plots', 'run-a', root=str(tmp_path))
+    checkpoint.mark_done('1', 'schools/One')
+    checkpoint.mark_done('2', 'schools/Two')
+    with open(checkpoint.path,'r+') as cj:
+        cj.truncate(len(cj.read()) - 5)
+    resumed = Checkpoint('plots', 'run-a', resume=True, root=str(tmp_path))
+    assert resumed.completed == {'1': 'schools/One'}
+    resumed.mark_done('3', 'schools/Three')
+    assert [line.get('key') for line in _lines(resumed)] == [None, '1', '3']
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from filter_cube import build_cube
+
+
+def _enrollment():
+    rng = np.random.default_rng(7)
+    rows = [{'id': str(i), 'year': y, 'state': ['TN', 'AZ', 'VT'][i % 3],
+             'sector': 'Public' if i % 2 else None, 'studentlevel': lev,
+             'totmen': float(rng.integers(0, 500)), 'totwomen': float(rng.integers(0, 500))}
+            for i in range(12) for y in (2021, 2023) for lev in ('undergrad', 'grad') if i % 4 or lev == 'undergrad']
+    rows.append({'id': '99', 'year': 2023, 'state': 'TN', 'sector': 'Public', 'studentlevel': 'grad',
+                 'totmen': np.nan, 'totwomen': np.nan})     # reports nothing, counts nowhere
+    return pd.DataFrame(rows)
+
+
+def _decoded(cube):
+    dims = list(cube['dims'])
+    cells = pd.DataFrame(cube['cells'])
+    for d in dims:
+        cells[d] = [cube['dims'][d][i] for i in cells[d]]
+    return cells.set_index(dims).sort_index()
+
+
+def test_cells_match_a_manual_groupby():
+    df = _enrollment()
+    cube = build_cube(df)
+    assert list(cube['dims']) == ['state', 'sector', 'level', 'year']
+    assert cube['dims']['level'] == ['Graduate', 'Undergraduate']
+    assert cube['dims']['sector'] == ['Public', 'Unknown']
+    manual = (df.dropna(subset=['totmen', 'totwomen'], how='all')
+              .assign(sector=lambda d: d['sector'].fillna('Unknown'),
+                      level=lambda d: d['studentlevel'].map({'undergrad': 'Undergraduate', 'grad': 'Graduate'}))
+              .groupby(['state', 'sector', 'level', 'year'])
+              .agg(men=('totmen', 'sum'), women=('totwomen', 'sum'), schools=('id', 'nunique')))
+    cells = _decoded(cube)
+    assert cells.index.tolist() == manual.index.tolist()
+    assert cells['men'].tolist() == manual['men'].astype(int).tolist()
+    assert cells['women'].tolist() == manual['women'].astype(int).tolist()
+    assert cells['schools'].tolist() == manual['schools'].tolist()
+
+
+def test_pooled_rates_from_cells_match_the_frame():
+    df = _enrollment()
+    cells = _decoded(build_cube(df)).reset_index()
+    for (state, year), rows in df.groupby(['state', 'year']):
+        pooled = cells.loc[(cells['state'] == state) & (cells['year'] == year)]
+        share = pooled['men'].sum() / (pooled['men'].sum() + pooled['women'].sum())
+        assert share == rows['totmen'].sum() / (rows['totmen'].sum() + rows['totwomen'].sum())
+
+
+def test_facets_missing_from_the_data_are_left_out():
+    cube = build_cube(_enrollment().drop(columns='sector'))
+    assert list(cube['dims']) == ['state', 'level', 'year']
+    assert 'sector' not in cube['cells']
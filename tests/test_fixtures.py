@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+import fixtures
+from fixtures import FixtureStore
+
+
+class Admissions:
+    '''stands in for a genpeds survey class; counts run() calls'''
+    calls = 0
+
+    def __init__(self, year_range):
+        self.year_range = year_range
+
+    def run(self, merge_with_char=False):
+        Admissions.calls += 1
+        return pd.DataFrame({'id': ['1', '2'], 'year': [self.year_range] * 2, 'men_applied': [10.0, np.nan],
+                             'merged': [merge_with_char] * 2})
+
+
+def test_put_get_round_trip_keeps_dtypes_and_stringifies_mixed_columns(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    frame = pd.DataFrame({'id': ['1', '2', '3'], 'year': np.array([2021, 2022, 2023], dtype='int16'),
+                          'rate': [1.5, np.nan, 3.0], 'mixed': [1, 'two', None]})
+    store.put(Admissions, [2021, 2023], (True,), frame)
+    replayed = store.get(Admissions, [2021, 2023], (True,))
+    tm.assert_frame_equal(replayed.drop(columns='mixed'), frame.drop(columns='mixed'))
+    assert replayed['mixed'].tolist()[:2] == ['1', 'two'] and pd.isna(replayed['mixed'][2])
+    entry, = store.index().values()
+    assert (entry['survey'], entry['rows'], entry['stringified']) == ('Admissions', 3, ['mixed'])
+    assert store.get(Admissions, [2021, 2023], (False,)) is None
+    assert store.get(Admissions, 2023, (True,)) is None
+
+
+def test_record_then_replay(tmp_path, monkeypatch):
+    monkeypatch.setattr(fixtures, 'FIXTURE_ROOT', str(tmp_path))
+    monkeypatch.setattr(fixtures, '_stores', {})
+    Admissions.calls = 0
+    monkeypatch.setattr(fixtures, 'MODE', 'record')
+    recorded = fixtures.run_survey(Admissions, 2023, True)
+    monkeypatch.setattr(fixtures, 'MODE', 'replay')
+    assert fixtures.replaying()
+    tm.assert_frame_equal(fixtures.run_survey(Admissions, 2023, True), recorded)
+    assert Admissions.calls == 1
+    with pytest.raises(KeyError, match='no fixture'):
+        fixtures.run_survey(Admissions, 2022, True)
+    monkeypatch.setattr(fixtures, 'MODE', 'rewind')
+    with pytest.raises(ValueError):
+        fixtures.run_survey(Admissions, 2023, True)
@@ -0,0 +1,28 @@
+from html_min import StyleRegistry, minify_html
+
+
+def test_minify_strips_indentation_comments_and_css_space():
+    html = ('<html>\n    <head>\n        <style>\n            .a  > b { color: red; }\n            /* note */\n'
+            '        </style>\n    </head>\n\n    <!-- dropped -->\n    <body><p>one  two</p></body>\n</html>\n')
+    assert minify_html(html) == '<html>\n<head>\n<style>.a>b{color:red}</style>\n</head>\n<body><p>one  two</p></body>\n</html>'
+
+
+def test_minify_keeps_pre_textarea_and_script_verbatim():
+    pre = '<pre class="x">\n  indented\n\n    more\n</pre>'
+    textarea = '<TEXTAREA>\n  keep\n</TEXTAREA>'
+    script = '<script>\n    const s = `\n    line`; // <!-- not a comment -->\n</script>'
+    html = f'  <div>\n    {pre}\n  {textarea}\n  {script}\n  </div>'
+    assert minify_html(html) == f'<div>\n{pre}\n{textarea}\n{script}\n</div>'
+
+
+def test_minify_is_idempotent():
+    html = '<div>\n  <pre>\n a</pre>\n  <script>\n  x = 1;\n</script>\n</div>'
+    assert minify_html(minify_html(html)) == minify_html(html)
+
+
+def test_style_registry_hoists_and_shares_classes():
+    styles = StyleRegistry()
+    fragment = styles.hoist('<div style="color: red;font-size:12px"><b class="k" style="color:red; font-size: 12px;">x</b><br/></div>')
+    assert fragment == '<div class="h0"><b class="k h0">x</b><br/></div>'
+    assert styles.hoist('<span style="margin:0">y</span>') == '<span class="h1">y</span>'
+    assert styles.stylesheet() == '<style>.h0{color:red;font-size:12px}.h1{margin:0}</style>'
@@ -0,0 +1,74 @@
+import json
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from output_sink import ArchiveSink, DirectorySink, MemorySink, OutputTarget
+
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'page_budgets.json')
+PAGES = {'map/landing_map.html': '<html>map</html>', 'schools/A/index.html': '<html>a</html>',
+         'schools/A/admissions.json': b'{"data": []}'}
+
+
+def _archive(tmp_path, name):
+    root = tmp_path / 'docs'
+    (root / 'assets').mkdir(parents=True, exist_ok=True)
+    (root / 'assets' / 'plotly.min.js').write_text('/* plotly */')
+    path = str(tmp_path / name)
+    with ArchiveSink(path, str(root), budgets_path=BUDGETS_PATH) as sink:
+        target = OutputTarget(str(root), sink)
+        for rel,content in PAGES.items():
+            assert target.write(target.path(*rel.split('/')), content)
+        assert not target.write(target.path('map', 'landing_map.html'), '<html>map</html>')     # same content again
+    return path
+
+
+def _members(path):
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+    with tarfile.open(path) as archive:
+        return {m.name: archive.extractfile(m).read() for m in archive.getmembers()}
+
+
+@pytest.mark.parametrize('name', ['site.tar.gz', 'site.zip'])
+def test_archive_round_trip(tmp_path, name):
+    path = _archive(tmp_path, name)
+    members = _members(path)
+    assert list(members)[-1] == 'manifest.json'
+    for rel,content in PAGES.items():
+        assert members[rel] == (content.encode('utf-8') if isinstance(content, str) else content)
+    assert members['assets/plotly.min.js'] == b'/* plotly */'
+    manifest = json.loads(members['manifest.json'])
+    assert set(manifest['files']) == set(PAGES) | {'assets/plotly.min.js'}
+    assert not os.path.exists(tmp_path / 'docs' / 'map')    # nothing written under the output root
+    with open(path,'rb') as first:
+        built = first.read()
+    with open(_archive(tmp_path, name),'rb') as second:
+        assert second.read() == built    # byte-stable
+
+
+def test_archive_rejects_conflicts_and_removes_aborted_archives(tmp_path):
+    path = str(tmp_path / 'site.zip')
+    with pytest.raises(ValueError):
+        ArchiveSink(str(tmp_path / 'site.rar'), str(tmp_path))
+    with pytest.raises(ValueError, match='written twice'):
+        with ArchiveSink(path, str(tmp_path / 'docs'), budgets_path=BUDGETS_PATH) as sink:
+            sink.write(str(tmp_path / 'docs' / 'a.html'), 'one')
+            with pytest.raises(ValueError, match='outside the output root'):
+                sink.write(str(tmp_path / 'elsewhere.html'), 'x')
+            sink.write(str(tmp_path / 'docs' / 'a.html'), 'two')
+    assert not os.path.exists(path)
+
+
+def test_directory_and_memory_sinks(tmp_path):
+    page = str(tmp_path / 'docs' / 'table' / 'landing_table.html')
+    assert DirectorySink().write(page, 'x')
+    assert not DirectorySink().write(page, 'x')
+    memory = MemorySink()
+    memory.write(page, 'x')
+    memory.write(page, b'y')
+    assert memory.files == [(page, b'x'), (page, b'y')]
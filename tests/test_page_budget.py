@@ -0,0 +1,149 @@
+import fnmatch
+import importlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import page_budget
+from page_budget import build_manifest, check_budgets
+
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'page_budgets.json')
+IDS = [str(100000 + i) for i in range(40)]
+SCHOOLS = {id_: f'Partner College {i}' for i,id_ in enumerate(IDS[:6])}
+STATES = ['Tennessee', 'Arizona', 'Colorado', 'Vermont']
+
+
+def _years(year_range):
+    return [year_range] if isinstance(year_range, int) else list(year_range)
+
+
+def _characteristics(years):
+    return pd.DataFrame([
+        {'id': id_, 'year': y, 'name': f'School {i}', 'city': f'City {i % 7}', 'state': STATES[i % 4],
+         'webaddress': f'www.s{i}.edu', 'latitude': 30 + i * .1, 'longitude': -100 + i * .1,
+         'sector': 'Public, 4-year or above' if i % 2 else 'Public, 2-year',
+         'level': 'Four-year or above' if i % 2 else 'Two-year'}
+        for y in years for i,id_ in enumerate(IDS)])
+
+
+def _survey(name, years, level):
+    '''deterministic national frame shaped like the genpeds survey of the same name'''
+    rng = np.random.default_rng(len(name) * 1000 + len(years))
+    rows = []
+    for y in years:
+        for i,id_ in enumerate(IDS):
+            if name == 'Admissions':
+                ma, wa = rng.integers(100, 5000, 2).astype(float)
+                rows.append({'id': id_, 'year': y, 'men_applied': ma, 'women_applied': wa, 'tot_applied': ma + wa,
+                             'men_admitted': ma * .6, 'women_admitted': wa * .7, 'tot_admitted': ma * .6 + wa * .7,
+                             'men_enrolled': ma * .2, 'women_enrolled': wa * .2, 'tot_enrolled': (ma + wa) * .2,
+                             'accept_rate_men': 60.0, 'accept_rate_women': 70.0,
+                             'yield_rate_men': 33.3, 'yield_rate_women': 28.6})
+            elif name == 'Enrollment':
+                if level == 'grad' and i % 2 == 0:
+                    continue
+                m, w = rng.integers(100, 9000, 2).astype(float)
+                row = {'id': id_, 'year': y, 'totmen': m, 'totwomen': w, 'totmen_share': m / (m + w) * 100,
+                       'studentlevel': level}
+                for group in ['wt', 'bk', 'hsp', 'asn']:
+                    row[f'{group}men'], row[f'{group}women'] = m * .2, w * .2
+                rows.append(row)
+            else:
+                if (level == 'bach') != bool(i % 2):
+                    continue
+                m, w = rng.integers(50, 900, 2).astype(float)
+                rows.append({'id': id_, 'year': y, 'totmen': m, 'totwomen': w,
+                             'totmen_graduated': m * .5, 'totwomen_graduated': w * .6,
+                             'gradrate_totmen': 50.0, 'gradrate_totwomen': 60.0, 'deglevel': level})
+    return pd.DataFrame(rows)
+
+
+def _run_survey(survey, year_range, *args):
+    '''stands in for fixtures.run_survey: synthetic frames for every load the build makes'''
+    years = _years(year_range)
+    if survey.__name__ == 'Characteristics':
+        return _characteristics(years)
+    level = args[0] if args and isinstance(args[0], str) else None
+    df = _survey(survey.__name__, years, level)
+    if args[-2]:    # merge_with_char
+        df = df.merge(_characteristics(years), on=['id', 'year'])
+    return df
+
+
+@pytest.fixture(scope='module')
+def fixture_build(tmp_path_factory):
+    '''full build of synthetic partner data, as 00_generate_figs.py --full plus the simple pages; returns the output root'''
+    pytest.importorskip('genpeds')
+    import fixtures
+    import school_index
+    import survey_loader
+    from output_sink import OutputTarget
+    from stages import run_stages
+
+    root = tmp_path_factory.mktemp('build')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        mp.setattr(fixtures, 'MODE', 'replay')     # nothing is downloaded
+        mp.setattr(survey_loader, 'run_survey', _run_survey)
+        mp.setattr(school_index, 'run_survey', _run_survey)
+        generate = importlib.import_module('00_generate_figs')
+        mp.setattr(generate, 'PLOT_WORKERS', 1)
+
+        output = OutputTarget(str(root / 'docs'))
+        run_stages(generate.build_stages(SCHOOLS, output))
+        generate.make_simple_map(SCHOOLS, output)
+        generate.make_simple_table(SCHOOLS, output)
+    return output.root
+
+
+def test_every_built_page_has_a_budget(fixture_build):
+    with open(BUDGETS_PATH,'r') as bj:
+        patterns = json.load(bj)['pages']
+    pages = [os.path.relpath(os.path.join(d, f), fixture_build).replace(os.sep, '/')
+             for d,_,files in os.walk(fixture_build) for f in files]
+    pages = [p for p in pages if not p.startswith('assets/') and p != 'manifest.json']
+    assert pages
+    unbudgeted = [p for p in pages if not any(fnmatch.fnmatch(p, pattern) for pattern in patterns)]
+    assert unbudgeted == []
+    # landing pages are one of a kind and differ widely in size, so each needs its own entry rather than
+    # falling under a map/ or table/ glob; per-school and rollup pages are budgeted by glob
+    landing = [p for p in pages if p.split('/')[0] in ('map', 'table')]
+    assert landing
+    assert [p for p in landing if p not in patterns] == []
+    untracked = [p for p in pages if not page_budget.is_output_page(p)]
+    assert untracked == []
+
+
+def test_fixture_build_is_within_budgets(fixture_build):
+    with open(BUDGETS_PATH,'r') as bj:
+        budgets = json.load(bj)
+    assert check_budgets(build_manifest(fixture_build), budgets) == []
+
+
+def test_unmatched_page_is_reported():
+    budgets = {'pages': {'map/*.html': {'bytes': 10}}}
+    manifest = {'map/a.html': {'bytes': 5, 'gzip_bytes': 1}, 'new/b.html': {'bytes': 5, 'gzip_bytes': 1}}
+    assert check_budgets(manifest, budgets) == ['new/b.html: no page budget matches']
+
+
+def test_growth_over_previous_build_is_reported():
+    budgets = {'pages': {'*': {}}, 'max_growth': 0.1}
+    before = {'a.html': {'bytes': 100, 'gzip_bytes': 100}}
+    after = {'a.html': {'bytes': 120, 'gzip_bytes': 120}}
+    assert len(check_budgets(after, budgets, before)) == 1
+    assert check_budgets(before, budgets, before) == []
+
+
+def test_figures_are_written_as_json_only(fixture_build):
+    # standalone figure pages are opt-in; school and rollup pages lazy-load the JSON
+    dirs = [d for d,_,files in os.walk(fixture_build) if 'index.html' in files
+            and os.path.relpath(d, fixture_build).split(os.sep)[0] in ('schools', 'rollup')]
+    assert dirs
+    for d in dirs:
+        files = os.listdir(d)
+        assert [f for f in files if f.endswith('.html')] == ['index.html']
+        assert any(f.endswith('.json') for f in files)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rankings import CONTEXT_QUANTILES, add_percentiles, context_bands
+
+
+def _national():
+    rows = [{'year': y, 'sector': sector, 'rate': float(v)}
+            for y in (2021, 2023) for sector,values in (('Public', range(0, 50)), ('Private', range(50, 101)))
+            for v in values]
+    rows.append({'year': 2023, 'sector': 'Public', 'rate': np.nan})
+    return pd.DataFrame(rows)
+
+
+def test_context_bands_match_quantiles_per_peer_and_year():
+    df = _national()
+    bands = context_bands(df, 'rate')
+    assert list(bands.columns) == CONTEXT_QUANTILES
+    assert bands.index.names == ['peer', 'year']
+    assert set(bands.index) == {(p, y) for p in ('All', 'Public', 'Private') for y in (2021, 2023)}
+    expected = df.dropna().groupby('year')['rate'].quantile(.25)
+    assert bands.loc[('All', 2023), .25] == pytest.approx(expected[2023])
+    assert bands.loc[('All', 2021), .5] == pytest.approx(50.0)
+    assert bands.loc[('Public', 2023), .5] == pytest.approx(24.5)     # the missing rate is not a peer
+    assert bands.loc[('Private', 2021), .9] == pytest.approx(95.0)
+
+
+def test_context_bands_without_sector_are_national_only():
+    bands = context_bands(_national().drop(columns='sector'), 'rate', [.5])
+    assert list(bands.index) == [('All', 2021), ('All', 2023)]
+    assert bands[.5].tolist() == [50.0, 50.0]
+
+
+def test_percentiles_rank_ties_alike_and_skip_missing():
+    df = pd.DataFrame({'id': list('abcdef'), 'year': 2023,
+                       'rate': [10.0, 20.0, 20.0, np.nan, 40.0, 50.0]})
+    pct = add_percentiles(df, ['rate'])['rate_pct']
+    assert pct.tolist()[:3] == [0.0, 25.0, 25.0]    # ties share the lower rank
+    assert np.isnan(pct[3])
+    assert pct.tolist()[4:] == [75.0, 100.0]
+
+
+def test_percentiles_within_peer_groups_and_years():
+    df = pd.DataFrame({'id': list('abcde'), 'year': [2023, 2023, 2023, 2021, 2023],
+                       'sector': ['Public', 'Public', 'Private', 'Public', 'Private'],
+                       'rate': [1.0, 2.0, 3.0, 9.0, 0.5]})
+    by_sector = add_percentiles(df, ['rate'], 'sector')['rate_pct']
+    assert by_sector.drop(index=3).tolist() == [0.0, 100.0, 100.0, 0.0]
+    assert np.isnan(by_sector[3])    # alone in its year
+    national = add_percentiles(df, ['rate'])['rate_pct']
+    assert national.drop(index=3).tolist() == [33.0, 66.0, 100.0, 0.0]
+    assert np.isnan(national[3])
+
+
+def test_peer_percentiles_need_peer_columns():
+    with pytest.raises(ValueError):
+        add_percentiles(pd.DataFrame({'year': [2023], 'rate': [1.0]}), ['rate'], 'state')
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('genpeds')
+from rollup import pooled_by_year     # noqa: E402
+
+
+def test_rates_are_pooled_and_count_only_reporting_schools():
+    df = pd.DataFrame({'id': ['1', '2', '3', '1', '2'],
+                       'year': [2021, 2021, 2021, 2023, 2023],
+                       'men_admitted': [10.0, 30.0, np.nan, 5.0, 20.0],
+                       'men_applied': [20.0, 40.0, 50.0, 10.0, 0.0],
+                       'women_admitted': [8.0, 12.0, 9.0, 4.0, 6.0],
+                       'women_applied': [10.0, 20.0, 30.0, 8.0, 12.0]})
+    agg = pooled_by_year(df, ['men_applied'], {'accept_men': ('men_admitted', 'men_applied'),
+                                               'accept_women': ('women_admitted', 'women_applied')})
+    assert agg.loc[2021, 'men_applied'] == 110
+    assert agg.loc[2021, 'accept_men'] == pytest.approx(40 / 60 * 100)     # school 3 lacks a numerator
+    assert agg.loc[2023, 'accept_men'] == pytest.approx(50.0)                # school 2 has no applicants
+    assert agg.loc[2021, 'accept_women'] == pytest.approx(29 / 60 * 100)
+    assert agg['accept_men_schools'].tolist() == [2, 1]
+    assert agg['accept_women_schools'].tolist() == [3, 2]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import LANDING_SCHEMAS, SurveySchema
+
+
+SCHEMA = SurveySchema('enrollment', {'men': 'totmen', 'women': 'totwomen', 'share': 'totmen_share'},
+                      required=['men', 'share'])
+SCHOOLS = {'1': 'One College', '2': 'Two College', '3': 'Three College', '4': 'Four College'}
+
+
+def _frame():
+    return pd.DataFrame({'id': ['1', '2', '2', '3', '4'],
+                         'totmen': [100.0, 50.0, 60.0, -5.0, 80.0],
+                         'totwomen': [120.0, np.nan, 70.0, 10.0, np.inf],
+                         'totmen_share': [45.5, 50.0, 46.0, 30.0, 40.0]})
+
+
+def test_validate_masks_invalid_values_and_flags_rows():
+    survey = SCHEMA.validate(_frame())
+    assert survey.record('1') == {'men': 100, 'women': 120, 'share': 45}
+    assert survey.record('2') == {'men': 50, 'women': None, 'share': 50}    # first of the duplicates
+    assert survey.record('3') is None       # a negative count voids a required field
+    assert survey.record('4')['women'] is None
+    issues = set(survey.issues.itertuples(index=False, name=None))
+    assert {('2', 'id', 'duplicate'), ('3', 'totmen', 'invalid'), ('4', 'totwomen', 'invalid'),
+            ('2', 'totwomen', 'missing'), ('3', 'required', 'missing')} <= issues
+
+
+def test_error_records_cover_invalid_rows_in_bulk():
+    records = SCHEMA.validate(_frame()).error_records('map', SCHOOLS)
+    assert [r['id'] for r in records] == ['2', '3', '4']     # school 1 has no issues; missing values are not errors
+    assert records[1] == {'stage': 'map', 'id': '3', 'school': 'Three College', 'error': 'InvalidData',
+                          'message': 'enrollment: totmen invalid', 'where': ''}
+    assert SCHEMA.validate(_frame()).error_records('map', {'1': 'One College'}) == []
+
+
+def test_missing_required_column_raises():
+    with pytest.raises(ValueError):
+        SCHEMA.validate(_frame().drop(columns='totmen_share'))
+
+
+def test_derived_fields():
+    df = pd.DataFrame({'id': ['1'], 'men_applied': [40], 'tot_applied': [100], 'men_admitted': [20],
+                       'tot_admitted': [50], 'men_enrolled': [5], 'tot_enrolled': [12],
+                       'accept_rate_men': [50.0], 'yield_rate_men': [25.0]})
+    record = LANDING_SCHEMAS['admissions'].validate(df).record('1')
+    assert (record['women_app'], record['women_admit'], record['women_enroll']) == (60, 30, 7)
+    assert record['accept_women'] is None
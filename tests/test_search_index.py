@@ -0,0 +1,48 @@
+import json
+
+from search_index import build_search_index, normalize, search_control
+
+
+DOCS = [('Université de Montréal', 'Montréal', 'QC'),
+        ('Tennessee State University', 'Nashville', 'Tennessee'),
+        ('Texas A & M University', 'College Station', 'Texas')]
+
+
+def _search(index, query):
+    '''mirrors the client: intersect posting lists per query word, then confirm on the normalized text'''
+    hits = set(range(len(index['docs'])))
+    words = normalize(query).split()
+    for word in words:
+        if len(word) >= 3:
+            for j in range(len(word) - 2):
+                hits &= set(index['tri'].get(word[j:j+3], []))
+        else:
+            hits &= set(index['pre'].get(word, []))
+    return sorted(i for i in hits if all(any(w.startswith(q) or q in w for w in index['text'][i].split())
+                                         for q in words))
+
+
+def test_normalize_strips_accents_and_punctuation():
+    assert normalize('  Université de Montréal!') == 'universite de montreal'
+    assert normalize('Texas A&M') == 'texas a m'
+
+
+def test_index_finds_schools_by_name_city_and_state():
+    index = build_search_index(DOCS, ['m0', 'm1', 'm2'])
+    assert _search(index, 'montreal') == [0]
+    assert _search(index, 'univ') == [0, 1, 2]
+    assert _search(index, 'te') == [1, 2]
+    assert _search(index, 'nashville tenn') == [1]
+    assert _search(index, 'a m') == [2]
+    assert _search(index, 'ohio') == []
+    assert index['docs'][2] == 'Texas A & M University (College Station, Texas)'
+    for postings in list(index['tri'].values()) + list(index['pre'].values()):
+        assert postings == sorted(set(postings))
+
+
+def test_search_control_escapes_closing_tags():
+    index = build_search_index([('</script><b>', 'City', 'ST')], ['m0'])
+    control = search_control(index, 'map_1')
+    assert '</script><b>' not in control
+    payload = json.dumps(index, separators=(',', ':'), sort_keys=True).replace('</', '<\\/')
+    assert payload in control and 'map_1' in control
@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from sharding import merge_shards, parse_shard, shard_schools, write_shard_manifest
+
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..')
+ROSTER = {str(100000 + 7 * i): f'School {i}' for i in range(200)}
+
+
+def test_parse_shard():
+    assert parse_shard('2/5') == (2, 5)
+    for spec in ['5/5', '-1/3', '1', 'a/b', '0/0']:
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+@pytest.mark.parametrize('count', [1, 3, 8])
+def test_shards_are_disjoint_and_cover_the_roster(count):
+    shards = [shard_schools(ROSTER, i, count) for i in range(count)]
+    assert sum(len(s) for s in shards) == len(ROSTER)
+    assert {id_: name for s in shards for id_,name in s.items()} == ROSTER
+    if count > 1:
+        assert all(shards)  # 200 schools hash into every shard
+
+
+def test_shards_are_stable_under_roster_changes():
+    smaller = dict(list(ROSTER.items())[::2])
+    for i in range(4):
+        assert shard_schools(smaller, i, 4).items() <= shard_schools(ROSTER, i, 4).items()
+
+
+def _build_shard(root, index, count, schools):
+    school_dirs = {}
+    for id_ in schools:
+        rel_dir = f'schools/School_{id_}'
+        os.makedirs(os.path.join(root, rel_dir))
+        with open(os.path.join(root, rel_dir, 'index.html'),'w') as page:
+            page.write(f'<html>{id_}</html>')
+        school_dirs[id_] = rel_dir
+    write_shard_manifest(school_dirs, index, count, str(root))
+    return school_dirs
+
+
+def test_merge_round_trip_and_tampering(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)    # page budgets
+    roster = dict(list(ROSTER.items())[:20])
+    roots = [tmp_path / f'shard{i}' for i in range(2)]
+    expected = {}
+    for i,root in enumerate(roots):
+        expected.update(_build_shard(root, i, 2, shard_schools(roster, i, 2)))
+    merged = tmp_path / 'docs'
+    assert merge_shards([str(r) for r in roots], str(merged)) == expected
+    assert sorted(os.listdir(merged / 'schools')) == sorted(f'School_{id_}' for id_ in roster)
+    with open(merged / 'manifest.json','r') as mj:
+        assert f'schools/School_{next(iter(roster))}/index.html' in json.load(mj)['pages']
+
+    with pytest.raises(ValueError, match='missing shards'):
+        merge_shards([str(roots[0])], str(tmp_path / 'partial'))
+    page = next(iter((roots[1] / 'schools').iterdir())) / 'index.html'
+    page.write_text('tampered')
+    with pytest.raises(ValueError, match='does not match'):
+        merge_shards([str(r) for r in roots], str(tmp_path / 'again'))
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from shared_frames import SharedFrames, publish_frames
+
+
+def _data():
+    admissions = pd.DataFrame({'id': ['3', '1', '2', '1', '3'], 'year': [2021, 2021, 2021, 2023, 2023],
+                               'men_applied': [10.0, np.nan, 30.0, 40.0, 50.0],
+                               'name': ['C', 'A', 'B', 'A', 'C']})
+    enrollment = pd.DataFrame({'id': ['2'], 'year': [2023], 'totmen': [7]})
+    return {'admissions': admissions, 'enrollment_undergrad': enrollment}
+
+
+def test_school_slices_round_trip(tmp_path):
+    data = _data()
+    shared = SharedFrames(publish_frames(data, str(tmp_path)))
+    for id_ in ['1', '2', '3']:
+        frames = shared.school_frames(id_)
+        assert set(frames) == set(data)
+        for label,df in data.items():
+            expected = df.loc[df['id'] == id_].reset_index(drop=True)
+            tm.assert_frame_equal(frames[label], expected)
+
+
+def test_unknown_school_gets_empty_frames(tmp_path):
+    shared = SharedFrames(publish_frames(_data(), str(tmp_path)))
+    frame = shared.school('admissions', '9')
+    assert len(frame) == 0 and list(frame.columns) == ['id', 'year', 'men_applied', 'name']
+
+
+def test_whole_frame_is_sorted_by_id(tmp_path):
+    data = _data()
+    shared = SharedFrames(publish_frames(data, str(tmp_path)))
+    expected = data['admissions'].sort_values('id', kind='stable').reset_index(drop=True)
+    tm.assert_frame_equal(shared.frame('admissions'), expected)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from sparklines import SPARK_METRICS, build_sparklines, sparkline_svgs
+
+
+def test_single_point_is_centered_and_marked():
+    svg = sparkline_svgs(pd.DataFrame({2023: [50.0]}, index=['a']), 'Share', '%')['a']
+    assert '<title>Share 2023–2023: 50% → 50%</title>' in svg
+    assert '<path d="M1.5 8.0"/>' in svg and '<circle cx="1.5" cy="8.0"' in svg
+
+
+def test_all_missing_rows_and_empty_frames_give_no_svg():
+    wide = pd.DataFrame({2021: [np.nan, 1.0], 2023: [np.nan, 2.0]}, index=['a', 'b'])
+    svgs = sparkline_svgs(wide, 'Share')
+    assert svgs['a'] == '' and svgs['b'].startswith('<svg')
+    assert sparkline_svgs(wide.iloc[:0], 'Share').tolist() == []
+
+
+def test_gaps_break_the_line_and_zero_line_when_crossing_zero():
+    wide = pd.DataFrame({2019: [1.0, -2.0], 2021: [np.nan, 3.0], 2023: [4.0, 1.0]}, index=['gap', 'cross'])
+    svgs = sparkline_svgs(wide, 'Gap', 'pp')
+    assert '<path d="M1.5 14.5M58.5 1.5"/>' in svgs['gap'] and '<line' not in svgs['gap']
+    assert '<path d="M1.5 14.5L30.0 1.5L58.5 6.7"/>' in svgs['cross'] and '<line' in svgs['cross']
+
+
+def test_build_sparklines_prefers_the_first_survey_reporting_a_school():
+    four = pd.DataFrame({'id': ['a', 'a'], 'year': [2021, 2023],
+                         'gradrate_totmen': [50.0, 60.0], 'gradrate_totwomen': [55.0, 50.0]})
+    two = pd.DataFrame({'id': ['a', 'b'], 'year': [2023, 2023],
+                        'gradrate_totmen': [10.0, 30.0], 'gradrate_totwomen': [0.0, 40.0]})
+    trends = build_sparklines({'graduation_four_year': four, 'graduation_two_year': two})
+    assert set(trends) == {'a', 'b'}
+    assert list(trends['a']) == list(SPARK_METRICS)
+    assert '2021–2023: -5pp → 10pp' in trends['a']['grad_gap']
+    assert '2023–2023: -10pp → -10pp' in trends['b']['grad_gap']
+    assert trends['a']['share_ug'] == ''
@@ -0,0 +1,54 @@
+import os
+
+import folium
+from branca.element import Element
+
+from stable_output import StableIds, stable_id, write_if_changed
+
+
+def _markers(ids, schools):
+    fg = ids.assign(folium.FeatureGroup())
+    for schl in schools:
+        mkr = folium.Marker([40, -100], tooltip=folium.Tooltip(text=schl))
+        ids.assign(mkr, schl)
+        mkr.add_to(fg)
+    return fg
+
+
+def test_ids_depend_only_on_key_scope_and_order():
+    a = _markers(StableIds('page.html'), ['1', '2', '3'])
+    b = _markers(StableIds('page.html'), ['2', '3'])
+    names_a = list(a._children)
+    assert names_a[1:] == list(b._children)     # a school's ids don't depend on the other schools
+    assert all(child.get_name() == name for name,child in a._children.items())
+    assert names_a[0].endswith(stable_id('page.html', '1', 1))
+    tooltip = a._children[names_a[0]]._children
+    assert list(tooltip) == [c.get_name() for c in tooltip.values()]   # children re-keyed by their new names
+    other = _markers(StableIds('other.html'), ['1'])
+    assert list(other._children) != names_a[:1]
+
+
+def test_assign_rekeys_an_element_already_added():
+    parent = Element()
+    child = Element()
+    parent.add_child(child)
+    StableIds('page.html').assign(child)
+    assert list(parent._children) == [child.get_name()]
+    assert child.get_name().endswith(stable_id('page.html', '', 1))
+
+
+def test_disabled_ids_stay_random():
+    element = Element()
+    before = element.get_name()
+    assert StableIds('page.html', enabled=False).assign(element).get_name() == before
+
+
+def test_write_if_changed(tmp_path):
+    path = str(tmp_path / 'page.html')
+    assert write_if_changed(path, 'abc')
+    mtime = os.stat(path).st_mtime_ns
+    assert not write_if_changed(path, b'abc')
+    assert os.stat(path).st_mtime_ns == mtime
+    assert write_if_changed(path, 'abd')
+    with open(path,'rb') as page:
+        assert page.read() == b'abd'
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from stages import Stage, run_stages, topological_order
+
+
+def test_topological_order_puts_dependencies_first():
+    stages = [Stage('map', None, ['surveys', 'index']), Stage('surveys', None), Stage('index', None),
+              Stage('deploy', None, ['map'])]
+    order = topological_order(stages)
+    assert order.index('surveys') < order.index('map') < order.index('deploy')
+    assert order.index('index') < order.index('map')
+
+
+@pytest.mark.parametrize('stages,message', [
+    ([Stage('a', None, ['c']), Stage('b', None, ['a']), Stage('c', None, ['b']), Stage('d', None)], 'cycle'),
+    ([Stage('a', None, ['a'])], 'cycle'),
+    ([Stage('a', None), Stage('a', None)], 'duplicate'),
+    ([Stage('a', None, ['missing'])], 'unknown'),
+])
+def test_invalid_graphs_are_rejected(stages, message):
+    with pytest.raises(ValueError, match=message):
+        topological_order(stages)
+    with pytest.raises(ValueError, match=message):
+        run_stages(stages)
+
+
+def test_run_stages_passes_results_and_overlaps_independent_stages():
+    both_started = threading.Barrier(2, timeout=5)    # breaks unless the loads run at once
+
+    def load(value):
+        both_started.wait()
+        return value
+
+    results = run_stages([Stage('sum', lambda a, b: a + b, ['a', 'b']),
+                          Stage('a', lambda: load(1)), Stage('b', lambda: load(2))])
+    assert results == {'a': 1, 'b': 2, 'sum': 3}
+
+
+def test_failure_stops_dependent_stages():
+    ran = []
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError, match='boom'):
+        run_stages([Stage('bad', fail), Stage('after', lambda _: ran.append('after'), ['bad'])])
+    assert ran == []
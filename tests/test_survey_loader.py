@@ -0,0 +1,143 @@
+import io
+import os
+import threading
+import time
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import survey_loader
+from download_cache import DownloadCache
+from survey_loader import fetch_raw, load_surveys, raw_path, raw_url, with_retries
+
+
+SUBJECT, YEAR = 'characteristics', 2023
+FILE = 'HD2023'
+CSV = b'UNITID,INSTNM\n100654,Alabama A & M University\n'
+
+
+def _zipped(members: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        for name,content in members.items():
+            archive.writestr(name, content)
+    return buf.getvalue()
+
+
+class StandInServer:
+    '''local stand-in for the NCES file server; fails or stalls the first requests of a path on demand'''
+    def __init__(self):
+        self.hits = Counter()
+        self.failures = 0   # requests answered with 503 before serving
+        self.delay = 0.0    # seconds to stall before answering
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.hits[self.path] += 1
+                if server.hits[self.path] <= server.failures:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                time.sleep(server.delay)
+                body = _zipped({'hd2023.csv': b'UNITID\n1\n', 'hd2023_rv.csv': CSV})
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:     # client gave up
+                    pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+    def requests(self) -> int:
+        return sum(self.hits.values())
+
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _stub_genpeds_files(survey, year_range):
+    '''stands in for genpeds' file layout, so the loader runs without genpeds installed'''
+    subject = survey if isinstance(survey, str) else survey.subject
+    years = [year_range] if isinstance(year_range, int) else list(year_range)
+    return {(subject, year): (FILE, os.path.join(f'{subject}data', f'{subject}_{year}.csv')) for year in years}
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def download_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)     # raw files go where genpeds looks for them, relative to the working directory
+    monkeypatch.setattr(survey_loader, 'genpeds_files', _stub_genpeds_files)
+    return DownloadCache(str(tmp_path / 'cache'))
+
+
+def test_downloads_revised_csv_from_stand_in(server, download_cache):
+    path = fetch_raw(SUBJECT, YEAR, server.url, (5, 5), download_cache)
+    assert path == raw_path(SUBJECT, YEAR)
+    with open(path,'rb') as raw:
+        assert raw.read() == CSV
+    assert raw_url(SUBJECT, YEAR, server.url) == f'{server.url}{FILE}.zip'
+
+
+def test_retries_transient_failures(server, download_cache):
+    server.failures = 2
+    path = with_retries(fetch_raw, SUBJECT, YEAR, server.url, (5, 5), download_cache, retries=2, backoff=0)
+    assert os.path.exists(path)
+    assert server.requests() == 3
+
+
+def test_gives_up_after_retries(server, download_cache):
+    server.failures = 5
+    with pytest.raises(OSError):
+        with_retries(fetch_raw, SUBJECT, YEAR, server.url, (5, 5), download_cache, retries=1, backoff=0)
+    assert server.requests() == 2
+
+
+def test_read_timeout_is_retryable(server, download_cache):
+    server.delay = 1.0
+    with pytest.raises(OSError):
+        with_retries(fetch_raw, SUBJECT, YEAR, server.url, (5, 0.2), download_cache, retries=1, backoff=0)
+    assert server.requests() == 2
+
+
+def test_cache_hit_skips_download(server, download_cache):
+    path = fetch_raw(SUBJECT, YEAR, server.url, (5, 5), download_cache)
+    os.remove(path)
+    fetch_raw(SUBJECT, YEAR, server.url, (5, 5), download_cache)
+    assert server.requests() == 1
+    with open(path,'rb') as raw:
+        assert raw.read() == CSV
+    stats = download_cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_load_times_out(download_cache):
+    class Stalled:
+        def raw_files(self):
+            return []
+
+        def run(self):
+            time.sleep(3)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        load_surveys({'stalled': Stalled()}, timeout=0.5, cache=download_cache)
+    assert time.monotonic() - started < 2.5     # the stalled load is abandoned, not awaited